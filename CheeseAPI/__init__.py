@@ -1,9 +1,13 @@
 from CheeseAPI.app import CheeseAPI, AppProxy
 from CheeseAPI.printer import Printer
-from CheeseAPI.request import Request, RequestProxy
-from CheeseAPI.response import Response, ResponseProxy, FileResponse
+from CheeseAPI.request import Request, RequestProxy, RequestBodyError
+from CheeseAPI.multipart import MultipartPart, MultipartParser
+from CheeseAPI.response import Response, ResponseProxy, FileResponse, FrozenResponse
+from CheeseAPI.cache import ResponseCache, SingleFlight
 from CheeseAPI.websocket import Websocket
 from CheeseAPI.file import File
+from CheeseAPI.headers import Headers
 from CheeseAPI.route import Route, RouteProxy
+from CheeseAPI.protocol import HttpProtocol
 from CheeseAPI.validator import validator
 
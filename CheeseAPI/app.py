@@ -1,5 +1,6 @@
-import os, pathlib, multiprocessing, ssl, socket, asyncio, concurrent.futures, multiprocessing.synchronize, inspect
-from typing import Type, Literal, Callable, AsyncIterable, TYPE_CHECKING
+import os, pathlib, multiprocessing, ssl, socket, asyncio, concurrent.futures, multiprocessing.synchronize, inspect, time, stat, json, email.utils, hashlib, functools
+from collections import OrderedDict
+from typing import Type, Literal, Callable, AsyncIterable, Awaitable, BinaryIO, Hashable, Any, TYPE_CHECKING
 
 import redis
 from CheeseLog import CheeseLogger, Message
@@ -8,19 +9,22 @@ from CheeseAPI.printer import Printer
 from CheeseAPI.signal import Signal
 from CheeseAPI.request import RequestProxy
 from CheeseAPI.response import ResponseProxy
-from CheeseAPI.request import Request
-from CheeseAPI.response import Response, FileResponse
+from CheeseAPI.request import Request, RequestBodyError
+from CheeseAPI.response import Response, FileResponse, FrozenResponse, PREVIEWABLE_TYPES
 from CheeseAPI.route import RouteProxy, AppRoute
 from CheeseAPI.cors import CORS
 from CheeseAPI.websocket import WebsocketProxy
 from CheeseAPI.scheduler import Scheduler, SchedulerProxy
+from CheeseAPI.protocol import HttpProtocol
+from CheeseAPI.cache import LRUCache, StaticFile, ResponseCache, SingleFlight, CachedResponse, Flight, PRECOMPRESSED_SUFFIXES
+from CheeseAPI.file import File
 
 if TYPE_CHECKING:
     from CheeseAPI.websocket import Websocket
     from CheeseAPI.route import Pattern
 
 class AppProxy:
-    __slots__ = ('app', 'stop_signal', 'ssl_context', 'server_socket')
+    __slots__ = ('app', 'stop_signal', 'ssl_context', 'server_socket', 'compress_executor', 'compress_queue_depth', 'compress_cache', 'static_files', 'json_backend', 'date', 'date_line', 'date_handle', 'frozen_responses', 'response_cache', 'single_flights')
 
     def __init__(self, app: 'CheeseAPI'):
         self.app: CheeseAPI = app
@@ -28,6 +32,26 @@ class AppProxy:
         self.stop_signal: multiprocessing.synchronize.Event | None = None
         self.ssl_context: ssl.SSLContext | None = None
         self.server_socket: socket.socket | None = None
+        self.compress_executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self.compress_queue_depth: int = 0
+        ''' 当前工作进程中等待或正在执行的压缩任务数 '''
+        self.compress_cache: LRUCache | None = LRUCache(app.compress_cache_size) if app.compress_cache_size else None
+        ''' 压缩结果缓存，每个工作进程独立 '''
+        self.static_files: OrderedDict[str, StaticFile] = OrderedDict()
+        ''' 静态文件元数据缓存，格式为 `{url 路径: 静态文件}`，每个工作进程独立 '''
+        self.json_backend: tuple[Callable[[Any], bytes | str], Callable[[bytes | str], Any]] = self.get_json_backend(app.json_backend)
+        ''' `app.json_backend` 解析后的 `(dumps, loads)` '''
+        self.date: str | None = None
+        ''' 当前秒的 Date 头部，工作进程运行期间每秒刷新一次 '''
+        self.date_line: bytes = b''
+        ''' 预先编码的 `Date: ...\\r\\n` '''
+        self.date_handle: asyncio.TimerHandle | None = None
+        self.frozen_responses: dict[int, FrozenResponse] = {status: FrozenResponse(status = status) for status in (400, 404, 408)}
+        ''' 框架内部返回的默认错误响应，只序列化一次 '''
+        self.response_cache: LRUCache | None = LRUCache(app.response_cache_size) if app.response_cache_size else None
+        ''' 路由响应缓存，格式为 `{缓存键: 缓存项}`，每个工作进程独立 '''
+        self.single_flights: dict[Hashable, Flight] = {}
+        ''' 正在执行的合并请求，格式为 `{合并键: 合并请求}`，每个工作进程独立 '''
 
     def start(self):
         waiting_list = []
@@ -236,6 +260,10 @@ class AppProxy:
         try:
             loop = asyncio.get_event_loop()
             loop.set_default_executor(concurrent.futures.ThreadPoolExecutor())
+            if self.app.compress_executor_workers:
+                self.compress_executor = concurrent.futures.ThreadPoolExecutor(self.app.compress_executor_workers, 'CheeseAPI-compress')
+
+            self.update_date()
 
             if self.app.sync_server_url:
                 if WebsocketProxy.sync_servers is None:
@@ -250,9 +278,18 @@ class AppProxy:
                 'is_first': is_first
             })
 
+            server = await loop.create_server(lambda: self.app.HttpProtocol_Class(self.app), sock = self.server_socket, ssl = self.ssl_context, backlog = self.app.socket_backlog or socket.SOMAXCONN)
             while self.stop_signal.is_set() is False:
-                client_socket, addr = await loop.sock_accept(self.server_socket)
-                loop.create_task(self.client_socket_process(client_socket, addr))
+                await asyncio.sleep(0.1)
+            server.close()
+
+            if self.date_handle is not None:
+                self.date_handle.cancel()
+                self.date_handle = None
+
+            if self.compress_executor is not None:
+                self.compress_executor.shutdown(wait = False)
+                self.compress_executor = None
 
             await self.before_worker_stop(is_first)
             await self.app.signal.before_worker_stop.async_send(kwargs = {
@@ -263,56 +300,75 @@ class AppProxy:
         except Exception as e:
             self.app.printer.app_error(e)
 
-    async def client_socket_process(self, client_socket: socket.socket, addr: tuple[str, int]):
+    async def connection_process(self, connection: HttpProtocol, addr: tuple[str, int]):
+        request = None
         try:
-            loop = asyncio.get_event_loop()
-
-            if self.ssl_context is not None:
-                client_socket = await loop.run_in_executor(None, lambda: self.ssl_context.wrap_socket(client_socket, server_side = True, do_handshake_on_connect = False))
-
-            async for request, response in self.get_request(client_socket, addr):
+            async for request, response in self.get_request(connection, addr):
                 if not response:
                     response = await self.get_response(request)
 
-                if not response._proxy:
-                    response = self.app.ResponseProxy_Class(self.app, response).response
-
-                if not response._proxy.request:
-                    response._proxy.request = request
+                response_proxy = await self.send_response(response, connection, request)
 
-                await self.send_response(response, client_socket)
-
-                if response._proxy.websocket:
-                    await response._proxy.websocket._proxy.running()
+                if response_proxy.websocket:
+                    await response_proxy.websocket._proxy.running()
         except ConnectionAbortedError:
-            if client_socket._closed is False:
-                client_socket.close()
+            ...
         except Exception as e:
             self.app.printer.fn_error(e, request)
 
-        if client_socket._closed is False:
-            client_socket.close()
+        if request:
+            request._proxy.remove_spool_files()
+        connection.close()
 
-    async def send_response(self, response: Response, client_socket: socket.socket):
+    async def send_response(self, response: Response, connection: HttpProtocol, request: Request) -> ResponseProxy:
         response = await self.before_response(response)
         await self.app.signal.before_response.async_send(kwargs = {
             'response': response
         })
 
-        await response._proxy.send(client_socket)
+        response_proxy = self.get_response_proxy(response, request)
+        await response_proxy.send(connection)
 
         await self.after_response(response)
         await self.app.signal.after_response.async_send(kwargs = {
             'response': response
         })
+        return response_proxy
+
+    def get_response_proxy(self, response: Response, request: Request) -> ResponseProxy:
+        '''
+        `FrozenResponse` 可能同时被多个请求发送（路由常量、响应缓存与合并请求的结果），每次发送都使用新的 `ResponseProxy`，不保存在响应上
+        '''
+
+        if isinstance(response, FrozenResponse):
+            return self.app.ResponseProxy_Class(self.app, response, request)
+
+        if not response._proxy:
+            self.app.ResponseProxy_Class(self.app, response)
+        if not response._proxy.request:
+            response._proxy.request = request
+        return response._proxy
 
     async def get_response(self, request: Request) -> Response:
+        route = request._proxy.route
+        if route is not None and request.method in ('GET', 'HEAD'):
+            if route['cache'] is not None:
+                return await self.get_cached_response(request, route['cache'], route['single_flight'])
+            if route['single_flight'] is not None:
+                return await self.get_single_flight_response(request, route['single_flight'], functools.partial(self.call_fn, request))
+        return await self.call_fn(request)
+
+    async def call_fn(self, request: Request) -> Response:
         if inspect.isfunction(request.fn):
             try:
                 return await request.fn(request = request)
+            except RequestBodyError as e:
+                return e.response
             except Exception as e:
                 self.app.printer.fn_error(e, request)
                 return Response(status = 500)
+        elif isinstance(request.fn, FrozenResponse):
+            return request.fn
         else:
             websocket: Websocket = request.fn(request)
             if websocket.response:
@@ -320,48 +376,243 @@ class AppProxy:
             else:
                 return await websocket._proxy.get_response()
 
-    async def get_request(self, client_socket: socket.socket, addr: tuple[str, int]) -> AsyncIterable[tuple[Request, Response | None]]:
+    async def get_cached_response(self, request: Request, cache: ResponseCache, single_flight: SingleFlight | None = None) -> Response:
+        '''
+        先查找工作进程内的缓存，未命中时再查找 Redis 中的共享缓存或执行路由函数；设置了 `single_flight` 时，相同的并发请求只执行一次后者
+        '''
+
+        key = cache.get_key(request)
+        if self.response_cache is not None:
+            item = self.response_cache.get(key)
+            if item is not None:
+                if item.expire_time > time.monotonic():
+                    await self.add_cached_variant(request, key, item)
+                    return item.response
+                self.response_cache.delete(key)
+
+        if single_flight is not None:
+            response = await self.get_single_flight_response(request, single_flight, functools.partial(self.fill_cached_response, request, cache, key))
+        else:
+            response = await self.fill_cached_response(request, cache, key)
+
+        item = self.response_cache.get(key) if self.response_cache is not None else None
+        if item is not None and item.response is response:
+            await self.add_cached_variant(request, key, item)
+        return response
+
+    async def add_cached_variant(self, request: Request, key: Hashable, item: CachedResponse):
+        '''
+        在发送之前生成该请求需要的压缩版本，并按新的大小重新写入缓存，使 `app.response_cache_size` 包含全部压缩版本
+        '''
+
+        response = item.response
+        if not response._is_compressible:
+            return
+
+        encodings = self.app.ResponseProxy_Class(self.app, response, request).get_accept_encodings()
+        if not encodings or encodings[0] in response._variants:
+            return
+
+        await response.get_variant(encodings[0])
+        if self.response_cache.get(key) is item:
+            self.response_cache.set(key, item)
+
+    async def fill_cached_response(self, request: Request, cache: ResponseCache, key: Hashable) -> Response:
+        '''
+        查找 Redis 中的共享缓存；未命中时执行路由函数，可缓存的响应转换为 `FrozenResponse` 后保存，压缩版本在首次被请求时生成
+        '''
+
+        now = time.monotonic()
+        sync_server = WebsocketProxy.sync_servers[1] if cache.shared and WebsocketProxy.sync_servers is not None else None
+        if sync_server is not None:
+            sync_key = f'CheeseAPI:response_cache:{hashlib.blake2b(repr(key).encode(), digest_size = 16).hexdigest()}'
+            try:
+                data, ttl = await sync_server.pipeline().get(sync_key).pttl(sync_key).execute()
+                if data is not None and ttl > 0:
+                    response = self.load_cached_response(data)
+                    if self.response_cache is not None:
+                        self.response_cache.set(key, CachedResponse(response, now + ttl / 1000))
+                    return response
+            except redis.RedisError as e:
+                self.app.printer.fn_error(e, request)
+                sync_server = None
+
+        response = await self.call_fn(request)
+        if not cache.is_cacheable(response):
+            return response
+
+        response = self.freeze_response(response)
+        if self.response_cache is not None:
+            self.response_cache.set(key, CachedResponse(response, now + cache.ttl))
+        if sync_server is not None:
+            try:
+                await sync_server.set(sync_key, self.dump_cached_response(response), px = max(int(cache.ttl * 1000), 1))
+            except redis.RedisError as e:
+                self.app.printer.fn_error(e, request)
+        return response
+
+    async def get_single_flight_response(self, request: Request, single_flight: SingleFlight, fn: Callable[[], Awaitable[Response]]) -> Response:
+        '''
+        合并键相同的并发请求中，只有第一个请求执行 `fn`，其余请求等待并共用转换为 `FrozenResponse` 的结果；没有等待的请求时不转换
+
+        结果无法共用时，最先被唤醒的等待请求成为新的执行者，其余请求继续等待它的结果，不会同时执行 `fn`
+        '''
+
+        key = single_flight.get_key(request)
+        flight = self.single_flights.get(key)
+        while flight is not None:
+            flight.waiters += 1
+            response = await asyncio.shield(flight.future)
+            if response is not None:
+                return response
+            flight = self.single_flights.get(key)
+
+        flight = self.single_flights[key] = Flight(asyncio.get_running_loop().create_future())
+        response = None
+        try:
+            if single_flight.shared and WebsocketProxy.sync_servers is not None:
+                response = await self.get_locked_response(request, single_flight, key, fn)
+            else:
+                response = await fn()
+            if flight.waiters:
+                response = self.freeze_response(response) or response
+            return response
+        finally:
+            del self.single_flights[key]
+            flight.future.set_result(response if isinstance(response, FrozenResponse) else None)
+
+    async def get_locked_response(self, request: Request, single_flight: SingleFlight, key: Hashable, fn: Callable[[], Awaitable[Response]]) -> Response:
+        '''
+        持有 Redis 锁时执行 `fn`，并将可以共用的响应在 Redis 中保留 1 秒；等待锁的其他工作进程取得锁后直接读取该响应
+        '''
+
+        sync_server = WebsocketProxy.sync_servers[1]
+        sync_key = f'CheeseAPI:single_flight:{hashlib.blake2b(repr(key).encode(), digest_size = 16).hexdigest()}'
+        lock = sync_server.lock(f'{sync_key}:lock', timeout = single_flight.timeout, blocking_timeout = single_flight.timeout)
+        is_locked = False
+        data = None
+        try:
+            is_locked = await lock.acquire()
+            data = await sync_server.get(sync_key)
+        except redis.RedisError as e:
+            self.app.printer.fn_error(e, request)
+        if data is not None:
+            if is_locked:
+                await self.release_lock(request, lock)
+            return self.load_cached_response(data)
+
+        try:
+            response = await fn()
+            frozen_response = self.freeze_response(response)
+            if frozen_response is not None:
+                response = frozen_response
+                try:
+                    await sync_server.set(sync_key, self.dump_cached_response(response), px = 1000)
+                except redis.RedisError as e:
+                    self.app.printer.fn_error(e, request)
+            return response
+        finally:
+            if is_locked:
+                await self.release_lock(request, lock)
+
+    async def release_lock(self, request: Request, lock: 'redis.asyncio.lock.Lock'):
+        try:
+            await lock.release()
+        except redis.RedisError as e:
+            if not isinstance(e, redis.exceptions.LockNotOwnedError):
+                self.app.printer.fn_error(e, request)
+
+    def freeze_response(self, response: Response) -> FrozenResponse | None:
+        '''
+        将响应转换为可以在多个请求间共用的 `FrozenResponse`，压缩版本在首次被请求时生成；响应体为 `AsyncIterable`、设置了 Cookie，或不是 `Response` 与 `FrozenResponse` 时返回 None
+        '''
+
+        if type(response) not in (Response, FrozenResponse) or isinstance(response.body, AsyncIterable) or response.cookies or 'Set-Cookie' in response.headers:
+            return None
+
+        if type(response) is Response:
+            response = FrozenResponse(response.body, response.status, response.headers, compress = response.compress, compress_level = response.compress_level, etag = response.etag)
+        response.freeze(self.app, [])
+        return response
+
+    def dump_cached_response(self, response: FrozenResponse) -> bytes:
+        '''
+        将已冻结的响应编码为 `JSON 头部\\n响应体`，用于 Redis 中的共享缓存
+        '''
+
+        return self.json_dumps({
+            'status': response.status,
+            'headers': response._headers,
+            'compress': response.compress,
+            'compress_level': response.compress_level
+        }) + b'\n' + response._body
+
+    def load_cached_response(self, data: bytes) -> FrozenResponse:
+        info, _, body = data.partition(b'\n')
+        info = self.json_loads(info)
+        response = FrozenResponse(body, info['status'], info['headers'], compress = info['compress'], compress_level = info['compress_level'])
+        response.freeze(self.app, [])
+        return response
+
+    async def get_request(self, connection: HttpProtocol, addr: tuple[str, int]) -> AsyncIterable[tuple[Request, Response | None]]:
         keep_alive_max_requests = 0
         request = None
-        while self.stop_signal.is_set() is False and keep_alive_max_requests < self.app.keep_alive_max_requests and client_socket._closed is False:
+        while self.stop_signal.is_set() is False and keep_alive_max_requests < self.app.keep_alive_max_requests and connection.is_closed is False:
             if request:
                 keep_alive_max_requests += 1
 
+                request._proxy.remove_spool_files()
                 request = await self.after_request(request)
                 await self.app.signal.after_request.async_send(kwargs = {
                     'request': request
                 })
 
-                if request._proxy.protocol is None or not self.app.keep_alive or (request._proxy.protocol == 'HTTP/1.0' and request.headers.get('Connection') != 'keep-alive') or (request._proxy.protocol == 'HTTP/1.1' and request.headers.get('Connection') == 'close'):
+                if request._proxy.protocol is None or request._proxy.is_closing or request._proxy.is_continue_expected or not self.app.keep_alive or (request._proxy.protocol == 'HTTP/1.0' and (request.headers.get('Connection') or '').lower() != 'keep-alive') or (request._proxy.protocol == 'HTTP/1.1' and (request.headers.get('Connection') or '').lower() == 'close'):
+                    break
+                if await request._proxy.discard_body() is False:
                     break
 
-            client_socket, addr = await self.before_request(client_socket, addr)
+            connection, addr = await self.before_request(connection, addr)
             await self.app.signal.before_request.async_send(kwargs = {
-                'client_socket': client_socket,
+                'connection': connection,
                 'addr': addr
             })
 
-            request = Request(self.app, client_socket, addr)
+            request = Request(self.app, connection, addr)
             try:
                 response = await request._proxy.recv_headers(keep_alive_max_requests != 0)
                 if response:
                     yield request, response
                     continue
-                await request._proxy.parse_headers()
+                response = await request._proxy.parse_headers()
+                if response:
+                    yield request, response
+                    continue
             except ConnectionAbortedError:
                 raise
             except asyncio.TimeoutError:
                 break
             except:
-                yield request, Response(status = 400)
+                request._proxy.is_closing = True
+                yield request, self.frozen_responses[400]
                 continue
 
             route = self.app.route._proxy.get_route(request.method, request.path)
             if route == 404:
                 if request.method == 'GET':
-                    yield request, await self.get_static_response(request.path)
+                    static_file = self.get_static_file(request.path)
+                    if type(static_file) is int:
+                        yield request, self.frozen_responses.get(static_file) or Response(status = static_file)
+                        continue
+
+                    # 生成器在响应发送完毕后才会恢复，期间文件句柄不会因移出缓存而被关闭
+                    static_file.references += 1
+                    try:
+                        yield request, await self.get_static_response(static_file)
+                    finally:
+                        static_file.release()
                     continue
-                yield request, Response(status = 404)
+                yield request, self.frozen_responses[404]
                 continue
             elif route == 405:
                 yield request, await self.get_cors_response(request)
@@ -369,6 +620,9 @@ class AppProxy:
 
             request._params = route[1]
             request._fn = route[0]['fn']
+            request._proxy.route = route[0]
+            if route[0]['max_body_size'] is not None:
+                request._proxy.max_body_size = route[0]['max_body_size']
             if route[0]['auto_recv_body'] is True:
                 try:
                     response = await request.recv_body(True)
@@ -379,15 +633,102 @@ class AppProxy:
                 except ConnectionAbortedError:
                     raise
                 except asyncio.TimeoutError:
-                    yield request, Response(status = 408)
+                    request._proxy.is_closing = True
+                    yield request, self.frozen_responses[408]
                     continue
                 except:
-                    yield request, Response(status = 400)
+                    request._proxy.is_closing = True
+                    yield request, self.frozen_responses[400]
                     continue
 
             yield request, None
 
-    async def get_static_response(self, path: str) -> Response:
+    async def run_compress(self, fn: Callable[[bytes], bytes], data: bytes) -> bytes:
+        '''
+        在压缩线程池中执行压缩，避免阻塞事件循环；zlib 与 zstd 在压缩时会释放 GIL
+        '''
+
+        self.compress_queue_depth += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.compress_executor, fn, data)
+        finally:
+            self.compress_queue_depth -= 1
+
+    def update_date(self):
+        '''
+        刷新缓存的 Date 头部，并在事件循环中安排在下一秒开始时再次刷新
+        '''
+
+        now = time.time()
+        self.date = email.utils.formatdate(now, usegmt = True)
+        self.date_line = f'Date: {self.date}\r\n'.encode()
+        self.date_handle = asyncio.get_running_loop().call_later(1 - now % 1, self.update_date)
+
+    def get_json_backend(self, backend: str | tuple[Callable[[Any], bytes | str], Callable[[bytes | str], Any]]) -> tuple[Callable[[Any], bytes | str], Callable[[bytes | str], Any]]:
+        '''
+        - Raises
+            - ImportError: 指定的库未安装
+        '''
+
+        if isinstance(backend, tuple):
+            return backend
+
+        if backend == 'auto':
+            for name in ('orjson', 'msgspec', 'ujson'):
+                try:
+                    return self.get_json_backend(name)
+                except ImportError:
+                    ...
+            backend = 'json'
+
+        if backend == 'orjson':
+            import orjson
+            return orjson.dumps, orjson.loads
+        elif backend == 'msgspec':
+            import msgspec.json
+            return msgspec.json.encode, msgspec.json.decode
+        elif backend == 'ujson':
+            import ujson
+            return ujson.dumps, ujson.loads
+        return json.dumps, json.loads
+
+    def json_dumps(self, data: Any) -> bytes:
+        '''
+        使用 `app.json_backend` 序列化；返回 bytes 的库不会产生中间的 str
+        '''
+
+        data = self.json_backend[0](data)
+        return data.encode() if isinstance(data, str) else data
+
+    def json_loads(self, data: bytes | bytearray | str) -> Any:
+        return self.json_backend[1](data)
+
+    async def get_static_response(self, static_file: StaticFile) -> Response:
+        return FileResponse(static_file.file, headers = {
+            'Content-Type': f'{static_file.mime_type}; charset=utf-8',
+            'Content-Disposition': f'{"inline" if static_file.mime_type in PREVIEWABLE_TYPES else "attachment"}; filename="{static_file.file.name}"',
+            'ETag': static_file.etag,
+            'Last-Modified': static_file.last_modified
+        }, transmission_type = 'SENDFILE', precompressed_files = static_file.precompressed_files)
+
+    def get_static_file(self, path: str) -> StaticFile | Literal[403, 404]:
+        '''
+        按 url 路径缓存静态文件的解析结果；在 `static_cache_interval` 内直接复用，超过间隔后重新读取文件与预压缩文件的状态，均未变化时继续复用
+        '''
+
+        now = time.monotonic()
+        static_file = self.static_files.get(path)
+        if static_file is not None:
+            if now - static_file.checked_time < self.app.static_cache_interval:
+                self.static_files.move_to_end(path)
+                return static_file
+
+            if self.is_static_file_modified(static_file) is False:
+                static_file.checked_time = now
+                self.static_files.move_to_end(path)
+                return static_file
+            self.static_files.pop(path).evict()
+
         for url, _path in self.app.static_path.items():
             if path.startswith(url) is False:
                 continue
@@ -396,19 +737,92 @@ class AppProxy:
             if relative_path.startswith('/'):
                 relative_path = relative_path[1:]
 
-            path = os.path.join(_path, relative_path)
-            if not os.path.abspath(path).startswith(os.path.abspath(_path)):
-                return Response(status = 403)
+            file_path = os.path.join(_path, relative_path)
+            if not os.path.abspath(file_path).startswith(os.path.abspath(_path)):
+                return 403
+
+            try:
+                file_stat = os.stat(file_path)
+                if stat.S_ISDIR(file_stat.st_mode):
+                    file_path = os.path.join(file_path, 'index.html')
+                    file_stat = os.stat(file_path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue
+
+            static_file = self.load_static_file(file_path, file_stat, now)
+            if self.app.static_cache_interval > 0 and self.app.static_cache_max_files > 0:
+                self.static_files[path] = static_file
+                if len(self.static_files) > self.app.static_cache_max_files:
+                    self.static_files.popitem(last = False)[1].evict()
+            return static_file
+
+        return 404
+
+    def load_static_file(self, path: str, file_stat: os.stat_result, now: float) -> StaticFile:
+        '''
+        读取静态文件的元数据，并查找文件旁的预压缩文件（如 `file.js.br`、`file.js.gz`、`file.js.zst`）
+        '''
+
+        precompressed_files = {}
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            if encoding not in self.app.compress:
+                continue
+
+            try:
+                precompressed_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            if stat.S_ISREG(precompressed_stat.st_mode):
+                file = File(path + suffix)
+                file._stat = precompressed_stat
+                file._handler = self.open_static_file(path + suffix)
+                precompressed_files[encoding] = file
+
+        etag, last_modified = self.app.ResponseProxy_Class.get_file_validators(file_stat)
+        return StaticFile(path, file_stat, etag, last_modified, precompressed_files, self.open_static_file(path), now)
+
+    def is_static_file_modified(self, static_file: StaticFile) -> bool:
+        '''
+        重新读取文件与预压缩文件的状态；文件被修改或删除，以及预压缩文件被修改、删除或新增时返回 True
+        '''
 
-            if os.path.exists(path):
-                if os.path.isfile(path):
-                    return FileResponse(path)
-                elif os.path.isdir(path):
-                    path = os.path.join(path, 'index.html')
-                    if os.path.exists(path) and os.path.isfile(path):
-                        return FileResponse(path)
+        try:
+            file_stat = os.stat(static_file.path)
+        except OSError:
+            return True
+        if static_file.is_modified(file_stat):
+            return True
+
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            if encoding not in self.app.compress:
+                continue
 
-        return Response(status = 404)
+            file = static_file.precompressed_files.get(encoding)
+            try:
+                precompressed_stat = os.stat(static_file.path + suffix)
+            except OSError:
+                precompressed_stat = None
+            if file is None:
+                if precompressed_stat is not None and stat.S_ISREG(precompressed_stat.st_mode):
+                    return True
+            elif precompressed_stat is None or static_file.is_modified(precompressed_stat, file):
+                return True
+        return False
+
+    def open_static_file(self, path: str) -> BinaryIO | None:
+        '''
+        仅在启用 `static_cache_fd` 且未使用 TLS 时保持文件句柄；TLS 连接的 sendfile 会回退为 seek 后读取，无法在并发请求间共用句柄
+        '''
+
+        if self.app.static_cache_fd is False or self.app.static_cache_interval <= 0 or self.app.static_cache_max_files <= 0 or self.ssl_context is not None:
+            return None
+
+        try:
+            return open(path, 'rb')
+        except OSError:
+            return None
 
     async def get_cors_response(self, request: Request) -> Response:
         route = self.app.route._proxy.get_route(request.method, request.path)
@@ -419,8 +833,8 @@ class AppProxy:
                 return self.app.cors.get_response(request)
         return Response(status = 405)
 
-    async def before_request(self, client_socket: socket.socket, addr: tuple[str, int]) -> tuple[socket.socket, tuple]:
-        return client_socket, addr
+    async def before_request(self, connection: HttpProtocol, addr: tuple[str, int]) -> tuple[HttpProtocol, tuple]:
+        return connection, addr
 
     async def after_request(self, request: Request | None) -> Request | None:
         return request
@@ -438,9 +852,9 @@ class AppProxy:
         ...
 
 class CheeseAPI:
-    __slots__ = ('_host', '_port', '_ipv6', '_logger_path', '_dual_stack', '_socket_backlog', '_socket_send_buffer_size', '_socket_receive_buffer_size', '_workers', '_ssl_cert', '_ssl_key', '_sync_server_url', '_static_path', '_printer', '_compress', '_compress_min_length', '_compress_level', '_manual_modules', '_exclude_modules', '_priority_modules', '_sync_server_data_encode', '_sync_server_data_decode', '_logger_messages', '_logger', '_is_running', '_request_timeout', '_keep_alive', '_keep_alive_timeout', '_keep_alive_max_requests', '_AppProxy_Class', '_RequestProxy_Class', '_proxy', '_signal', '_ResponseProxy_Class', '_RouteProxy_Class', '_route', '_WebsocketProxy_Class', '_cors', '_SchedulerProxy_Class', '_scheduler')
+    __slots__ = ('_host', '_port', '_ipv6', '_logger_path', '_dual_stack', '_socket_backlog', '_socket_send_buffer_size', '_socket_receive_buffer_size', '_workers', '_ssl_cert', '_ssl_key', '_sync_server_url', '_static_path', '_printer', '_compress', '_compress_min_length', '_compress_level', '_manual_modules', '_exclude_modules', '_priority_modules', '_sync_server_data_encode', '_sync_server_data_decode', '_logger_messages', '_logger', '_is_running', '_request_timeout', '_keep_alive', '_keep_alive_timeout', '_keep_alive_max_requests', '_AppProxy_Class', '_RequestProxy_Class', '_proxy', '_signal', '_ResponseProxy_Class', '_RouteProxy_Class', '_route', '_WebsocketProxy_Class', '_cors', '_SchedulerProxy_Class', '_scheduler', '_HttpProtocol_Class', '_compress_executor_workers', '_compress_executor_min_length', '_compress_cache_size', '_static_cache_interval', '_static_cache_max_files', '_static_cache_fd', '_max_header_size', '_max_header_count', '_max_body_size', '_max_chunk_count', '_spool_body_size', '_spool_dir', '_json_backend', '_decompress_body', '_max_decompression_ratio', '_response_cache_size', '_max_discard_body_size', '_max_decompressed_size', '_compress_stream_min_length')
 
-    def __init__(self, host: str | None = None, port: int = 5214, *, ipv6: bool = False, logger_path: str | None = None, dual_stack: bool = False, socket_backlog: int | None = None, socket_send_buffer_size: int | None = None, socket_receive_buffer_size: int | None = None, workers: int = 1, ssl_cert: str | None = None, ssl_key: str | None = None, sync_server_url: str | None = None, static_path: dict[str, str] = {}, printer: Type[Printer] = Printer, compress: list[Literal['gzip', 'br', 'zstd', 'deflate']] = ['gzip', 'br', 'zstd', 'deflate'], compress_min_length: int = 1024, compress_level: int = 6, manual_modules: list[str] = [], exclude_modules: list[str] = [], priority_modules: list[str] = [], sync_server_data_encode: Callable[[bytes], bytes] | None = None, sync_server_data_decode: Callable[[bytes], bytes] | None = None, logger_messages: dict[str, 'Message'] = {}, request_timeout: float | None = None, keep_alive: bool = True, keep_alive_timeout: float = 5, keep_alive_max_requests: int = 100, AppProxy_Class: Type[AppProxy] = AppProxy, RequestProxy_Class: Type[RequestProxy] = RequestProxy, ResponseProxy_Class: Type[ResponseProxy] = ResponseProxy, RouteProxy_Class: Type[RouteProxy] = RouteProxy, cors_allow_origins: list[str] = ['*'], cors_allow_methods: Literal['GET', 'PUT', 'POST', 'DELETE', 'PATCH', 'OPTIONS', 'HEAD', 'CONNECT'] = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'HEAD', 'PATCH', 'CONNECT'], cors_allow_headers: list[str] = ['*'], cors_allow_credentials: bool = True, cors_expose_headers: list[str] = [], cors_max_age: int | None = None, WebsocketProxy_Class: Type[WebsocketProxy] = WebsocketProxy, route_patterns: list['Pattern'] = [], SchedulerProxy_Class: Type[SchedulerProxy] = SchedulerProxy):
+    def __init__(self, host: str | None = None, port: int = 5214, *, ipv6: bool = False, logger_path: str | None = None, dual_stack: bool = False, socket_backlog: int | None = None, socket_send_buffer_size: int | None = None, socket_receive_buffer_size: int | None = None, workers: int = 1, ssl_cert: str | None = None, ssl_key: str | None = None, sync_server_url: str | None = None, static_path: dict[str, str] = {}, printer: Type[Printer] = Printer, compress: list[Literal['gzip', 'br', 'zstd', 'deflate']] = ['gzip', 'br', 'zstd', 'deflate'], compress_min_length: int = 1024, compress_level: int = 6, manual_modules: list[str] = [], exclude_modules: list[str] = [], priority_modules: list[str] = [], sync_server_data_encode: Callable[[bytes], bytes] | None = None, sync_server_data_decode: Callable[[bytes], bytes] | None = None, logger_messages: dict[str, 'Message'] = {}, request_timeout: float | None = None, keep_alive: bool = True, keep_alive_timeout: float = 5, keep_alive_max_requests: int = 100, AppProxy_Class: Type[AppProxy] = AppProxy, RequestProxy_Class: Type[RequestProxy] = RequestProxy, ResponseProxy_Class: Type[ResponseProxy] = ResponseProxy, RouteProxy_Class: Type[RouteProxy] = RouteProxy, cors_allow_origins: list[str] = ['*'], cors_allow_methods: Literal['GET', 'PUT', 'POST', 'DELETE', 'PATCH', 'OPTIONS', 'HEAD', 'CONNECT'] = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'HEAD', 'PATCH', 'CONNECT'], cors_allow_headers: list[str] = ['*'], cors_allow_credentials: bool = True, cors_expose_headers: list[str] = [], cors_max_age: int | None = None, WebsocketProxy_Class: Type[WebsocketProxy] = WebsocketProxy, route_patterns: list['Pattern'] = [], SchedulerProxy_Class: Type[SchedulerProxy] = SchedulerProxy, HttpProtocol_Class: Type[HttpProtocol] = HttpProtocol, compress_executor_workers: int = 2, compress_executor_min_length: int = 262144, compress_cache_size: int = 67108864, static_cache_interval: float = 1, static_cache_max_files: int = 1024, static_cache_fd: bool = False, max_header_size: int = 65536, max_header_count: int = 100, max_body_size: int | None = None, max_chunk_count: int | None = 65536, spool_body_size: int | None = None, spool_dir: str | None = None, json_backend: Literal['json', 'orjson', 'msgspec', 'ujson', 'auto'] | tuple[Callable[[Any], bytes | str], Callable[[bytes | str], Any]] = 'json', decompress_body: bool = True, max_decompression_ratio: float | None = 100, response_cache_size: int = 67108864, max_discard_body_size: int = 1048576, max_decompressed_size: int | None = 104857600, compress_stream_min_length: int = 1048576):
         '''
         - Args
             - logger_path: 日志文件路径，支持日期格式化
@@ -452,7 +866,7 @@ class CheeseAPI:
             - ssl_cert: SSL 证书路径
             - ssl_key: SSL 密钥路径
             - sync_server_url: 同步服务器地址，用于多进程间同步数据；支持redis
-            - static_path: 静态文件路径映射，格式为 `{url_path: file_system_path}`
+            - static_path: 静态文件路径映射，格式为 `{url_path: file_system_path}`；若文件旁存在 `.br`、`.gz`、`.zst` 预压缩文件，则在客户端支持时直接发送预压缩文件
             - printer: 自定义消息输出
             - compress: 支持的压缩算法，按照顺序尝试压缩
             - compress_min_length: 启用压缩的最小响应体长度
@@ -472,6 +886,26 @@ class CheeseAPI:
             - WebsocketProxy_Class: 若想要对 Websocket 处理逻辑进行处理，可传入自定义的 WebsocketProxy 类
             - route_patterns: 自定义路由校验规则
             - SchedulerProxy_Class: 自定义任务调度器代理类
+            - HttpProtocol_Class: 若想要对连接的接收与发送逻辑进行处理，可传入自定义的 HttpProtocol 类
+            - compress_executor_workers: 每个工作进程中压缩线程池的线程数；为 0 时所有压缩都在事件循环中执行
+            - compress_executor_min_length: 响应体长度不小于该值时，压缩在压缩线程池中执行
+            - compress_cache_size: 每个工作进程中压缩结果缓存的最大字节数；为 0 时不缓存
+            - static_cache_interval: 静态文件元数据缓存的重新校验间隔（秒）；为 0 时不缓存
+            - static_cache_max_files: 每个工作进程中缓存的静态文件最大数量
+            - static_cache_fd: 是否在静态文件缓存中保持打开的文件句柄，供 sendfile 复用；文件变化或被移出缓存后，句柄在正在发送的响应结束时关闭。TLS 下不生效
+            - max_header_size: 请求行与请求头的最大字节数，超出时返回 431
+            - max_header_count: 请求头的最大数量，超出时返回 431
+            - max_body_size: 请求体的最大字节数，超出时在读取请求体之前返回 413；为 None 时不限制，可在路由中单独设置
+            - max_chunk_count: 分块传输的请求体允许的最大分块数，超出时返回 400；为 None 时不限制
+            - spool_body_size: 请求体超过该字节数时，在接收过程中写入临时文件（`request.body_file`）而不是内存；为 None 时全部保存在内存
+            - spool_dir: 临时文件所在目录，默认使用系统临时目录
+            - json_backend: 请求与响应中 JSON 的序列化库，可选 `'json'`、`'orjson'`、`'msgspec'`、`'ujson'`，或 `(dumps, loads)` 函数对；`'auto'` 按 orjson、msgspec、ujson 的顺序使用第一个已安装的库，均未安装时使用标准库 json
+            - decompress_body: 是否按照请求的 `Content-Encoding`（gzip、deflate、br、zstd）自动解压请求体，包括 `request.stream()`；解压后的大小受 `max_body_size` 与 `max_decompressed_size` 限制，超出时返回 413，不支持的编码返回 415
+            - max_decompression_ratio: 解压请求体时允许的最大压缩比，超出时返回 413，用于防御压缩炸弹；解压后的前 1 MiB 不受此限制，为 None 时不限制
+            - response_cache_size: 每个工作进程中路由响应缓存的最大字节数；为 0 时只使用 Redis 中的共享缓存
+            - max_discard_body_size: 响应后仍未被读取的请求体不超过该字节数时被接收并丢弃，以便继续处理同一连接上的下一个请求；超过时关闭连接
+            - max_decompressed_size: 解压后的请求体的最大字节数，超出时返回 413，用于防御压缩炸弹；与 `max_body_size` 同时生效，为 None 时不限制
+            - compress_stream_min_length: 'SENDFILE' 文件需要压缩时，不小于该字节数的文件按 `chunked_size` 分块流式压缩并以 chunked 传输编码发送，内存占用保持恒定，压缩结果不缓存；更小的文件整体压缩并缓存压缩结果
         '''
 
         self._host: str = host if host is not None else ('::' if ipv6 else '0.0.0.0')
@@ -507,6 +941,26 @@ class CheeseAPI:
         self._RouteProxy_Class: Type[RouteProxy] = RouteProxy_Class
         self._WebsocketProxy_Class: Type[WebsocketProxy] = WebsocketProxy_Class
         self._SchedulerProxy_Class: Type[SchedulerProxy] = SchedulerProxy_Class
+        self._HttpProtocol_Class: Type[HttpProtocol] = HttpProtocol_Class
+        self._compress_executor_workers: int = compress_executor_workers
+        self._compress_executor_min_length: int = compress_executor_min_length
+        self._compress_cache_size: int = compress_cache_size
+        self._static_cache_interval: float = static_cache_interval
+        self._static_cache_max_files: int = static_cache_max_files
+        self._static_cache_fd: bool = static_cache_fd
+        self._max_header_size: int = max_header_size
+        self._max_header_count: int = max_header_count
+        self._max_body_size: int | None = max_body_size
+        self._max_chunk_count: int | None = max_chunk_count
+        self._spool_body_size: int | None = spool_body_size
+        self._spool_dir: str | None = spool_dir
+        self._json_backend: Literal['json', 'orjson', 'msgspec', 'ujson', 'auto'] | tuple[Callable[[Any], bytes | str], Callable[[bytes | str], Any]] = json_backend
+        self._decompress_body: bool = decompress_body
+        self._max_decompression_ratio: float | None = max_decompression_ratio
+        self._response_cache_size: int = response_cache_size
+        self._max_discard_body_size: int = max_discard_body_size
+        self._max_decompressed_size: int | None = max_decompressed_size
+        self._compress_stream_min_length: int = compress_stream_min_length
 
         self._logger: CheeseLogger = CheeseLogger(self.logger_path, messages = {
             'START': Message('START', 20, message_template_styled = '(<green>%k</green>) <black>%t</black> > %c'),
@@ -632,7 +1086,7 @@ class CheeseAPI:
     @property
     def static_path(self) -> dict[str, str]:
         '''
-        静态文件路径映射，格式为`{url_path: file_system_path}`
+        静态文件路径映射，格式为`{url_path: file_system_path}`；若文件旁存在 `.br`、`.gz`、`.zst` 预压缩文件，则在客户端支持时直接发送预压缩文件
         '''
 
         return self._static_path
@@ -824,3 +1278,171 @@ class CheeseAPI:
         '''
 
         return self._SchedulerProxy_Class
+
+    @property
+    def HttpProtocol_Class(self) -> Type[HttpProtocol]:
+        '''
+        若想要对连接的接收与发送逻辑进行处理，可传入自定义的 HttpProtocol 类
+        '''
+
+        return self._HttpProtocol_Class
+
+    @property
+    def compress_executor_workers(self) -> int:
+        '''
+        每个工作进程中压缩线程池的线程数；为 0 时所有压缩都在事件循环中执行
+        '''
+
+        return self._compress_executor_workers
+
+    @property
+    def compress_executor_min_length(self) -> int:
+        '''
+        响应体长度不小于该值时，压缩在压缩线程池中执行
+        '''
+
+        return self._compress_executor_min_length
+
+    @property
+    def compress_cache_size(self) -> int:
+        '''
+        每个工作进程中压缩结果缓存的最大字节数；为 0 时不缓存
+        '''
+
+        return self._compress_cache_size
+
+    @property
+    def static_cache_interval(self) -> float:
+        '''
+        静态文件元数据缓存的重新校验间隔（秒）；为 0 时不缓存
+        '''
+
+        return self._static_cache_interval
+
+    @property
+    def static_cache_max_files(self) -> int:
+        '''
+        每个工作进程中缓存的静态文件最大数量
+        '''
+
+        return self._static_cache_max_files
+
+    @property
+    def static_cache_fd(self) -> bool:
+        '''
+        是否在静态文件缓存中保持打开的文件句柄，供 sendfile 复用；文件变化或被移出缓存后，句柄在正在发送的响应结束时关闭。TLS 下不生效
+        '''
+
+        return self._static_cache_fd
+
+    @property
+    def compress_queue_depth(self) -> int:
+        '''
+        当前工作进程中等待或正在执行的压缩任务数
+        '''
+
+        return self._proxy.compress_queue_depth
+
+    @property
+    def max_header_size(self) -> int:
+        '''
+        请求行与请求头的最大字节数，超出时返回 431
+        '''
+
+        return self._max_header_size
+
+    @property
+    def max_header_count(self) -> int:
+        '''
+        请求头的最大数量，超出时返回 431
+        '''
+
+        return self._max_header_count
+
+    @property
+    def max_body_size(self) -> int | None:
+        '''
+        请求体的最大字节数，超出时在读取请求体之前返回 413；为 None 时不限制，可在路由中单独设置
+        '''
+
+        return self._max_body_size
+
+    @property
+    def max_chunk_count(self) -> int | None:
+        '''
+        分块传输的请求体允许的最大分块数，超出时返回 400；为 None 时不限制
+        '''
+
+        return self._max_chunk_count
+
+    @property
+    def spool_body_size(self) -> int | None:
+        '''
+        请求体超过该字节数时，在接收过程中写入临时文件（`request.body_file`）而不是内存；为 None 时全部保存在内存
+        '''
+
+        return self._spool_body_size
+
+    @property
+    def spool_dir(self) -> str | None:
+        '''
+        临时文件所在目录，默认使用系统临时目录
+        '''
+
+        return self._spool_dir
+
+    @property
+    def json_backend(self) -> Literal['json', 'orjson', 'msgspec', 'ujson', 'auto'] | tuple[Callable[[Any], bytes | str], Callable[[bytes | str], Any]]:
+        '''
+        请求与响应中 JSON 的序列化库，可选 `'json'`、`'orjson'`、`'msgspec'`、`'ujson'`，或 `(dumps, loads)` 函数对；`'auto'` 按 orjson、msgspec、ujson 的顺序使用第一个已安装的库，均未安装时使用标准库 json
+        '''
+
+        return self._json_backend
+
+    @property
+    def decompress_body(self) -> bool:
+        '''
+        是否按照请求的 `Content-Encoding`（gzip、deflate、br、zstd）自动解压请求体，包括 `request.stream()`；解压后的大小受 `max_body_size` 与 `max_decompressed_size` 限制，超出时返回 413，不支持的编码返回 415
+        '''
+
+        return self._decompress_body
+
+    @property
+    def max_decompression_ratio(self) -> float | None:
+        '''
+        解压请求体时允许的最大压缩比，超出时返回 413，用于防御压缩炸弹；解压后的前 1 MiB 不受此限制，为 None 时不限制
+        '''
+
+        return self._max_decompression_ratio
+
+    @property
+    def response_cache_size(self) -> int:
+        '''
+        每个工作进程中路由响应缓存的最大字节数；为 0 时只使用 Redis 中的共享缓存
+        '''
+
+        return self._response_cache_size
+
+    @property
+    def max_discard_body_size(self) -> int:
+        '''
+        响应后仍未被读取的请求体不超过该字节数时被接收并丢弃，以便继续处理同一连接上的下一个请求；超过时关闭连接
+        '''
+
+        return self._max_discard_body_size
+
+    @property
+    def max_decompressed_size(self) -> int | None:
+        '''
+        解压后的请求体的最大字节数，超出时返回 413，用于防御压缩炸弹；与 `max_body_size` 同时生效，为 None 时不限制
+        '''
+
+        return self._max_decompressed_size
+
+    @property
+    def compress_stream_min_length(self) -> int:
+        '''
+        'SENDFILE' 文件需要压缩时，不小于该字节数的文件按 `chunked_size` 分块流式压缩并以 chunked 传输编码发送，内存占用保持恒定，压缩结果不缓存；更小的文件整体压缩并缓存压缩结果
+        '''
+
+        return self._compress_stream_min_length
@@ -0,0 +1,216 @@
+import os, mimetypes, asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Hashable, BinaryIO, Callable, AsyncIterable, Any
+
+from CheeseAPI.file import File
+from CheeseAPI.response import Response, FrozenResponse
+
+if TYPE_CHECKING:
+    from CheeseAPI.request import Request
+
+class LRUCache:
+    '''
+    按字节数限制容量的 LRU 缓存；超出容量时淘汰最久未使用的数据
+
+    值为 bytes 或实现了 `__len__` 的对象，以写入时的 `len(value)` 计算占用的字节数；值的大小变化后需要重新写入
+    '''
+
+    __slots__ = ('max_size', 'size', 'items')
+
+    def __init__(self, max_size: int):
+        '''
+        - Args
+            - max_size: 缓存的最大字节数；单个值超过该大小时不会被缓存
+        '''
+
+        self.max_size: int = max_size
+        self.size: int = 0
+        self.items: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        ''' 格式为 `{键: (值, 写入时的字节数)}` '''
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.items
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self.items.get(key)
+        if item is None:
+            return None
+        self.items.move_to_end(key)
+        return item[0]
+
+    def set(self, key: Hashable, value: Any):
+        self.delete(key)
+        size = len(value)
+        if size > self.max_size:
+            return
+
+        self.items[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, _size) = self.items.popitem(last = False)
+            self.size -= _size
+
+    def delete(self, key: Hashable):
+        item = self.items.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def clear(self):
+        self.items.clear()
+        self.size = 0
+
+PRECOMPRESSED_SUFFIXES: tuple[tuple[str, str], ...] = (('br', '.br'), ('zstd', '.zst'), ('gzip', '.gz'))
+''' 静态文件旁的预压缩文件，按优先级排序 '''
+
+class StaticFile:
+    '''
+    静态文件的元数据缓存，保存文件状态、MIME 类型、ETag、Last-Modified 以及可选的已打开文件句柄；在重新校验间隔内不再访问文件系统
+
+    被移出缓存后，文件句柄在最后一个使用它的响应发送完毕时关闭
+    '''
+
+    __slots__ = ('path', 'file', 'mime_type', 'etag', 'last_modified', 'precompressed_files', 'checked_time', 'references', 'is_evicted')
+
+    def __init__(self, path: str, stat: os.stat_result, etag: str, last_modified: str, precompressed_files: dict[str, File], handler: BinaryIO | None, checked_time: float):
+        self.path: str = path
+        self.file: File = File(path)
+        self.file._stat = stat
+        self.file._handler = handler
+        self.mime_type: str = mimetypes.guess_type(self.file.name)[0] or 'application/octet-stream'
+        self.etag: str = etag
+        self.last_modified: str = last_modified
+        self.precompressed_files: dict[str, File] = precompressed_files
+        self.checked_time: float = checked_time
+        self.references: int = 0
+        ''' 正在发送的响应数 '''
+        self.is_evicted: bool = False
+
+    def is_modified(self, stat: os.stat_result, file: File | None = None) -> bool:
+        '''
+        - Args
+            - file: 比较的文件，默认为静态文件本身，也可以是其中的预压缩文件
+        '''
+
+        file = file or self.file
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino) != (file._stat.st_mtime_ns, file._stat.st_size, file._stat.st_ino)
+
+    def release(self):
+        self.references -= 1
+        if self.is_evicted and self.references == 0:
+            self.close()
+
+    def evict(self):
+        '''
+        移出缓存；没有正在发送的响应时立即关闭文件句柄
+        '''
+
+        self.is_evicted = True
+        if self.references == 0:
+            self.close()
+
+    def close(self):
+        for file in (self.file, *self.precompressed_files.values()):
+            if file._handler is not None:
+                file._handler.close()
+                file._handler = None
+
+class ResponseCache:
+    '''
+    路由的响应缓存配置；命中时不执行路由函数，直接发送已序列化的响应
+
+    只缓存 GET 与 HEAD 请求，二者共用缓存项；响应体为 `AsyncIterable`、设置了 Cookie，或 `Cache-Control` 含有 `no-store`、`private` 的响应不会被缓存
+    '''
+
+    __slots__ = ('ttl', 'query', 'headers', 'key', 'statuses', 'shared')
+
+    def __init__(self, ttl: float, *, query: list[str] | None = None, headers: list[str] = [], key: Callable[['Request'], Hashable] | None = None, statuses: list[int] = [200], shared: bool = False):
+        '''
+        - Args
+            - ttl: 缓存的有效秒数
+            - query: 参与缓存键的查询参数；为 None 时使用全部查询参数
+            - headers: 参与缓存键的请求头，即响应会随之变化的请求头（与 `Vary` 相同）；`Accept-Encoding` 无需列出，各压缩版本保存在同一个缓存项中。`Authorization` 与 `Cookie` 总是参与缓存键，不同用户的响应不会共用
+            - key: 自定义缓存键；设置后忽略 `query` 与 `headers`，也不再包含 `Authorization` 与 `Cookie`，路径仍然参与缓存键
+            - statuses: 可以被缓存的响应状态码
+            - shared: 是否同时缓存到 `app.sync_server_url` 的 Redis 中，由所有工作进程共享
+        '''
+
+        self.ttl: float = ttl
+        self.query: list[str] | None = query
+        self.headers: list[str] = headers
+        self.key: Callable[['Request'], Hashable] | None = key
+        self.statuses: list[int] = statuses
+        self.shared: bool = shared
+
+    def get_key(self, request: 'Request') -> Hashable:
+        if self.key is not None:
+            return request.path, self.key(request)
+
+        if self.query is None:
+            query = tuple(sorted((name, tuple(values)) for name, values in request.query_lists.items()))
+        else:
+            query = tuple(tuple(request.query_lists.get(name, ())) for name in self.query)
+        return request.path, query, tuple(request.headers.get(name) for name in self.headers), request.headers.get('Authorization'), request.headers.get('Cookie')
+
+    def is_cacheable(self, response: Response) -> bool:
+        if type(response) not in (Response, FrozenResponse) or response.status not in self.statuses or isinstance(response.body, AsyncIterable) or response.cookies or 'Set-Cookie' in response.headers:
+            return False
+
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        return 'no-store' not in cache_control and 'private' not in cache_control
+
+class SingleFlight:
+    '''
+    路由的请求合并配置；合并键相同的并发请求只执行一次路由函数，其余请求等待并共用同一个已序列化的响应
+
+    只合并 GET 与 HEAD 请求；响应体为 `AsyncIterable` 或设置了 Cookie 的响应无法共用，此时等待的请求重新选出一个请求执行路由函数，其余请求继续等待，即这类响应会被依次生成
+    '''
+
+    __slots__ = ('key', 'shared', 'timeout')
+
+    def __init__(self, key: Callable[['Request'], Hashable] | None = None, *, shared: bool = False, timeout: float = 10):
+        '''
+        - Args
+            - key: 自定义合并键，路径仍然参与合并键；默认使用完整路径（含查询参数）与请求头 `Authorization`、`Cookie`
+            - shared: 是否通过 `app.sync_server_url` 的 Redis 锁在工作进程之间合并；持有锁的工作进程将响应在 Redis 中保留 1 秒，供等待锁的工作进程读取
+            - timeout: Redis 锁的超时秒数，也是等待锁的最长秒数；超时后直接执行路由函数
+        '''
+
+        self.key: Callable[['Request'], Hashable] | None = key
+        self.shared: bool = shared
+        self.timeout: float = timeout
+
+    def get_key(self, request: 'Request') -> Hashable:
+        if self.key is not None:
+            return request.path, self.key(request)
+        return request.full_path, request.headers.get('Authorization'), request.headers.get('Cookie')
+
+class Flight:
+    '''
+    一次正在执行的合并请求；`future` 的结果为共用的 `FrozenResponse`，无法共用时为 None
+    '''
+
+    __slots__ = ('future', 'waiters')
+
+    def __init__(self, future: 'asyncio.Future[FrozenResponse | None]'):
+        self.future: 'asyncio.Future[FrozenResponse | None]' = future
+        self.waiters: int = 0
+        ''' 等待共用结果的请求数 '''
+
+class CachedResponse:
+    '''
+    响应缓存中的一项；占用的字节数按未压缩的响应体与已生成的各版本计算，压缩版本在首次被请求时生成，生成后需要重新写入缓存
+    '''
+
+    __slots__ = ('response', 'expire_time')
+
+    def __init__(self, response: FrozenResponse, expire_time: float):
+        self.response: FrozenResponse = response
+        self.expire_time: float = expire_time
+        ''' 过期时间，`time.monotonic()` '''
+
+    def __len__(self) -> int:
+        variants = {id(variant): variant for variant in self.response._variants.values()}.values()
+        return len(self.response._body) + sum(len(head) + (len(body) if body is not self.response._body else 0) for head, body in variants)
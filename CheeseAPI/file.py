@@ -1,28 +1,35 @@
-import shutil
-from typing import overload
+import shutil, os
+from typing import overload, BinaryIO
 
 class File:
-    __slots__ = ('_path', '_name', '_data_in_file', '_data')
+    __slots__ = ('_path', '_name', '_data_in_file', '_data', '_stat', '_handler', '_is_temporary')
 
     @overload
-    def __init__(self, path: str, *, data_in_file: bool = True):
+    def __init__(self, path: str, *, data_in_file: bool = True, name: str | None = None):
         '''
         - Args
             - data_in_file: 是否将数据保存在文件中，若否则读取文件内容到内存
+            - name: 文件名，默认为路径中的文件名
         '''
 
     @overload
     def __init__(self, name: str, data: bytes):
         ...
 
-    def __init__(self, *args, data_in_file: bool = True):
+    def __init__(self, *args, data_in_file: bool = True, name: str | None = None):
         self._path: str | None = None
         self._name: str
         self._data_in_file: bool = data_in_file
         self._data: bytes | None = None
+        self._stat: os.stat_result | None = None
+        ''' 由静态文件缓存预先填入的文件状态 '''
+        self._handler: BinaryIO | None = None
+        ''' 由静态文件缓存预先打开的文件句柄，供 sendfile 复用；由静态文件缓存负责关闭 '''
+        self._is_temporary: bool = False
+        ''' 是否为接收请求体时写入的临时文件；保存时直接移动，请求结束后未移动的临时文件会被删除 '''
         if len(args) == 1:
             self._path = args[0]
-            self._name = self._path.split('/')[-1]
+            self._name = name if name is not None else self._path.split('/')[-1]
             if self.data_in_file is False:
                 with open(self._path, 'rb') as f:
                     self._data = f.read()
@@ -33,13 +40,21 @@ class File:
     def save(self, path: str, update_path: bool = False, data_in_file: bool = False):
         '''
         - Args
-            - update_path: 是否更新文件路径为保存后的路径
+            - update_path: 是否更新文件路径为保存后的路径；临时文件被移动后总会更新
             - data_in_file: 是否将数据保存在文件中，若否则读取文件内容到内存
         '''
 
         if self._data is not None:
             with open(path, 'wb') as f:
                 f.write(self.data)
+        elif self._is_temporary:
+            try:
+                os.replace(self.path, path)
+            except OSError:
+                shutil.copyfile(self.path, path)
+            else:
+                self._is_temporary = False
+                update_path = True
         else:
             shutil.copyfile(self.path, path)
 
@@ -0,0 +1,138 @@
+from collections.abc import MutableMapping
+from typing import Iterator
+
+COMMON_HEADER_NAMES: tuple[str, ...] = ('Accept', 'Accept-Encoding', 'Accept-Language', 'Access-Control-Request-Headers', 'Access-Control-Request-Method', 'Authorization', 'Cache-Control', 'Connection', 'Content-Disposition', 'Content-Encoding', 'Content-Length', 'Content-MD5', 'Content-Type', 'Cookie', 'Expect', 'Host', 'If-Match', 'If-Modified-Since', 'If-None-Match', 'If-Range', 'Origin', 'Pragma', 'Range', 'Referer', 'Sec-Fetch-Dest', 'Sec-Fetch-Mode', 'Sec-Fetch-Site', 'Sec-WebSocket-Extensions', 'Sec-WebSocket-Key', 'Sec-WebSocket-Protocol', 'Sec-WebSocket-Version', 'Transfer-Encoding', 'Upgrade', 'Upgrade-Insecure-Requests', 'User-Agent', 'X-Forwarded-For', 'X-Forwarded-Host', 'X-Forwarded-Proto', 'X-Real-IP', 'X-Requested-With')
+
+LOWER_HEADER_NAMES: dict[bytes | str, str] = {}
+''' 常见头部名称（原始大小写与小写形式，bytes 与 str）到驻留的小写名称的映射，解析与查找时无需重复分配字符串 '''
+for _name in COMMON_HEADER_NAMES:
+    _lower = _name.lower()
+    for _key in (_name, _lower, _name.encode(), _lower.encode()):
+        LOWER_HEADER_NAMES[_key] = _lower
+del _name, _lower, _key
+
+class Headers(MutableMapping):
+    '''
+    请求头部的紧凑容器；保留原始字节，名称不区分大小写，支持重复的头部，值在首次访问时才解码
+
+    同名头部通过 `headers[name]` 获取时以 `, ` 连接（`Cookie` 以 `; ` 连接），使用 `get_all` 获取全部值
+    '''
+
+    __slots__ = ('raw', 'positions', 'values')
+
+    def __init__(self, raw: bytes = b''):
+        '''
+        - Args
+            - raw: 不含请求行与结束标记的头部字节，每行以 `\\r\\n` 分隔
+
+        - Raises
+            - ValueError: 头部格式错误
+        '''
+
+        self.raw: bytes = raw
+        self.positions: dict[str, list[tuple[int, int, int, int]]] = {}
+        ''' 小写名称到每个同名头部在 `raw` 中的 (名称起点, 名称终点, 值起点, 值终点) 的映射 '''
+        self.values: dict[str, tuple[str, list[str]]] = {}
+        ''' 已解码或被修改的头部，小写名称到 (原始名称, 值列表) 的映射 '''
+
+        start = 0
+        end = len(raw)
+        while start < end:
+            line_end = raw.find(b'\r\n', start)
+            if line_end == -1:
+                line_end = end
+            colon = raw.find(b':', start, line_end)
+            if colon <= start:
+                raise ValueError('Invalid header line')
+
+            name = raw[start:colon]
+            key = LOWER_HEADER_NAMES.get(name) or name.decode('latin-1').lower()
+
+            value_start = colon + 1
+            value_end = line_end
+            while value_start < value_end and raw[value_start] in b' \t':
+                value_start += 1
+            while value_end > value_start and raw[value_end - 1] in b' \t':
+                value_end -= 1
+
+            position = (start, colon, value_start, value_end)
+            positions = self.positions.get(key)
+            if positions is None:
+                self.positions[key] = [position]
+            else:
+                positions.append(position)
+            start = line_end + 2
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({dict(self)!r})'
+
+    def __len__(self) -> int:
+        return len(self.positions.keys() | self.values.keys())
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.positions:
+            yield self.get_item(key)[0]
+        for key, (name, _) in list(self.values.items()):
+            if key not in self.positions:
+                yield name
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        key = LOWER_HEADER_NAMES.get(name) or name.lower()
+        return key in self.values or key in self.positions
+
+    def __getitem__(self, name: str) -> str:
+        key = LOWER_HEADER_NAMES.get(name) or name.lower()
+        values = self.get_item(key)[1]
+        if len(values) == 1:
+            return values[0]
+        return ('; ' if key == 'cookie' else ', ').join(values)
+
+    def __setitem__(self, name: str, value: str):
+        key = LOWER_HEADER_NAMES.get(name) or name.lower()
+        self.positions.pop(key, None)
+        self.values[key] = (name, [value])
+
+    def __delitem__(self, name: str):
+        key = LOWER_HEADER_NAMES.get(name) or name.lower()
+        if self.positions.pop(key, None) is None and key not in self.values:
+            raise KeyError(name)
+        self.values.pop(key, None)
+
+    def get_item(self, key: str) -> tuple[str, list[str]]:
+        '''
+        获取小写名称为 `key` 的原始名称与全部值，首次访问时解码并缓存
+
+        - Raises
+            - KeyError: 头部不存在
+        '''
+
+        item = self.values.get(key)
+        if item is None:
+            positions = self.positions[key]
+            raw = self.raw
+            name = raw[positions[0][0]:positions[0][1]].decode('latin-1')
+            item = self.values[key] = (name, [raw[value_start:value_end].decode(errors = 'replace') for _, _, value_start, value_end in positions])
+        return item
+
+    def get_all(self, name: str) -> list[str]:
+        '''
+        获取同名头部的全部值；头部不存在时返回空列表
+        '''
+
+        try:
+            return list(self.get_item(LOWER_HEADER_NAMES.get(name) or name.lower())[1])
+        except KeyError:
+            return []
+
+    def add(self, name: str, value: str):
+        '''
+        追加一个同名头部，不覆盖已有的值
+        '''
+
+        key = LOWER_HEADER_NAMES.get(name) or name.lower()
+        if key in self.values or key in self.positions:
+            self.get_item(key)[1].append(value)
+        else:
+            self.values[key] = (name, [value])
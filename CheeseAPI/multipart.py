@@ -0,0 +1,121 @@
+import re
+from typing import Iterable, Literal
+
+from CheeseAPI.file import File
+
+class MultipartError(ValueError):
+    ...
+
+class MultipartPart:
+    __slots__ = ('name', 'filename', 'headers', 'value', 'file', 'size')
+
+    def __init__(self, headers: dict[str, str]):
+        self.headers: dict[str, str] = headers
+        self.name: str | None = None
+        self.filename: str | None = None
+        self.value: str | None = None
+        ''' 表单字段的值；文件分段为 None '''
+        self.file: File | None = None
+        ''' 文件分段写入的文件；使用 `on_file_data` 回调接收时为 None '''
+        self.size: int = 0
+
+        content_disposition = headers.get('Content-Disposition')
+        if content_disposition:
+            name_match = re.search(r'(?:^|;)\s*name="([^"]*)"', content_disposition)
+            if name_match:
+                self.name = name_match.group(1)
+
+            filename_match = re.search(r'filename="([^"]*)"', content_disposition)
+            if filename_match:
+                self.filename = filename_match.group(1)
+
+    @property
+    def content_type(self) -> str | None:
+        return self.headers.get('Content-Type')
+
+class MultipartParser:
+    '''
+    增量的 multipart/form-data 解析器；每次 `feed` 只处理新到达的数据，分段内容以事件的形式产出，不在内存中保留完整请求体
+    '''
+
+    __slots__ = ('delimiter', 'state', 'buffer', 'part', 'max_header_size')
+
+    def __init__(self, boundary: str, max_header_size: int):
+        self.delimiter: bytes = b'\r\n--' + boundary.encode()
+        self.state: Literal['PREAMBLE', 'DELIMITER', 'HEADERS', 'DATA', 'END'] = 'PREAMBLE'
+        self.buffer: bytearray = bytearray(b'\r\n')
+        ''' 未处理的数据；在开头补上 `\\r\\n`，使第一个分隔符与其余分隔符格式一致 '''
+        self.part: MultipartPart | None = None
+        self.max_header_size: int = max_header_size
+
+    def feed(self, data: bytes) -> Iterable[tuple[Literal['BEGIN', 'DATA', 'END'], MultipartPart, bytes | None]]:
+        '''
+        - Raises
+            - MultipartError: 格式错误
+        '''
+
+        self.buffer += data
+        while True:
+            if self.state == 'PREAMBLE':
+                index = self.buffer.find(self.delimiter)
+                if index == -1:
+                    del self.buffer[:-len(self.delimiter)]
+                    return
+                del self.buffer[:index + len(self.delimiter)]
+                self.state = 'DELIMITER'
+            elif self.state == 'DELIMITER':
+                if len(self.buffer) < 2:
+                    return
+                if self.buffer[:2] == b'--':
+                    self.state = 'END'
+                elif self.buffer[:2] == b'\r\n':
+                    del self.buffer[:2]
+                    self.state = 'HEADERS'
+                else:
+                    raise MultipartError('Invalid multipart delimiter')
+            elif self.state == 'HEADERS':
+                index = self.buffer.find(b'\r\n\r\n')
+                if index == -1:
+                    if len(self.buffer) > self.max_header_size:
+                        raise MultipartError('Multipart headers too large')
+                    return
+
+                headers = {}
+                if index:
+                    for line in self.buffer[:index].split(b'\r\n'):
+                        if b':' not in line:
+                            raise MultipartError('Invalid multipart header')
+                        key, value = line.split(b':', 1)
+                        headers[key.decode().strip()] = value.strip().decode()
+                del self.buffer[:index + 4]
+                self.part = MultipartPart(headers)
+                self.state = 'DATA'
+                yield 'BEGIN', self.part, None
+            elif self.state == 'DATA':
+                index = self.buffer.find(self.delimiter)
+                if index == -1:
+                    size = len(self.buffer) - len(self.delimiter) + 1
+                    if size > 0:
+                        self.part.size += size
+                        yield 'DATA', self.part, bytes(self.buffer[:size])
+                        del self.buffer[:size]
+                    return
+
+                if index:
+                    self.part.size += index
+                    yield 'DATA', self.part, bytes(self.buffer[:index])
+                del self.buffer[:index + len(self.delimiter)]
+                self.state = 'DELIMITER'
+                yield 'END', self.part, None
+            else:
+                self.buffer.clear()
+                return
+
+    def finish(self):
+        '''
+        - Raises
+            - MultipartError: 请求体在最后一个分隔符之前结束
+        '''
+
+        if self.state != 'END':
+            raise MultipartError('Incomplete multipart body')
@@ -0,0 +1,295 @@
+import asyncio, sys
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    from CheeseAPI.app import CheeseAPI
+
+VECTORED_WRITELINES: bool = sys.version_info >= (3, 12)
+''' Python 3.12 起，`transport.writelines` 使用 `socket.sendmsg` 直接发送多个缓冲区；此前的版本会先将其拼接为一个 bytes '''
+
+class HttpProtocol(asyncio.BufferedProtocol):
+    '''
+    单个连接的协议实例；接收的数据直接写入连接内可复用的缓冲区，由 `RequestProxy` 从中解析请求
+    '''
+
+    __slots__ = ('app', 'transport', 'addr', 'buffer', 'start', 'end', 'buffer_size', 'waiter', 'is_eof', 'is_closed', 'is_reading_paused', 'is_writing_paused', 'drain_waiter', 'close_waiter', 'stream_reader', 'task', 'target', 'target_filled')
+
+    def __init__(self, app: 'CheeseAPI'):
+        self.app: 'CheeseAPI' = app
+
+        self.transport: asyncio.Transport | None = None
+        self.addr: tuple[str, int] | None = None
+        self.buffer_size: int = app.socket_receive_buffer_size or 65536
+        self.buffer: bytearray = bytearray(self.buffer_size)
+        ''' 可复用的接收缓冲区，未处理的数据位于 `buffer[start:end]` '''
+        self.start: int = 0
+        self.end: int = 0
+        self.waiter: asyncio.Future | None = None
+        self.is_eof: bool = False
+        self.is_closed: bool = False
+        self.is_reading_paused: bool = False
+        self.is_writing_paused: bool = False
+        self.drain_waiter: asyncio.Future | None = None
+        self.close_waiter: asyncio.Future | None = None
+        self.stream_reader: asyncio.StreamReader | None = None
+        self.task: asyncio.Task | None = None
+        self.target: memoryview | None = None
+        ''' 设置后，传输层直接将数据写入 `target`，不经过接收缓冲区 '''
+        self.target_filled: int = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info('peername')
+        loop = asyncio.get_running_loop()
+        self.close_waiter = loop.create_future()
+        self.task = loop.create_task(self.app._proxy.connection_process(self, self.addr))
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self.target is not None:
+            return self.target[self.target_filled:]
+
+        if self.start == self.end and len(self.buffer) > self.buffer_size:
+            self.buffer = bytearray(self.buffer_size)
+        elif len(self.buffer) - self.end < self.buffer_size >> 2:
+            if self.start:
+                self.buffer[:self.end - self.start] = self.buffer[self.start:self.end]
+                self.end -= self.start
+                self.start = 0
+            if len(self.buffer) - self.end < self.buffer_size >> 2:
+                self.buffer.extend(bytes(len(self.buffer)))
+        return memoryview(self.buffer)[self.end:]
+
+    def buffer_updated(self, nbytes: int):
+        if self.target is not None:
+            self.target_filled += nbytes
+            self.wakeup()
+            return
+
+        self.end += nbytes
+
+        if self.stream_reader is not None:
+            self.stream_reader.feed_data(self.read())
+            return
+
+        self.wakeup()
+
+        if self.end - self.start >= self.buffer_size * 4 and self.is_reading_paused is False:
+            self.is_reading_paused = True
+            self.transport.pause_reading()
+
+    def eof_received(self) -> bool | None:
+        self.is_eof = True
+        if self.stream_reader is not None:
+            self.stream_reader.feed_eof()
+        self.wakeup()
+
+    def connection_lost(self, exc: Exception | None):
+        self.is_eof = True
+        self.is_closed = True
+        if self.stream_reader is not None:
+            if exc is None:
+                self.stream_reader.feed_eof()
+            else:
+                self.stream_reader.set_exception(exc)
+        self.wakeup()
+
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_exception(ConnectionAbortedError())
+        if self.close_waiter is not None and not self.close_waiter.done():
+            self.close_waiter.set_result(None)
+
+    def pause_writing(self):
+        self.is_writing_paused = True
+
+    def resume_writing(self):
+        self.is_writing_paused = False
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_result(None)
+
+    def wakeup(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def timeout(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_exception(asyncio.TimeoutError())
+
+    async def recv(self, timeout: float | None = None):
+        '''
+        等待更多数据写入缓冲区
+
+        - Raises
+            - ConnectionAbortedError: 连接已关闭
+            - asyncio.TimeoutError: 超时未收到数据
+        '''
+
+        if self.is_eof:
+            raise ConnectionAbortedError()
+
+        if self.is_reading_paused:
+            self.is_reading_paused = False
+            self.transport.resume_reading()
+
+        loop = asyncio.get_running_loop()
+        self.waiter = loop.create_future()
+        handle = loop.call_later(timeout, self.timeout) if timeout is not None else None
+        try:
+            await self.waiter
+        finally:
+            self.waiter = None
+            if handle is not None:
+                handle.cancel()
+
+        if self.start == self.end and self.is_eof:
+            raise ConnectionAbortedError()
+
+    def find(self, sub: bytes, offset: int = 0) -> int:
+        '''
+        在未处理的数据中查找 `sub`，返回相对于未处理数据起始位置的下标；未找到时返回 -1
+        '''
+
+        index = self.buffer.find(sub, self.start + offset, self.end)
+        return index - self.start if index != -1 else -1
+
+    def read(self, size: int = -1) -> bytes:
+        '''
+        取出并消费至多 `size` 字节的未处理数据；`size` 为 -1 时取出全部
+        '''
+
+        end = self.end if size < 0 else min(self.start + size, self.end)
+        data = bytes(self.buffer[self.start:end])
+        self.skip(end - self.start)
+        return data
+
+    def readinto(self, view: memoryview) -> int:
+        '''
+        将未处理数据复制到 `view` 中并消费，返回复制的字节数
+        '''
+
+        size = min(len(view), self.end - self.start)
+        view[:size] = self.buffer[self.start:self.start + size]
+        self.skip(size)
+        return size
+
+    async def recv_into(self, view: memoryview, timeout: float | None = None) -> int:
+        '''
+        接收数据直至填满 `view`；先复制缓冲区中已有的数据，之后由传输层直接写入 `view`
+
+        - Raises
+            - ConnectionAbortedError: 连接已关闭
+            - asyncio.TimeoutError: 超时未收到数据
+        '''
+
+        filled = self.readinto(view)
+        if filled == len(view):
+            return filled
+
+        self.target = view
+        self.target_filled = filled
+        try:
+            while self.target_filled < len(view):
+                await self.recv(timeout)
+        finally:
+            filled = self.target_filled
+            self.target = None
+            self.target_filled = 0
+        return filled
+
+    def extend_into(self, buffer: bytearray, size: int = -1) -> int:
+        '''
+        将至多 `size` 字节的未处理数据追加到 `buffer` 末尾并消费，返回追加的字节数
+        '''
+
+        end = self.end if size < 0 else min(self.start + size, self.end)
+        size = end - self.start
+        with memoryview(self.buffer) as view:
+            buffer += view[self.start:end]
+        self.skip(size)
+        return size
+
+    def write_to(self, file: BinaryIO, size: int = -1) -> int:
+        '''
+        将至多 `size` 字节的未处理数据写入 `file` 并消费，返回写入的字节数
+        '''
+
+        end = self.end if size < 0 else min(self.start + size, self.end)
+        size = end - self.start
+        with memoryview(self.buffer) as view:
+            file.write(view[self.start:end])
+        self.skip(size)
+        return size
+
+    def skip(self, size: int):
+        self.start += size
+        if self.start >= self.end:
+            self.start = self.end = 0
+
+            if self.is_reading_paused:
+                self.is_reading_paused = False
+                self.transport.resume_reading()
+
+    def set_stream_reader(self, stream_reader: asyncio.StreamReader):
+        '''
+        连接升级后（如 Websocket），后续接收的数据全部转交给 `stream_reader`
+        '''
+
+        self.stream_reader = stream_reader
+        if self.start != self.end:
+            stream_reader.feed_data(self.read())
+        if self.is_eof:
+            stream_reader.feed_eof()
+        if self.is_reading_paused:
+            self.is_reading_paused = False
+            self.transport.resume_reading()
+
+    def write(self, data: bytes | bytearray | memoryview):
+        if self.is_closed:
+            raise ConnectionAbortedError()
+        self.transport.write(data)
+
+    def writelines(self, list_of_data: list[bytes | bytearray | memoryview]):
+        '''
+        将多个缓冲区按顺序写入连接，不在 Python 层拼接；头部、分块标记与响应体可以分别传入
+
+        传输层不支持向量写入时，总长度不超过 `buffer_size` 的数据拼接后一次写入，更大的数据逐个写入，避免复制响应体
+        '''
+
+        if self.is_closed:
+            raise ConnectionAbortedError()
+
+        if VECTORED_WRITELINES or sum(len(data) for data in list_of_data) <= self.buffer_size:
+            self.transport.writelines(list_of_data)
+        else:
+            for data in list_of_data:
+                self.transport.write(data)
+
+    async def sendfile(self, file: BinaryIO, offset: int = 0, count: int | None = None):
+        '''
+        使用 `os.sendfile` 将文件直接从内核发送至连接；TLS 连接会自动回退为分块读取发送
+        '''
+
+        if self.is_closed:
+            raise ConnectionAbortedError()
+        await asyncio.get_running_loop().sendfile(self.transport, file, offset, count)
+
+    async def drain(self):
+        if self.is_closed:
+            raise ConnectionAbortedError()
+
+        if self.is_writing_paused:
+            self.drain_waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.drain_waiter
+            finally:
+                self.drain_waiter = None
+
+    def close(self):
+        if self.transport is not None and self.is_closed is False:
+            self.transport.close()
+
+    async def wait_closed(self):
+        if self.close_waiter is not None:
+            await self.close_waiter
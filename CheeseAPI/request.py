@@ -1,28 +1,43 @@
-import socket, asyncio, urllib.parse, hashlib, base64, json, re
-from typing import TYPE_CHECKING, Literal, Callable, AsyncIterable
+import asyncio, urllib.parse, hashlib, base64, re, os, tempfile, inspect, zlib
+from typing import TYPE_CHECKING, Literal, Callable, AsyncIterable, BinaryIO, Any
+
+import brotli, zstandard
 
 from CheeseAPI.response import Response
 from CheeseAPI.file import File
+from CheeseAPI.multipart import MultipartParser, MultipartPart, MultipartError
+from CheeseAPI.headers import Headers
 
 if TYPE_CHECKING:
     from CheeseAPI.app import CheeseAPI
     from CheeseAPI.websocket import Websocket
+    from CheeseAPI.protocol import HttpProtocol
+    from CheeseAPI.route import RouteDict
 
 HTTP_METHOD_TYPE = Literal['CONNECT', 'DELETE', 'GET', 'HEAD', 'OPTIONS', 'PATCH', 'POST', 'PUT', 'TRACE', 'WEBSOCKET']
 
+class RequestBodyError(Exception):
+    '''
+    在迭代请求体时发生错误；`response` 为需要返回的响应，未被捕获时由框架直接返回
+    '''
+
+    def __init__(self, response: Response):
+        super().__init__(response.status)
+        self.response: Response = response
+
 class Request:
-    __slots__ = ('_proxy', '_ip', '_method', '_path', '_params', '_headers', '_query', '_body', '_json', '_form', '_files', '_cookies', '_full_path', '_ranges', '_fn')
+    __slots__ = ('_proxy', '_ip', '_method', '_path', '_params', '_headers', '_query', '_body', '_json', '_form', '_files', '_cookies', '_full_path', '_ranges', '_fn', '_body_file', '_addr', '_query_lists')
 
-    def __init__(self, app: 'CheeseAPI', client_socket: socket.socket, addr: tuple[str, int]):
-        self._proxy: RequestProxy = app.RequestProxy_Class(app, self, client_socket)
+    def __init__(self, app: 'CheeseAPI', connection: 'HttpProtocol', addr: tuple[str, int]):
+        self._proxy: RequestProxy = app.RequestProxy_Class(app, self, connection)
 
-        self._ip: str = addr[0]
+        self._ip: str | None = None
         self._method: HTTP_METHOD_TYPE | None = None
         self._path: str | None = None
         self._params: dict[str, str] | None = None
-        self._headers: dict[str, str] | None = None
+        self._headers: Headers | None = None
         self._query: dict[str, str] | None = None
-        self._body: bytes | str | None = None
+        self._body: bytes | bytearray | str | None = None
         self._json: dict | list | None = None
         self._form: dict[str, str] | None = None
         self._files: dict[str, File] | None = None
@@ -30,6 +45,9 @@ class Request:
         self._full_path: str | None = None
         self._ranges: list[tuple[int, int | None]] | None = None
         self._fn: Callable | AsyncIterable | 'Websocket' | None = None
+        self._body_file: File | None = None
+        self._addr: tuple[str, int] = addr
+        self._query_lists: dict[str, list[str]] | None = None
 
     async def recv_body(self, get_all: bool = False) -> bool | Response:
         '''
@@ -53,8 +71,66 @@ class Request:
 
         await self._proxy.parse_body()
 
+    def iter_parts(self, on_file_data: Callable[[MultipartPart, bytes], Any] | None = None) -> AsyncIterable[MultipartPart]:
+        '''
+        若在路由中设置了 `auto_recv_body = False`，可以使用此方法边接收边解析 multipart/form-data 请求体；每个分段接收完毕后产出，表单字段保存在内存中，文件分段写入临时文件，同时填充 `form` 与 `files`
+
+        ```python
+        @app.route.post('/upload', auto_recv_body = False)
+        async def upload(*, request: Request, **_):
+            async for part in request.iter_parts():
+                if part.file:
+                    part.file.save(f'./uploads/{part.filename}')
+        ```
+
+        - Args
+            - on_file_data: 文件分段的数据回调，参数为 `(part, data)`，支持异步函数；设置后文件分段不再写入临时文件
+
+        - Raises
+            - RequestBodyError: 请求体格式错误或超出限制；未被捕获时返回其中的响应
+        '''
+
+        return self._proxy.iter_parts(self.stream(), on_file_data)
+
+    def stream(self) -> AsyncIterable[bytes]:
+        '''
+        若在路由中设置了 `auto_recv_body = False`，可以使用此方法按到达顺序迭代请求体（已去除 chunked 编码），数据不会保存到 `body`；处理速度慢于接收速度时，连接会暂停读取，内存占用保持恒定
+
+        ```python
+        @app.route.put('/upload', auto_recv_body = False)
+        async def upload(*, request: Request, **_):
+            md5 = hashlib.md5()
+            async for data in request.stream():
+                md5.update(data)
+            return md5.hexdigest()
+        ```
+
+        若请求体已接收完毕，则迭代已接收的请求体；设置了 `Content-Encoding` 的请求体会被解压
+
+        - Raises
+            - RequestBodyError: 请求体格式错误或超出限制；未被捕获时返回其中的响应
+        '''
+
+        if self.body is not None or self.body_file is not None:
+            return self._proxy.iter_stored_body()
+        decoder = self._proxy.get_content_decoder()
+        if decoder is not None:
+            return self._proxy.iter_decoded_body(self._proxy.iter_body(), decoder)
+        return self._proxy.iter_body()
+
     @property
     def ip(self) -> str:
+        '''
+        优先使用 `X-Real-IP`，其次是 `X-Forwarded-For` 中的第一个地址；首次访问时解析
+        '''
+
+        if self._ip is None:
+            if self._headers and 'X-Real-IP' in self._headers:
+                self._ip = self._headers['X-Real-IP']
+            elif self._headers and 'X-Forwarded-For' in self._headers:
+                self._ip = self._headers['X-Forwarded-For'].split(',', 1)[0].strip()
+            else:
+                self._ip = self._addr[0]
         return self._ip
 
     @property
@@ -70,17 +146,51 @@ class Request:
         return self._params
 
     @property
-    def headers(self) -> dict[str, str] | None:
+    def headers(self) -> Headers | None:
+        '''
+        名称不区分大小写；同名头部的全部值通过 `headers.get_all(name)` 获取
+        '''
+
         return self._headers
 
     @property
     def query(self) -> dict[str, str] | None:
+        '''
+        同名参数只保留最后一个值，需要全部值时使用 `query_lists`；首次访问时解析
+        '''
+
+        if self._query is None and self._full_path is not None:
+            self._query = {key: value[-1] for key, value in self.query_lists.items()}
         return self._query
 
     @property
-    def body(self) -> bytes | str | None:
+    def query_lists(self) -> dict[str, list[str]] | None:
+        '''
+        包含同名参数的全部值，如 `?tag=a&tag=b` 为 `{'tag': ['a', 'b']}`；首次访问时解析
+        '''
+
+        if self._query_lists is None and self._full_path is not None:
+            self._query_lists = urllib.parse.parse_qs(self._full_path.partition('?')[2].partition('#')[0])
+        return self._query_lists
+
+    @property
+    def body(self) -> bytes | bytearray | str | None:
+        '''
+        未在接收缓冲区中完整收到的请求体会被直接接收到预先分配的 `bytearray` 中，接收完毕后在首次访问时转为 `bytes`；`recv_body(get_all = False)` 分块接收的过程中为正在写入的 `bytearray`
+        '''
+
+        if type(self._body) is bytearray and self._proxy.is_body_received:
+            self._body = bytes(self._body)
         return self._body
 
+    @property
+    def body_file(self) -> File | None:
+        '''
+        请求体超过 `app.spool_body_size` 时写入的临时文件，此时 `body` 为 None；请求结束后临时文件会被删除，需要保留时调用 `File.save`
+        '''
+
+        return self._body_file
+
     @property
     def json(self) -> dict | list | None:
         return self._json
@@ -95,6 +205,16 @@ class Request:
 
     @property
     def cookies(self) -> dict[str, str] | None:
+        '''
+        首次访问时解析；格式错误的项会被忽略
+        '''
+
+        if self._cookies is None and self._headers and 'Cookie' in self._headers:
+            self._cookies = {}
+            for cookie in self._headers['Cookie'].split(';'):
+                key, sep, value = cookie.strip().partition('=')
+                if sep:
+                    self._cookies[key] = value
         return self._cookies
 
     @property
@@ -103,187 +223,677 @@ class Request:
 
     @property
     def ranges(self) -> list[tuple[int, int | None]] | None:
+        '''
+        首次访问时解析；格式错误的 `Range` 会被忽略，即返回完整内容
+        '''
+
+        if self._ranges is None and self._headers and 'Range' in self._headers:
+            self._ranges = []
+            try:
+                for range_part in self._headers['Range'][6:].split(','):
+                    range_part = range_part.strip()
+                    if '-' in range_part:
+                        start, end = range_part.split('-', 1)
+                        self._ranges.append((int(start) if start else 0, int(end) if end else None))
+            except ValueError:
+                self._ranges.clear()
         return self._ranges
 
     @property
     def fn(self) -> Callable | AsyncIterable | 'Websocket' | None:
         return self._fn
 
+class ChunkedDecoder:
+    '''
+    可中断的分块传输解码器；每次调用 `feed` 都从上次停止的状态继续，只消费接收缓冲区中已有的数据
+    '''
+
+    __slots__ = ('state', 'remaining', 'chunk_count', 'length', 'body', 'file', 'trailers', 'max_body_size', 'max_chunk_count', 'max_trailer_size', 'spool_body_size', 'create_spool_file')
+
+    def __init__(self, max_body_size: int | None, max_chunk_count: int | None, max_trailer_size: int, spool_body_size: int | None = None, create_spool_file: Callable[[], BinaryIO] | None = None):
+        self.state: Literal['SIZE', 'DATA', 'DATA_END', 'TRAILER', 'DONE'] = 'SIZE'
+        self.remaining: int = 0
+        ''' 当前分块尚未接收的字节数 '''
+        self.chunk_count: int = 0
+        self.length: int = 0
+        ''' 已接收的请求体字节数 '''
+        self.body: bytearray | None = bytearray()
+        self.file: BinaryIO | None = None
+        ''' 请求体超过 `spool_body_size` 后转为写入的临时文件，此时 `body` 为 None '''
+        self.trailers: Headers = Headers()
+        self.max_body_size: int | None = max_body_size
+        self.max_chunk_count: int | None = max_chunk_count
+        self.max_trailer_size: int = max_trailer_size
+        self.spool_body_size: int | None = spool_body_size
+        self.create_spool_file: Callable[[], BinaryIO] | None = create_spool_file
+
+    @property
+    def is_done(self) -> bool:
+        return self.state == 'DONE'
+
+    def feed(self, connection: 'HttpProtocol') -> Response | None:
+        '''
+        - Returns
+            - Response: 分块格式错误或超出限制，需立即返回此响应
+        '''
+
+        while len(connection):
+            if self.state == 'SIZE':
+                index = connection.find(b'\r\n')
+                if index == -1:
+                    if len(connection) > 1024:
+                        return Response(status = 400)
+                    return
+
+                try:
+                    chunk_size = int(connection.read(index).split(b';', 1)[0], 16)
+                except ValueError:
+                    return Response(status = 400)
+                connection.skip(2)
+                if chunk_size < 0:
+                    return Response(status = 400)
+
+                if chunk_size == 0:
+                    self.state = 'TRAILER'
+                    continue
+
+                self.chunk_count += 1
+                if self.max_chunk_count is not None and self.chunk_count > self.max_chunk_count:
+                    return Response(status = 400)
+                if self.max_body_size is not None and self.length + chunk_size > self.max_body_size:
+                    return Response(status = 413)
+                if self.file is None and self.spool_body_size is not None and self.length + chunk_size > self.spool_body_size:
+                    self.file = self.create_spool_file()
+                    self.file.write(self.body)
+                    self.body = None
+                self.remaining = chunk_size
+                self.state = 'DATA'
+            elif self.state == 'DATA':
+                if self.file is not None:
+                    size = connection.write_to(self.file, self.remaining)
+                else:
+                    size = connection.extend_into(self.body, self.remaining)
+                self.remaining -= size
+                self.length += size
+                if self.remaining == 0:
+                    self.state = 'DATA_END'
+            elif self.state == 'DATA_END':
+                if len(connection) < 2:
+                    return
+                if connection.read(2) != b'\r\n':
+                    return Response(status = 400)
+                self.state = 'SIZE'
+            elif self.state == 'TRAILER':
+                if connection.find(b'\r\n') == 0:
+                    connection.skip(2)
+                    self.state = 'DONE'
+                    return
+
+                index = connection.find(b'\r\n\r\n')
+                if index == -1:
+                    if len(connection) > self.max_trailer_size:
+                        return Response(status = 400)
+                    return
+
+                try:
+                    self.trailers = Headers(connection.read(index))
+                except ValueError:
+                    return Response(status = 400)
+                connection.skip(4)
+                self.state = 'DONE'
+                return
+            else:
+                return
+
+class ContentDecoder:
+    '''
+    请求体 `Content-Encoding` 的流式解码器，支持 gzip、deflate、br、zstd 及其组合
+
+    解码后的大小不能超过 `max_size`，也不能超过已输入大小的 `max_ratio` 倍（前 1 MiB 不受压缩比限制）；每次解压的输出都以剩余的允许大小为上限，压缩炸弹不会在内存中展开
+    '''
+
+    __slots__ = ('decompressors', 'input_size', 'output_size', 'max_size', 'max_ratio')
+
+    def __init__(self, content_encoding: str, max_size: int | None, max_ratio: float | None):
+        '''
+        - Raises
+            - ValueError: 不支持的编码
+        '''
+
+        self.decompressors: list[tuple[str, Any]] = []
+        ''' 按解码顺序排列的 (编码, 解压器)，与 `Content-Encoding` 中的顺序相反 '''
+        for encoding in reversed(content_encoding.lower().split(',')):
+            encoding = encoding.strip()
+            if encoding in ('gzip', 'x-gzip'):
+                self.decompressors.append(('gzip', zlib.decompressobj(zlib.MAX_WBITS | 16)))
+            elif encoding == 'deflate':
+                self.decompressors.append(('deflate', None))
+            elif encoding == 'br':
+                self.decompressors.append(('br', brotli.Decompressor()))
+            elif encoding == 'zstd':
+                self.decompressors.append(('zstd', zstandard.ZstdDecompressor().decompressobj()))
+            elif encoding and encoding != 'identity':
+                raise ValueError(f'Unsupported content encoding: {encoding}')
+        self.input_size: int = 0
+        self.output_size: int = 0
+        self.max_size: int | None = max_size
+        self.max_ratio: float | None = max_ratio
+
+    def __bool__(self) -> bool:
+        return bool(self.decompressors)
+
+    def get_limit(self) -> int | None:
+        limit = self.max_size
+        if self.max_ratio is not None:
+            ratio_limit = max(int(self.input_size * self.max_ratio), 1048576)
+            limit = ratio_limit if limit is None else min(limit, ratio_limit)
+        return limit - self.output_size if limit is not None else None
+
+    def feed(self, data: bytes | bytearray | memoryview) -> bytes | Response:
+        '''
+        - Returns
+            - Response: 解码失败或超出限制，需立即返回此响应
+        '''
+
+        self.input_size += len(data)
+        limit = self.get_limit()
+        try:
+            for index, (encoding, decompressor) in enumerate(self.decompressors):
+                if not data:
+                    break
+
+                if encoding == 'deflate' and decompressor is None:
+                    # 部分客户端发送不带 zlib 头部的原始 deflate 数据
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS if data[0] & 0x0f == 8 else -zlib.MAX_WBITS)
+                    self.decompressors[index] = (encoding, decompressor)
+
+                if encoding in ('gzip', 'deflate'):
+                    data = decompressor.decompress(data, limit + 1) if limit is not None else decompressor.decompress(data)
+                elif encoding == 'br':
+                    data = decompressor.process(data, output_buffer_limit = limit + 1) if limit is not None else decompressor.process(data)
+                else:
+                    if limit is None:
+                        data = decompressor.decompress(data)
+                    else:
+                        # zstd 无法限制单次输出，按 1 KiB 分段输入并逐段检查
+                        output = bytearray()
+                        with memoryview(data) as view:
+                            for offset in range(0, len(view), 1024):
+                                output += decompressor.decompress(view[offset:offset + 1024])
+                                if len(output) > limit:
+                                    return Response(status = 413)
+                        data = bytes(output)
+
+                if limit is not None and len(data) > limit:
+                    return Response(status = 413)
+        except (zlib.error, brotli.error, zstandard.ZstdError):
+            return Response(status = 400)
+
+        self.output_size += len(data)
+        return data
+
+    def finish(self) -> Response | None:
+        '''
+        - Returns
+            - Response: 请求体在压缩数据结束之前结束
+        '''
+
+        if self.input_size == 0:
+            return
+
+        for encoding, decompressor in self.decompressors:
+            if decompressor is None or (decompressor.is_finished() if encoding == 'br' else decompressor.eof) is False:
+                return Response(status = 400)
+
 class RequestProxy:
-    __slots__ = ('app', 'request', 'client_socket', 'buffer', 'protocol')
+    __slots__ = ('app', 'request', 'connection', 'protocol', 'headers_length', 'max_body_size', 'is_closing', 'is_continue_expected', 'chunked_decoder', 'spool_files', 'route', 'is_body_received')
 
-    def __init__(self, app: 'CheeseAPI', request: Request, client_socket: socket.socket):
+    def __init__(self, app: 'CheeseAPI', request: Request, connection: 'HttpProtocol'):
         self.app: 'CheeseAPI' = app
         self.request: Request = request
 
-        self.client_socket: socket.socket = client_socket
-        self.buffer: bytes = b''
+        self.connection: 'HttpProtocol' = connection
         self.protocol: Literal['HTTP/1.0', 'HTTP/1.1'] | None = None
+        self.headers_length: int = 0
+        ''' 头部（不含结束标记）在接收缓冲区中的长度 '''
+        self.max_body_size: int | None = app.max_body_size
+        ''' 由路由的 `max_body_size` 覆盖 '''
+        self.is_closing: bool = False
+        ''' 请求体未被完整读取时，响应后关闭连接 '''
+        self.is_continue_expected: bool = False
+        ''' 客户端发送了 `Expect: 100-continue`，且尚未回复 `100 Continue` '''
+        self.chunked_decoder: ChunkedDecoder | None = None
+        self.spool_files: list[str] = []
+        ''' 本次请求创建的临时文件，请求结束后删除 '''
+        self.route: 'RouteDict' | None = None
+        ''' 匹配到的路由 '''
+        self.is_body_received: bool = False
+        ''' 请求体是否已从连接中完整读取 '''
 
     async def recv_headers(self, keep_alive: bool) -> Response | None:
-        loop = asyncio.get_event_loop()
-        while b'\r\n\r\n' not in self.buffer:
-            data = await asyncio.wait_for(loop.sock_recv(self.client_socket, self.app.socket_receive_buffer_size), self.app.keep_alive_timeout if keep_alive else self.app.request_timeout)
-
-            if not data:
-                raise ConnectionAbortedError()
-
-            self.buffer += data
-
-    async def parse_headers(self):
-        header_data, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
-        lines = header_data.decode().split('\r\n')
-
-        base_info = lines[0].split(' ')
-        self.request._method = base_info[0]
-        if base_info[1].startswith('//'):
-            base_info[1] = base_info[1][1:]
-        self.request._full_path = base_info[1]
-        full_path = urllib.parse.urlparse(base_info[1])
-        self.request._path = full_path.path
-        self.request._query = dict(urllib.parse.parse_qsl(full_path.query))
-        self.protocol = base_info[2] if len(base_info) > 2 else 'HTTP/1.1'
-
-        self.request._headers = {}
-        for line in lines[1:]:
-            key, value = line.split(': ', 1)
-            self.request.headers[key] = value
-
-        if 'Cookie' in self.request.headers:
-            self.request._cookies = {}
-            for cookie in self.request.headers['Cookie'].split(';'):
-                key, value = cookie.strip().split('=', 1)
-                self.request.cookies[key] = value
-
-        if 'X-Real-IP' in self.request.headers:
-            self.request._ip = self.request.headers['X-Real-IP']
-        elif 'X-Forwarded-For' in self.request.headers:
-            self.request._ip = self.request.headers['X-Forwarded-For'].split(',')[0].strip()
-
-        if 'Range' in self.request.headers:
-            self.request._ranges = []
-            for range_part in self.request.headers['Range'][6:].split(','):
-                range_part = range_part.strip()
-                if '-' in range_part:
-                    start, end = range_part.split('-', 1)
-                    self.request.ranges.append((int(start) if start else 0, int(end) if end else None))
-
-        if 'Upgrade' in self.request.headers and self.request.headers['Upgrade'] == 'websocket':
+        '''
+        每次收到数据后仅从上次扫描的位置继续查找头部结束标记；头部超过 `max_header_size` 时返回 431
+        '''
+
+        offset = 0
+        while True:
+            index = self.connection.find(b'\r\n\r\n', offset)
+            if index != -1:
+                if index > self.app.max_header_size:
+                    return Response(status = 431)
+                self.headers_length = index
+                return
+
+            if len(self.connection) > self.app.max_header_size:
+                return Response(status = 431)
+
+            offset = max(len(self.connection) - 3, 0)
+            await self.connection.recv(self.app.keep_alive_timeout if keep_alive else self.app.request_timeout)
+
+    async def parse_headers(self) -> Response | None:
+        data = self.connection.read(self.headers_length)
+        self.connection.skip(4)
+        if data.count(b'\r\n') > self.app.max_header_count:
+            return Response(status = 431)
+
+        index = data.find(b'\r\n')
+        base_info = (data[:index] if index != -1 else data).split(b' ')
+        self.request._method = base_info[0].decode()
+        full_path = base_info[1].decode()
+        if full_path.startswith('//'):
+            full_path = full_path[1:]
+        self.request._full_path = full_path
+        path = full_path.partition('?')[0].partition('#')[0]
+        if not path.startswith('/'):
+            path = urllib.parse.urlsplit(full_path).path
+        self.request._path = path
+        self.protocol = base_info[2].decode() if len(base_info) > 2 else 'HTTP/1.1'
+
+        self.request._headers = Headers(data[index + 2:] if index != -1 else b'')
+
+        if 'Upgrade' in self.request.headers and self.request.headers['Upgrade'].lower() == 'websocket':
             self.request._method = 'WEBSOCKET'
 
+        if 'Expect' in self.request.headers and self.protocol == 'HTTP/1.1':
+            if self.request.headers['Expect'].lower() != '100-continue':
+                self.is_closing = True
+                return Response(status = 417)
+            if self.request.headers.get('Content-Length', '0') != '0' or 'Transfer-Encoding' in self.request.headers:
+                self.is_continue_expected = True
+
     async def recv_body(self, get_all: bool = False) -> bool | Response | None:
-        loop = asyncio.get_event_loop()
+        content_length = self.check_content_length()
+        if type(content_length) is Response:
+            return content_length
+        if content_length is not None:
+            self.send_continue()
+
+            if self.app.spool_body_size is not None and content_length > self.app.spool_body_size:
+                with self.create_spool_file() as file:
+                    remaining = content_length
+                    while remaining:
+                        if not len(self.connection):
+                            await self.connection.recv(self.app.request_timeout)
+                        remaining -= self.connection.write_to(file, remaining)
+                self.request._body_file = self.get_spool_file(file.name)
+            elif len(self.connection) >= content_length:
+                self.request._body = self.connection.read(content_length)
+            else:
+                body = bytearray(content_length)
+                await self.connection.recv_into(memoryview(body), self.app.request_timeout)
+                self.request._body = body
+            self.is_body_received = True
+            return self.decode_body()
+
+        if (self.request.headers.get('Transfer-Encoding') or '').lower() == 'chunked':
+            if self.chunked_decoder is None:
+                self.chunked_decoder = ChunkedDecoder(self.max_body_size, self.app.max_chunk_count, self.app.max_header_size, self.app.spool_body_size, self.create_spool_file)
+                self.send_continue()
 
-        content_length = self.request.headers.get('Content-Length')
-        if content_length:
-            self.request._body = self.buffer
-            self.buffer = b''
-            content_length = int(content_length)
-            while len(self.request._body) < content_length:
-                data = None
-                try:
-                    data = await asyncio.wait_for(loop.sock_recv(self.client_socket, self.app.socket_receive_buffer_size), self.app.request_timeout)
-                except asyncio.TimeoutError:
-                    raise
-                if not data:
-                    raise ConnectionAbortedError()
+            while True:
+                length = self.chunked_decoder.length
+                response = self.chunked_decoder.feed(self.connection)
+                if response:
+                    self.is_closing = True
+                    return response
+
+                if self.chunked_decoder.is_done:
+                    self.is_body_received = True
+                    self.request._body = self.chunked_decoder.body
+                    self.chunked_decoder.body = None
+                    content_md5 = self.chunked_decoder.trailers.get('Content-MD5')
+                    if self.chunked_decoder.file is not None:
+                        self.chunked_decoder.file.close()
+                        self.request._body_file = self.get_spool_file(self.chunked_decoder.file.name)
+                        if content_md5:
+                            body_md5 = hashlib.md5()
+                            with open(self.request._body_file.path, 'rb') as f:
+                                while data := f.read(1048576):
+                                    body_md5.update(data)
+                            body_md5 = body_md5.digest()
+                    elif content_md5:
+                        body_md5 = hashlib.md5(self.request._body).digest()
+                    if content_md5 and content_md5 not in (base64.b64encode(body_md5).decode(), body_md5.hex()):
+                        return Response(status = 400)
+                    return self.decode_body()
+
+                if not get_all and self.chunked_decoder.length > length:
+                    # 接收过程中直接暴露解码器正在写入的 bytearray，不复制已接收的数据
+                    self.request._body = self.chunked_decoder.body
+                    return False
+
+                await self.connection.recv(self.app.request_timeout)
+
+    def get_content_decoder(self) -> ContentDecoder | None:
+        '''
+        - Raises
+            - RequestBodyError: 不支持的 `Content-Encoding`，返回 415
+        '''
+
+        content_encoding = self.request.headers.get('Content-Encoding')
+        if not content_encoding or not self.app.decompress_body:
+            return
+
+        try:
+            max_size = min((size for size in (self.max_body_size, self.app.max_decompressed_size) if size is not None), default = None)
+            decoder = ContentDecoder(content_encoding, max_size, self.app.max_decompression_ratio)
+        except ValueError:
+            self.is_closing = True
+            raise RequestBodyError(Response(status = 415))
+        return decoder or None
+
+    def decode_body(self) -> Literal[True] | Response:
+        '''
+        解码已完整接收的请求体；写入临时文件的请求体会被分块解码到新的临时文件。解码后移除 `Content-Encoding` 并更新 `Content-Length`
+        '''
+
+        try:
+            decoder = self.get_content_decoder()
+        except RequestBodyError as e:
+            self.is_closing = False
+            return e.response
+        if decoder is None:
             return True
 
-        is_chunked = self.request.headers.get('Transfer-Encoding') == 'chunked'
-        if is_chunked:
-            if self.request._body is None:
-                self.request._body = b''
+        if self.request.body_file is not None:
+            with open(self.request.body_file.path, 'rb') as f, self.create_spool_file() as file:
+                while data := f.read(1048576):
+                    data = decoder.feed(data)
+                    if type(data) is Response:
+                        return data
+                    file.write(data)
+            self.request._body_file = self.get_spool_file(file.name)
+        else:
+            data = decoder.feed(self.request._body)
+            if type(data) is Response:
+                return data
+            self.request._body = data
+
+        response = decoder.finish()
+        if response:
+            return response
+
+        del self.request.headers['Content-Encoding']
+        self.request.headers['Content-Length'] = str(decoder.output_size)
+        return True
+
+    async def iter_decoded_body(self, body: AsyncIterable[bytes], decoder: ContentDecoder) -> AsyncIterable[bytes]:
+        '''
+        - Raises
+            - RequestBodyError: 解码失败或超出限制
+        '''
+
+        async for data in body:
+            data = decoder.feed(data)
+            if type(data) is Response:
+                self.is_closing = True
+                raise RequestBodyError(data)
+            if data:
+                yield data
+
+        response = decoder.finish()
+        if response:
+            raise RequestBodyError(response)
+
+    def create_spool_file(self) -> BinaryIO:
+        file = tempfile.NamedTemporaryFile(prefix = 'CheeseAPI-', dir = self.app.spool_dir, delete = False)
+        self.spool_files.append(file.name)
+        return file
+
+    def get_spool_file(self, path: str, name: str | None = None) -> File:
+        file = File(path, name = name)
+        file._is_temporary = True
+        return file
+
+    def remove_spool_files(self):
+        for path in self.spool_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                ...
+        self.spool_files.clear()
+
+    def send_continue(self):
+        '''
+        客户端等待 `100 Continue` 时，在开始读取请求体前发送；未读取请求体便返回最终响应时，不会发送，请求体也不会被接收
+        '''
+
+        if self.is_continue_expected:
+            self.is_continue_expected = False
+            self.connection.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+    def check_content_length(self) -> int | Response | None:
+        '''
+        在读取请求体之前解析并检查 `Content-Length`；不合法或超出 `max_body_size` 时，响应后关闭连接
 
+        - Returns
+            - int: 请求体的字节数
+            - Response: `Content-Length` 不合法（400）或超出 `max_body_size`（413）
+            - None: 未设置 `Content-Length`
+        '''
+
+        content_length = self.request.headers.get('Content-Length')
+        if content_length is None:
+            return None
+        if not content_length.isascii() or not content_length.isdigit():
+            self.is_closing = True
+            return Response(status = 400)
+        content_length = int(content_length)
+        if self.max_body_size is not None and content_length > self.max_body_size:
+            self.is_closing = True
+            return Response(status = 413)
+        return content_length
+
+    async def iter_body(self) -> AsyncIterable[bytes]:
+        '''
+        按到达顺序产出请求体数据，不在内存中累积
+
+        - Raises
+            - RequestBodyError: 请求体格式错误或超出限制
+        '''
+
+        content_length = self.check_content_length()
+        if type(content_length) is Response:
+            raise RequestBodyError(content_length)
+        if content_length is not None:
+            self.send_continue()
+
+            # 请求体未读完前中断时，剩余数据会留在连接中，因此响应后需要关闭连接
+            self.is_closing = True
+            while content_length:
+                if not len(self.connection):
+                    await self.connection.recv(self.app.request_timeout)
+                data = self.connection.read(content_length)
+                content_length -= len(data)
+                yield data
+            self.is_closing = False
+            self.is_body_received = True
+        elif (self.request.headers.get('Transfer-Encoding') or '').lower() == 'chunked':
+            decoder = ChunkedDecoder(self.max_body_size, self.app.max_chunk_count, self.app.max_header_size)
+            self.send_continue()
+            self.is_closing = True
             while True:
-                while b'\r\n' not in self.buffer:
-                    try:
-                        data = await asyncio.wait_for(loop.sock_recv(self.client_socket, self.app.socket_receive_buffer_size), self.app.request_timeout)
-                    except asyncio.TimeoutError:
-                        raise ConnectionAbortedError()
-                    self.buffer += data
-
-                chunk_size, self.buffer = self.buffer.split(b'\r\n', 1)
-                try:
-                    chunk_size = int(chunk_size.decode().split(';')[0], 16)
-                except:
-                    return Response(status = 400)
+                response = decoder.feed(self.connection)
+                if response:
+                    self.is_closing = True
+                    raise RequestBodyError(response)
+
+                if decoder.body:
+                    data = bytes(decoder.body)
+                    decoder.body.clear()
+                    yield data
+                    # 迭代暂停期间可能已收到新的数据
+                    continue
 
-                if chunk_size == 0:
-                    if self.request.headers.get('Trailer'):
-                        while b'\r\n\r\n' not in self.buffer:
-                            try:
-                                data = await asyncio.wait_for(loop.sock_recv(self.client_socket, self.app.socket_receive_buffer_size), self.app.request_timeout)
-                            except asyncio.TimeoutError:
-                                return Response(status = 408)
-                            if not data:
-                                raise ConnectionAbortedError()
-                            self.buffer += data
-
-                        trailer, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
-                        if trailer and trailer.startswith('Content-MD5: ') and trailer[13:] not in (base64.b64encode(hashlib.md5(self.request._body).digest()).decode(), hashlib.md5(self.request._body).hexdigest()):
-                            return Response(status = 400)
-
-                    self.buffer = b''
-                    return True
-
-                chunk_size = chunk_size + 2
-                while len(self.buffer) < chunk_size:
-                    data = await asyncio.wait_for(loop.sock_recv(self.client_socket, self.app.socket_receive_buffer_size), self.app.request_timeout)
-                    if not data:
-                        raise ConnectionAbortedError()
-                    self.buffer += data
-
-                self.request._body += self.buffer[:chunk_size - 2]
-                self.buffer = self.buffer[chunk_size:]
-                if not get_all:
-                    return False
+                if decoder.is_done:
+                    self.is_closing = False
+                    self.is_body_received = True
+                    return
+                await self.connection.recv(self.app.request_timeout)
+
+    async def discard_body(self) -> bool:
+        '''
+        接收并丢弃响应后仍未被读取的请求体，避免其被当作同一连接上的下一个请求解析
+
+        - Returns
+            - False: 请求体超过 `app.max_discard_body_size`、格式错误或接收超时，需要关闭连接
+        '''
+
+        if self.is_body_received or self.request.headers is None:
+            return True
+
+        try:
+            content_length = self.check_content_length()
+            if content_length is not None:
+                if type(content_length) is Response or content_length > self.app.max_discard_body_size:
+                    raise ValueError()
+                while content_length:
+                    if not len(self.connection):
+                        await self.connection.recv(self.app.request_timeout)
+                    size = min(content_length, len(self.connection))
+                    self.connection.skip(size)
+                    content_length -= size
+            elif (self.request.headers.get('Transfer-Encoding') or '').lower() == 'chunked':
+                decoder = self.chunked_decoder or ChunkedDecoder(None, self.app.max_chunk_count, self.app.max_header_size)
+                decoder.max_body_size = decoder.length + self.app.max_discard_body_size
+                decoder.spool_body_size = None
+                while True:
+                    if decoder.feed(self.connection):
+                        raise ValueError()
+                    if decoder.body:
+                        decoder.body.clear()
+                    if decoder.is_done:
+                        break
+                    await self.connection.recv(self.app.request_timeout)
+        except (ValueError, asyncio.TimeoutError):
+            self.is_closing = True
+            return False
+
+        self.is_body_received = True
+        return True
+
+    async def iter_stored_body(self) -> AsyncIterable[bytes]:
+        '''
+        产出已接收的请求体；写入临时文件的请求体按块读取，内存中的请求体直接产出接收缓冲区，不转为 `bytes`
+        '''
+
+        if self.request.body_file is not None:
+            with open(self.request.body_file.path, 'rb') as f:
+                while data := f.read(1048576):
+                    yield data
+        elif self.request._body is not None:
+            yield self.request._body
+
+    async def iter_parts(self, body: AsyncIterable[bytes], on_file_data: Callable[[MultipartPart, bytes], Any] | None = None, spool_files: bool = True) -> AsyncIterable[MultipartPart]:
+        '''
+        - Args
+            - spool_files: 文件分段是否写入临时文件，若否则保存在内存中
+
+        - Raises
+            - RequestBodyError: 请求体格式错误或超出限制
+        '''
+
+        content_type = self.request.headers.get('Content-Type') or ''
+        boundary = re.search(r'boundary="?([^";]+)"?', content_type)
+        if not content_type.startswith('multipart/form-data') or boundary is None:
+            raise RequestBodyError(Response(status = 400))
+
+        parser = MultipartParser(boundary.group(1).strip(), self.app.max_header_size)
+        file = None
+        value = None
+        try:
+            async for data in body:
+                for event, part, chunk in parser.feed(data):
+                    if event == 'BEGIN':
+                        if part.filename is not None and on_file_data is None and spool_files:
+                            file = self.create_spool_file()
+                        else:
+                            value = bytearray()
+                    elif event == 'DATA':
+                        if part.filename is not None and on_file_data is not None:
+                            result = on_file_data(part, chunk)
+                            if inspect.isawaitable(result):
+                                await result
+                        elif file is not None:
+                            file.write(chunk)
+                        else:
+                            value += chunk
+                    else:
+                        if part.filename is not None:
+                            if file is not None:
+                                file.close()
+                                part.file = self.get_spool_file(file.name, part.filename)
+                                file = None
+                            elif on_file_data is None:
+                                part.file = File(part.filename, bytes(value))
+
+                            if part.file is not None and part.name:
+                                if self.request._files is None:
+                                    self.request._files = {}
+                                self.request._files[part.name] = part.file
+                        else:
+                            part.value = value.decode()
+                            if part.name:
+                                if self.request._form is None:
+                                    self.request._form = {}
+                                self.request._form[part.name] = part.value
+                        value = None
+                        yield part
+            parser.finish()
+        except MultipartError:
+            self.is_closing = True
+            raise RequestBodyError(Response(status = 400))
+        finally:
+            if file is not None:
+                file.close()
 
     async def parse_body(self):
-        if self.request.body is None:
+        if self.request._body is None and self.request.body_file is None:
             return
 
         content_type = self.request.headers.get('Content-Type')
-        if content_type == 'text/plain' or content_type is None:
-            self.request._body = self.request.body.decode()
+        if content_type and content_type.startswith('multipart/form-data'):
+            async for _ in self.iter_parts(self.iter_stored_body(), spool_files = self.request.body_file is not None):
+                ...
+        elif self.request.body_file is not None:
+            if content_type == 'application/json':
+                with open(self.request.body_file.path, 'rb') as f:
+                    self.request._json = self.app._proxy.json_loads(f.read())
+            elif content_type == 'application/x-www-form-urlencoded':
+                with open(self.request.body_file.path, 'rb') as f:
+                    self.request._form = {
+                        key: value[0] for key, value in urllib.parse.parse_qs(f.read().decode()).items()
+                    }
+        elif content_type == 'text/plain' or content_type is None:
+            self.request._body = self.request._body.decode()
         elif content_type == 'application/json':
-            self.request._json = json.loads(self.request.body)
+            self.request._json = self.app._proxy.json_loads(self.request.body)
         elif content_type == 'application/x-www-form-urlencoded':
             self.request._form = {
-                key: value[0] for key, value in urllib.parse.parse_qs(self.request.body.decode()).items()
+                key: value[0] for key, value in urllib.parse.parse_qs(self.request._body.decode()).items()
             }
-        elif content_type.startswith('multipart/form-data'):
-            for part in self.request.body.split(f'--{content_type.split("boundary=")[1].strip()}'.encode()):
-                if part == b'' or part == b'--\r\n':
-                    continue
-
-                headers, data = part.split(b'\r\n\r\n', 1)
-                if data.endswith(b'\r\n'):
-                    data = data[:-2]
-
-                name = None
-                filename = None
-                for line in headers.decode().strip().split('\r\n'):
-                    if line.startswith('Content-Disposition:'):
-                        name_match = re.search(r'name="([^"]*)"', line)
-                        if name_match:
-                            name = name_match.group(1)
-
-                        filename_match = re.search(r'filename="([^"]*)"', line)
-                        if filename_match:
-                            filename = filename_match.group(1)
-                        break
-
-                if name:
-                    if filename:
-                        if self.request._files is None:
-                            self.request._files = {}
-                        self.request._files[name] = File(filename, data)
-                    else:
-                        if self.request._form is None:
-                            self.request._form = {}
-                        self.request._form[name] = data.decode()
 
-        if self.request.headers.get('Content-Disposition'):
+        if self.request.body_file is None and self.request.headers.get('Content-Disposition'):
             match = re.search(r'filename="([^"]*)"', self.request.headers['Content-Disposition'])
             if match:
                 self.request._file = File(match.group(1), self.request.body)
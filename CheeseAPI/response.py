@@ -1,5 +1,5 @@
-import socket, asyncio, datetime, json, zlib, gzip, os, mimetypes, uuid, math
-from typing import TYPE_CHECKING, TypedDict, Literal, AsyncIterable
+import datetime, zlib, gzip, os, mimetypes, uuid, functools, hashlib, email.utils
+from typing import TYPE_CHECKING, TypedDict, Literal, AsyncIterable, Hashable, Callable
 
 import brotli, zstandard
 
@@ -9,6 +9,7 @@ if TYPE_CHECKING:
     from CheeseAPI.app import CheeseAPI
     from CheeseAPI.request import Request
     from CheeseAPI.websocket import Websocket
+    from CheeseAPI.protocol import HttpProtocol
 
 HTTP_STATUS = {
     100: 'Continue',
@@ -74,6 +75,31 @@ HTTP_STATUS = {
     511: 'Network Authentication Required'
 }
 NO_BODY_STATUS = (100, 101, 102, 204, 304)
+COMPRESSIBLE_TYPES = ('text/plain', 'text/html', 'text/css', 'text/javascript', 'text/xml', 'text/csv', 'text/markdown', 'application/json', 'application/javascript', 'application/xml', 'application/wasm', 'image/svg+xml', 'image/bmp')
+STATUS_LINES: dict[int, bytes] = {status: f'HTTP/1.1 {status} {reason}\r\n'.encode() for status, reason in HTTP_STATUS.items()}
+CRLF = b'\r\n'
+LAST_CHUNK = b'0\r\n\r\n'
+DEFAULT_CHUNKED_SIZE: int = 65536
+''' `FileResponse` 分块传输时默认的每块大小 '''
+CHUNK_SIZE_LINES: dict[int, bytes] = {size: f'{size:x}\r\n'.encode() for size in (1024, 4096, 8192, 16384, 32768, 65536, 1048576)}
+''' 常见分块大小对应的长度行 '''
+HEADER_LINES: dict[tuple[str, str], bytes] = {(key, value): f'{key}: {value}\r\n'.encode() for key, value in (
+    ('Connection', 'keep-alive'),
+    ('Connection', 'close'),
+    ('Content-Type', 'application/json; charset=utf-8'),
+    ('Content-Type', 'text/plain; charset=utf-8'),
+    ('Content-Type', 'text/html; charset=utf-8'),
+    ('Content-Type', 'application/octet-stream; charset=utf-8'),
+    ('Transfer-Encoding', 'chunked'),
+    ('Content-Encoding', 'gzip'),
+    ('Content-Encoding', 'br'),
+    ('Content-Encoding', 'zstd'),
+    ('Content-Encoding', 'deflate'),
+    ('Vary', 'Accept-Encoding'),
+    ('Accept-Ranges', 'bytes'),
+    ('Content-Length', '0')
+)}
+''' 常见的头部行，序列化时直接复用 '''
 PREVIEWABLE_TYPES = ('text/plain', 'text/html', 'text/css', 'text/javascript', 'application/json', 'application/xml', 'text/xml', 'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/svg+xml', 'image/webp', 'image/bmp', 'video/mp4', 'video/webm', 'video/ogg', 'audio/mpeg', 'audio/ogg', 'audio/wav', 'audio/webm', 'application/pdf')
 
 class Cookie(TypedDict):
@@ -85,25 +111,29 @@ class Cookie(TypedDict):
     http_only: bool | None
 
 class Response:
-    __slots__ = ('status', '_proxy', 'body', 'headers', 'cookies', 'high_precision_date', 'compress', 'compress_level')
+    __slots__ = ('status', '_proxy', 'body', 'headers', 'cookies', 'high_precision_date', 'compress', 'compress_level', 'compress_cache_key', 'etag')
 
-    def __init__(self, body: dict | list | str | bytes | AsyncIterable | None = None, status: int = 200, headers: dict[str, str] = {}, *, high_precision_date: bool = False, compress: Literal['gzip', 'deflate', 'br', 'zstd'] | None = None, compress_level: int | None = None):
+    def __init__(self, body: dict | list | str | bytes | AsyncIterable | None = None, status: int = 200, headers: dict[str, str] = {}, *, high_precision_date: bool = False, compress: Literal['gzip', 'deflate', 'br', 'zstd'] | None = None, compress_level: int | None = None, compress_cache_key: Hashable | None = None, etag: bool = False):
         '''
         - Args
-            - body: 当为 `AsyncIterable` 时，自动使用 chunked 传输编码
+            - body: 当为 `AsyncIterable` 时，自动使用 chunked 传输编码；若协商出压缩算法，整个响应共用一个压缩流，并在每个分块结束时刷新
             - headers: 若某些特殊 headers 被设置，则不会被框架自动处理
             - high_precision_date: 是否使用高精度时间戳
             - compress: 强制使用的压缩算法，若不指定则根据请求头自动协商
             - compress_level: 压缩等级；每种算法的取值范围不同，请参考相应文档
+            - compress_cache_key: 压缩结果的缓存键；相同缓存键的响应体应当完全相同，压缩后的数据会被缓存并复用
+            - etag: 是否根据响应体的哈希生成 `ETag`；与请求头 `If-None-Match` 匹配时返回 304，不再压缩与发送响应体
         '''
 
         self.status: int = status
         self.body: dict | list | str | bytes | AsyncIterable | None = body
-        self.headers: dict[str, str] = headers
+        self.headers: dict[str, str] = dict(headers)
         self.cookies: dict[str, Cookie] = {}
         self.high_precision_date: bool = high_precision_date
         self.compress: Literal['gzip', 'deflate', 'br', 'zstd'] | None = compress
         self.compress_level: int | None = compress_level
+        self.compress_cache_key: Hashable | None = compress_cache_key
+        self.etag: bool = etag
 
         self._proxy: ResponseProxy | None = None
 
@@ -124,120 +154,404 @@ class RedirectResponse(Response):
         super().__init__(status, body, headers)
 
 class FileResponse(Response):
-    __slots__ = ('file', 'preview', 'transmission_type', 'chunked_size')
+    __slots__ = ('file', 'preview', 'transmission_type', 'chunked_size', 'precompressed_files')
 
-    def __init__(self, file_path_or_file: str | File, *, status: int = 200, headers: dict[str, str] = {}, preview: bool = True, transmission_type: Literal['CONTENT_LENGTH', 'CHUNKED'] = 'CONTENT_LENGTH', chunked_size: int | None = None, compress: Literal['gzip', 'deflate', 'br', 'zstd'] | None = None, compress_level: int | None = None):
+    def __init__(self, file_path_or_file: str | File, *, status: int = 200, headers: dict[str, str] = {}, preview: bool = True, transmission_type: Literal['CONTENT_LENGTH', 'CHUNKED', 'SENDFILE'] = 'CONTENT_LENGTH', chunked_size: int | None = None, compress: Literal['gzip', 'deflate', 'br', 'zstd'] | None = None, compress_level: int | None = None, precompressed_files: dict[Literal['gzip', 'deflate', 'br', 'zstd'], str | File] | None = None):
         '''
         - Args
             - preview: 优先预览文件
-            - transmission_type: 传输方式，'CONTENT_LENGTH' 使用 Content-Length 头，'CHUNKED' 使用分块传输编码
-            - chunked_size: 分块传输时每块的大小
+            - transmission_type: 传输方式，'CONTENT_LENGTH' 使用 Content-Length 头，'CHUNKED' 使用分块传输编码，'SENDFILE' 使用 Content-Length 头并由内核直接发送文件，不读入内存；文件可压缩且协商了压缩算法时，'SENDFILE' 改为压缩后发送：小于 `app.compress_stream_min_length` 的文件整体压缩并缓存压缩结果，更大的文件按 `chunked_size` 分块读取并流式压缩，以分块传输编码发送
+            - chunked_size: 分块传输时每块的大小，默认为 64 KiB
+            - headers: 未设置 `ETag` 与 `Last-Modified` 时，根据文件状态（内存中的文件则根据内容哈希）自动生成，并在请求头 `If-None-Match` 或 `If-Modified-Since` 匹配时返回 304
+            - precompressed_files: 预压缩文件，格式为 `{压缩算法: 文件路径或 File}`；客户端支持对应算法时直接发送该文件，不再压缩
         '''
 
         super().__init__(status = status, headers = headers, compress = compress, compress_level = compress_level)
 
         self.file: File = File(file_path_or_file) if isinstance(file_path_or_file, str) else file_path_or_file
         self.preview: bool = preview
-        self.transmission_type: Literal['CONTENT_LENGTH', 'CHUNKED'] = transmission_type
+        self.transmission_type: Literal['CONTENT_LENGTH', 'CHUNKED', 'SENDFILE'] = transmission_type
         self.chunked_size: int | None = chunked_size
+        self.precompressed_files: dict[Literal['gzip', 'deflate', 'br', 'zstd'], str | File] | None = precompressed_files
+
+class FrozenResponse(Response):
+    '''
+    不可变的响应；在注册为路由或首次发送时序列化一次，包括状态行、头部、响应体以及各压缩算法的压缩版本。之后的每次请求只补上 Date 与 Connection 头部并直接写入连接，不再经过 `get_status`、`get_headers`、`get_body` 与 `get_encode_body`
+
+    适用于每次返回完全相同内容的路由，如 robots.txt、健康检查与功能开关；不支持 `AsyncIterable` 响应体与 `set_cookie`，序列化后再修改属性不会生效
+    '''
+
+    __slots__ = ('_app', '_headers', '_body', '_status_line', '_variants', '_is_compressible', '_validators', '_not_modified', '_encoded_not_modified', '_keep_alive_lines')
+
+    def __init__(self, body: dict | list | str | bytes | None = None, status: int = 200, headers: dict[str, str] = {}, *, compress: Literal['gzip', 'deflate', 'br', 'zstd'] | None = None, compress_level: int | None = None, etag: bool = False):
+        '''
+        - Args
+            - headers: `Date`、`Connection` 与 `Keep-Alive` 在每次请求时生成，不能设置
+            - compress: 只生成该算法的压缩版本并总是发送它；若不指定则为 `app.compress` 中的每种算法各生成一份，根据请求头 `Accept-Encoding` 选择
+            - etag: 是否根据响应体的哈希生成 `ETag`；与请求头 `If-None-Match` 匹配时发送预先序列化的 304
+
+        - Raises
+            - TypeError: 响应体为 `AsyncIterable`
+        '''
+
+        if isinstance(body, AsyncIterable):
+            raise TypeError('FrozenResponse does not support AsyncIterable body')
+
+        super().__init__(body, status, headers, compress = compress, compress_level = compress_level, etag = etag)
+
+        self._app: 'CheeseAPI' | None = None
+        self._headers: dict[str, str] = {}
+        self._body: bytes = b''
+        ''' 序列化后未压缩的响应体 '''
+        self._status_line: bytes = b''
+        self._variants: dict[str | None, tuple[bytes, bytes]] = {}
+        ''' 压缩算法（不压缩时为 None）到 (状态行与头部, 响应体) 的映射；头部不含 Date、Connection 与结尾的空行 '''
+        self._is_compressible: bool = False
+        self._validators: dict[str, str] = {}
+        ''' 用于条件请求的 `ETag` 与 `Last-Modified` '''
+        self._not_modified: bytes | None = None
+        self._encoded_not_modified: bytes | None = None
+        ''' 发送压缩版本时的 304，`ETag` 与压缩版本相同为弱 ETag '''
+        self._keep_alive_lines: bytes = b''
+
+    def set_cookie(self, *args, **kwargs):
+        '''
+        - Raises
+            - TypeError: 总是抛出；请直接设置 `Set-Cookie` 头部
+        '''
+
+        raise TypeError('FrozenResponse does not support set_cookie')
+
+    def freeze(self, app: 'CheeseAPI', encodings: list[Literal['gzip', 'deflate', 'br', 'zstd']] | None = None):
+        '''
+        序列化响应；对同一个 app 只执行一次
+
+        - Args
+            - encodings: 立即生成的压缩版本；为 None 时生成 `app.compress` 中的全部算法，其余算法在首次被请求时生成
+        '''
+
+        if self._app is app:
+            return
+
+        headers = {key: value for key, value in self.headers.items() if key not in ('Date', 'Connection', 'Keep-Alive')}
+        body = self.body
+        if self.status in NO_BODY_STATUS:
+            body = b''
+        elif isinstance(body, (dict, list)):
+            body = app._proxy.json_dumps(body)
+            headers.setdefault('Content-Type', 'application/json; charset=utf-8')
+        elif isinstance(body, str):
+            body = body.encode()
+            headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+        elif body is None:
+            body = HTTP_STATUS[self.status].encode()
+            headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+        else:
+            headers.setdefault('Content-Type', 'application/octet-stream; charset=utf-8')
+
+        if self.etag and self.status == 200:
+            headers.setdefault('ETag', ResponseProxy.get_etag(body))
+
+        self._app = app
+        self._headers = headers
+        self._body = body
+        self._status_line = STATUS_LINES.get(self.status) or f'HTTP/1.1 {self.status} {HTTP_STATUS[self.status]}\r\n'.encode()
+        self._variants = {}
+        self._is_compressible = bool(app.compress) and self.compress is None and self.status not in NO_BODY_STATUS and 'Content-Encoding' not in headers and len(body) > app.compress_min_length
+        if self.compress is not None and self.status not in NO_BODY_STATUS and 'Content-Encoding' not in headers:
+            self.add_variant(self.compress, ResponseProxy.get_compress_fn(self.compress, self.get_compress_level())(body))
+        else:
+            self.add_variant(None, body)
+            if self._is_compressible:
+                for encoding in app.compress if encodings is None else encodings:
+                    self.add_variant(encoding, ResponseProxy.get_compress_fn(encoding, self.get_compress_level())(body))
+
+        self._validators = {key: headers[key] for key in ('ETag', 'Last-Modified') if key in headers}
+        self._not_modified = self._encoded_not_modified = None
+        if self._validators:
+            vary = HEADER_LINES[('Vary', 'Accept-Encoding')] if self._is_compressible else b''
+            self._not_modified = STATUS_LINES[304] + b''.join(f'{key}: {value}\r\n'.encode() for key, value in self._validators.items()) + vary
+            validators = dict(self._validators)
+            if 'ETag' in validators and not validators['ETag'].startswith('W/'):
+                validators['ETag'] = 'W/' + validators['ETag']
+            self._encoded_not_modified = STATUS_LINES[304] + b''.join(f'{key}: {value}\r\n'.encode() for key, value in validators.items()) + vary
+        self._keep_alive_lines = HEADER_LINES[('Connection', 'keep-alive')] + f'Keep-Alive: timeout={app.keep_alive_timeout}, max={app.keep_alive_max_requests}\r\n'.encode()
+
+    def get_compress_level(self) -> int:
+        return self.compress_level if self.compress_level is not None else self._app.compress_level
+
+    def add_variant(self, encoding: Literal['gzip', 'deflate', 'br', 'zstd'] | None, data: bytes) -> tuple[bytes, bytes]:
+        '''
+        序列化一个版本的状态行与头部；压缩后没有变小的版本直接复用不压缩的版本
+        '''
+
+        if encoding is not None and self._is_compressible and len(data) >= len(self._body):
+            variant = self._variants[encoding] = self._variants[None]
+            return variant
+
+        headers = dict(self._headers)
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+            if 'ETag' in headers and not headers['ETag'].startswith('W/'):
+                headers['ETag'] = 'W/' + headers['ETag']
+        if self._is_compressible:
+            headers.setdefault('Vary', 'Accept-Encoding')
+        if self.status not in NO_BODY_STATUS:
+            headers['Content-Length'] = str(len(data))
+        variant = self._variants[encoding] = (self._status_line + b''.join(f'{key}: {value}\r\n'.encode() for key, value in headers.items()), data)
+        return variant
+
+    async def get_variant(self, encoding: Literal['gzip', 'deflate', 'br', 'zstd']) -> tuple[bytes, bytes]:
+        '''
+        获取对应压缩算法的版本，尚未生成时压缩并保存；较大的响应体在压缩线程池中压缩
+        '''
+
+        variant = self._variants.get(encoding)
+        if variant is None:
+            fn = ResponseProxy.get_compress_fn(encoding, self.get_compress_level())
+            if self._app._proxy.compress_executor is not None and len(self._body) >= self._app.compress_executor_min_length:
+                data = await self._app._proxy.run_compress(fn, self._body)
+            else:
+                data = fn(self._body)
+            variant = self.add_variant(encoding, data)
+        return variant
+
+class StreamEncoder:
+    '''
+    整个响应共用一个压缩器，每个分块结束时同步刷新，客户端可以立即解压已收到的数据
+    '''
+
+    __slots__ = ('encoding', 'compressor')
+
+    def __init__(self, encoding: Literal['gzip', 'deflate', 'br', 'zstd'], compress_level: int):
+        self.encoding: Literal['gzip', 'deflate', 'br', 'zstd'] = encoding
+        if encoding == 'gzip':
+            self.compressor = zlib.compressobj(compress_level, zlib.DEFLATED, 31)
+        elif encoding == 'deflate':
+            self.compressor = zlib.compressobj(compress_level)
+        elif encoding == 'br':
+            self.compressor = brotli.Compressor(quality = compress_level)
+        elif encoding == 'zstd':
+            self.compressor = zstandard.ZstdCompressor(level = compress_level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding in ('gzip', 'deflate'):
+            return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        elif self.encoding == 'br':
+            return self.compressor.process(data) + self.compressor.flush()
+        elif self.encoding == 'zstd':
+            return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
 
 class ResponseProxy:
-    __slots__ = ('app', 'response', 'request', 'websocket')
+    __slots__ = ('app', 'response', 'request', 'websocket', 'sendfile', 'is_precompressed')
+
+    def __init__(self, app: 'CheeseAPI', response: Response, request: 'Request | None' = None):
+        '''
+        - Args
+            - request: `FrozenResponse` 在多个请求间共用，其 `ResponseProxy` 只属于一次发送，不会保存到 `response._proxy`
+        '''
 
-    def __init__(self, app: 'CheeseAPI', response: Response):
         self.app: 'CheeseAPI' = app
         self.response: Response = response
-        self.response._proxy = self
+        if not isinstance(response, FrozenResponse):
+            self.response._proxy = self
 
-        self.request: 'Request' | None = None
+        self.request: 'Request' | None = request
         self.websocket: 'Websocket' | None = None
+        self.sendfile: tuple[int, int] | None = None
+        ''' 使用 sendfile 发送的文件区间 `(offset, count)` '''
+        self.is_precompressed: bool = False
+        ''' 响应体是否为预压缩文件，预压缩文件不会再次压缩 '''
 
-    async def send(self, client_socket: socket.socket):
-        loop = asyncio.get_event_loop()
-        no_body = self.response.status in NO_BODY_STATUS or (self.request and self.request.method == 'HEAD')
+    async def send(self, connection: 'HttpProtocol'):
+        if isinstance(self.response, FrozenResponse):
+            await self.send_frozen(connection)
+            return
 
         status, headers, body = await self.get_status(self.response.status, self.response.headers, self.response.body)
         status, headers, body = await self.get_headers(status, headers, body)
+        no_body = status in NO_BODY_STATUS or (self.request and self.request.method == 'HEAD')
         gen = self.get_body(status, headers, body)
         if not no_body:
             status, headers, data = await anext(gen)
+            no_body = status in NO_BODY_STATUS
 
-        bytes = [f'HTTP/1.1 {status} {HTTP_STATUS[status]}']
-        bytes.extend(f'{key}: {value}' for key, value in headers.items())
-        bytes.extend(['', ''])
-        bytes = '\r\n'.join(bytes).encode()
-        if not no_body:
-            if self.response.headers.get('Transfer-Encoding') == 'chunked':
-                bytes += hex(len(data)).encode() + b'\r\n' + data + b'\r\n'
+        if 'Content-Encoding' in headers and 'ETag' in headers and not headers['ETag'].startswith('W/'):
+            headers['ETag'] = 'W/' + headers['ETag']
+
+        is_chunked = headers.get('Transfer-Encoding') == 'chunked'
+        buffers = [self.serialize_headers(status, headers)]
+        if not no_body and data:
+            if is_chunked:
+                buffers += self.chunk(data)
             else:
-                bytes += data
-        await loop.sock_sendall(client_socket, bytes)
+                buffers.append(data)
+        connection.writelines(buffers)
+        await connection.drain()
 
         if not no_body:
-            if self.response.headers.get('Transfer-Encoding') == 'chunked':
+            if self.sendfile is not None:
+                if self.response.file._handler is not None:
+                    await connection.sendfile(self.response.file._handler, *self.sendfile)
+                else:
+                    with open(self.response.file.path, 'rb') as f:
+                        await connection.sendfile(f, *self.sendfile)
+            elif is_chunked:
                 async for _, _, data in gen:
-                    await loop.sock_sendall(client_socket, hex(len(data)).encode() + b'\r\n' + data + b'\r\n')
-                await loop.sock_sendall(client_socket, b'0\r\n\r\n')
+                    if not data:
+                        continue
+                    connection.writelines(self.chunk(data))
+                    await connection.drain()
+                connection.write(LAST_CHUNK)
+                await connection.drain()
             elif self.request.ranges:
                 async for _, _, data in gen:
-                    await loop.sock_sendall(client_socket, data)
+                    connection.write(data)
+                    await connection.drain()
 
         if self.request.method != 'WEBSOCKET':
             self.app.printer.response(self.request, self.response)
 
+    async def send_frozen(self, connection: 'HttpProtocol'):
+        '''
+        根据请求头选择 `FrozenResponse` 预先序列化的版本，只补上 Date 与 Connection 头部后写入连接
+        '''
+
+        response: FrozenResponse = self.response
+        response.freeze(self.app)
+
+        head, body = response._variants.get(None) or next(iter(response._variants.values()))
+        if response._is_compressible:
+            encodings = self.get_accept_encodings()
+            if encodings:
+                head, body = await response.get_variant(encodings[0])
+
+        if response._not_modified is not None and self.is_not_modified(response._validators):
+            # 与将要发送的版本使用相同的 ETag
+            head, body = response._not_modified if body is response._body else response._encoded_not_modified, b''
+
+        buffers = [head, self.app._proxy.date_line or f'Date: {email.utils.formatdate(usegmt = True)}\r\n'.encode(), response._keep_alive_lines if self.is_keep_alive() else HEADER_LINES[('Connection', 'close')], CRLF]
+        if body and self.request.method != 'HEAD':
+            buffers.append(body)
+        connection.writelines(buffers)
+        await connection.drain()
+
+        self.app.printer.response(self.request, self.response)
+
+    @staticmethod
+    def chunk(data: bytes) -> tuple[bytes, bytes, bytes]:
+        '''
+        返回分块传输中一个数据块的 (长度行, 数据, 结束标记)，交由 `writelines` 发送，不复制数据
+        '''
+
+        return CHUNK_SIZE_LINES.get(len(data)) or f'{len(data):x}\r\n'.encode(), data, CRLF
+
+    def serialize_headers(self, status: int, headers: dict[str, str]) -> bytearray:
+        '''
+        将状态行与头部直接写入 bytearray；状态行、常见头部行与当前秒的 Date 行均使用预先编码的 bytes
+
+        每次返回新的 bytearray：写入传输层后（如 TLS 连接）可能仍被引用，不能复用
+        '''
+
+        data = bytearray(STATUS_LINES.get(status) or f'HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n'.encode())
+        date = self.app._proxy.date
+        for key, value in headers.items():
+            line = HEADER_LINES.get((key, value))
+            if line is not None:
+                data += line
+            elif key == 'Date' and value is date:
+                data += self.app._proxy.date_line
+            else:
+                data += f'{key}: {value}\r\n'.encode()
+        data += b'\r\n'
+        return data
+
     async def get_status(self, status: int, headers: dict[str, str], body: dict | list | str | bytes | None) -> tuple[int, dict[str, str], dict | list | str | bytes | None]:
         if isinstance(self.response, FileResponse):
-            if self.request.headers.get('Range') is not None:
-                max_range = -1
-                for range in self.request.ranges:
-                    if range[1] is not None:
-                        max_range = max(max_range, range[1])
-                max_range += 1
+            if 'ETag' not in headers or 'Last-Modified' not in headers:
                 if self.response.file._data is not None:
-                    if len(self.response.file.data) < max_range:
-                        status = 416
+                    headers.setdefault('ETag', self.get_etag(self.response.file._data))
                 else:
-                    if os.path.getsize(self.response.file.path) < max_range:
+                    etag, last_modified = self.get_file_validators(self.get_file_stat())
+                    headers.setdefault('ETag', etag)
+                    headers.setdefault('Last-Modified', last_modified)
+
+            if status == 200 and self.is_not_modified(headers):
+                return 304, headers, body
+
+            if self.request.headers.get('Range') is not None:
+                size = len(self.response.file.data) if self.response.file._data is not None else self.get_file_stat().st_size
+                for start, end in self.request.ranges:
+                    if start >= size or (end is not None and end < start):
                         status = 416
+                        headers['Content-Range'] = f'bytes */{size}'
+                        break
+                if status == 200 and self.request.ranges:
+                    status = 206
 
         return status, headers, body
 
     async def file_response_chunked_body(self) -> AsyncIterable[bytes]:
         self.response: FileResponse
+        chunked_size = self.response.chunked_size or DEFAULT_CHUNKED_SIZE
         if self.response.file._data is None:
             with open(self.response.file.path, 'rb') as f:
                 while True:
-                    chunk = f.read(self.response.chunked_size)
+                    chunk = f.read(chunked_size)
                     if not chunk:
                         break
 
                     yield chunk
         else:
-            for i in range(0, len(self.response.file.data), self.response.chunked_size):
-                yield self.response.file.data[i:i + self.response.chunked_size]
+            for i in range(0, len(self.response.file.data), chunked_size):
+                yield self.response.file.data[i:i + chunked_size]
 
     async def get_headers(self, status: int, headers: dict[str, str], body: dict | list | str | bytes | None) -> tuple[int, dict[str, str], dict | list | str | bytes | None]:
         if isinstance(self.response, FileResponse):
-            if self.response.transmission_type == 'CONTENT_LENGTH':
-                body = self.response.file.data
-            elif self.response.transmission_type == 'CHUNKED':
-                body = self.file_response_chunked_body()
-
             if 'Content-Type' not in headers and 'Content-Disposition' not in headers:
                 mime_type = mimetypes.guess_type(self.response.file.name)[0] or 'application/octet-stream'
                 headers['Content-Type'] = f'{mime_type}; charset=utf-8'
                 headers['Content-Disposition'] = f'{"inline" if self.response.preview and mime_type in PREVIEWABLE_TYPES else "attachment"}; filename="{self.response.file.name}"'
 
-        if isinstance(self.response.body, AsyncIterable):
+            if self.response.precompressed_files and self.response.compress is None and 'Content-Encoding' not in headers and not self.request.ranges:
+                for encoding in self.get_accept_encodings():
+                    if encoding in self.response.precompressed_files:
+                        headers.setdefault('Vary', 'Accept-Encoding')
+                        if status == 304:
+                            if 'ETag' in headers and not headers['ETag'].startswith('W/'):
+                                headers['ETag'] = 'W/' + headers['ETag']
+                            break
+                        headers['Content-Encoding'] = encoding
+                        file = self.response.precompressed_files[encoding]
+                        self.response.file = file if isinstance(file, File) else File(file)
+                        self.is_precompressed = True
+                        break
+
+            if status in (304, 416):
+                ...
+            elif self.response.transmission_type == 'CONTENT_LENGTH' or (self.response.transmission_type == 'SENDFILE' and self.response.file._data is not None):
+                body = self.response.file.data
+            elif self.response.transmission_type == 'CHUNKED':
+                body = self.file_response_chunked_body()
+
+        if isinstance(body, AsyncIterable):
             if 'Transfer-Encoding' not in headers:
                 headers['Transfer-Encoding'] = 'chunked'
 
         if 'Date' not in headers:
-            now = datetime.datetime.now(datetime.timezone.utc)
-            headers['Date'] = (now.strftime('%a, %d %b %Y %H:%M:%S.') + f'{now.microsecond:06d} GMT') if self.response.high_precision_date else now.strftime('%a, %d %b %Y %H:%M:%S GMT')
+            if self.response.high_precision_date:
+                now = datetime.datetime.now(datetime.timezone.utc)
+                headers['Date'] = now.strftime('%a, %d %b %Y %H:%M:%S.') + f'{now.microsecond:06d} GMT'
+            else:
+                headers['Date'] = self.app._proxy.date or email.utils.formatdate(usegmt = True)
 
         if 'Connection' not in headers:
-            if self.app.keep_alive and self.request and ((self.request._proxy.protocol == 'HTTP/1.1' and self.request.headers.get('Connection', '') != 'close') or (self.request._proxy.protocol == 'HTTP/1.0' and self.request.headers.get('Connection', '') == 'keep-alive')):
+            if self.is_keep_alive():
                 headers['Connection'] = 'keep-alive'
                 headers['Keep-Alive'] = f'timeout={self.app.keep_alive_timeout}, max={self.app.keep_alive_max_requests}'
             else:
@@ -246,40 +560,13 @@ class ResponseProxy:
         if self.request.ranges:
             if status == 206:
                 headers.setdefault('Accept-Ranges', 'bytes')
-        else:
-            encodings = []
-            encoding_quality = False
-            if self.app.compress and self.request and self.request.headers and self.request.headers.get('Accept-Encoding'):
-                for encoding in self.request.headers.get('Accept-Encoding').split(','):
-                    encoding_split = encoding.strip().split(';')
-                    if len(encoding_split) == 1:
-                        encoding_split.append(1)
-                    else:
-                        encoding_quality = True
-                        encoding_split[1] = float(encoding_split[1].split('=')[1])
-                    encodings.append(encoding_split)
-                encodings.sort(key = lambda x: float(x[1]), reverse = True)
-                encodings = [encoding[0] for encoding in encodings]
-
+        elif status not in NO_BODY_STATUS:
             if self.response.compress is not None:
                 headers.setdefault('Content-Encoding', self.response.compress)
-            elif encodings:
-                if encoding_quality is True:
-                    for encoding in encodings:
-                        if encoding in self.app.compress:
-                            headers.setdefault('Content-Encoding', encoding)
-                            break
-                        if encoding == '*':
-                            headers.setdefault('Content-Encoding', self.app.compress[0])
-                            break
-                else:
-                    if encodings[0] == '*':
-                        headers.setdefault('Content-Encoding', self.app.compress[0])
-                    else:
-                        for encoding in self.app.compress:
-                            if encoding in encodings:
-                                headers.setdefault('Content-Encoding', encoding)
-                                break
+            else:
+                encodings = self.get_accept_encodings()
+                if encodings:
+                    headers.setdefault('Content-Encoding', encodings[0])
 
         if self.response.cookies and 'Set-Cookie' not in headers:
             cookies = []
@@ -300,21 +587,82 @@ class ResponseProxy:
 
         return status, headers, body
 
+    def is_keep_alive(self) -> bool:
+        '''
+        响应发送后是否保持连接
+        '''
+
+        return self.app.keep_alive and self.request is not None and self.request.headers is not None and not self.request._proxy.is_closing and not self.request._proxy.is_continue_expected and ((self.request._proxy.protocol == 'HTTP/1.1' and self.request.headers.get('Connection', '').lower() != 'close') or (self.request._proxy.protocol == 'HTTP/1.0' and self.request.headers.get('Connection', '').lower() == 'keep-alive'))
+
+    def get_accept_encodings(self) -> list[Literal['gzip', 'br', 'zstd', 'deflate']]:
+        '''
+        根据请求头 `Accept-Encoding` 返回可用的压缩算法，按优先级排序；未指定权重时以 `app.compress` 的顺序为准
+        '''
+
+        if not self.app.compress or not self.request or not self.request.headers or not self.request.headers.get('Accept-Encoding'):
+            return []
+
+        encodings = []
+        encoding_quality = False
+        for encoding in self.request.headers.get('Accept-Encoding').split(','):
+            encoding_split = encoding.strip().lower().split(';')
+            if len(encoding_split) == 1:
+                encoding_split.append(1)
+            else:
+                encoding_quality = True
+                encoding_split[1] = float(encoding_split[1].split('=')[1])
+            if encoding_split[1] > 0:
+                encodings.append(encoding_split)
+        encodings.sort(key = lambda x: float(x[1]), reverse = True)
+        encodings = [encoding[0] for encoding in encodings]
+        if not encodings:
+            return []
+
+        if encoding_quality is True:
+            result = []
+            for encoding in encodings:
+                if encoding == '*':
+                    result.extend(_encoding for _encoding in self.app.compress if _encoding not in result and _encoding not in encodings)
+                elif encoding in self.app.compress and encoding not in result:
+                    result.append(encoding)
+            return result
+        elif encodings[0] == '*':
+            return list(self.app.compress)
+        else:
+            return [encoding for encoding in self.app.compress if encoding in encodings]
+
     async def get_body(self, status: int, headers: dict[str, str], body: dict | list | str | bytes | AsyncIterable | None) -> AsyncIterable[tuple[int, dict[str, str], bytes]]:
-        if type(self.response) is FileResponse and self.request.ranges and status != 416:
+        if type(self.response) is FileResponse and self.response.transmission_type == 'SENDFILE' and self.response.file._data is None and status != 416 and (len(self.request.ranges) == 1 if self.request.ranges else (self.is_precompressed or not ('Content-Encoding' in headers and mimetypes.guess_type(self.response.file.name)[0] in COMPRESSIBLE_TYPES))):
+            size = self.get_file_stat().st_size
+            if self.request.ranges:
+                start = self.request.ranges[0][0]
+                end = min(self.request.ranges[0][1] if self.request.ranges[0][1] is not None else size - 1, size - 1)
+                headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+                self.sendfile = (start, end - start + 1)
+            else:
+                if 'Content-Encoding' in headers and self.is_precompressed is False:
+                    del headers['Content-Encoding']
+                self.sendfile = (0, size)
+            headers['Content-Length'] = str(self.sendfile[1])
+            yield status, headers, b''
+        elif type(self.response) is FileResponse and self.request.ranges and status != 416:
             if self.response.file._data is None:
                 handler = open(self.response.file.path, 'rb')
             if len(self.request.ranges) == 1:
                 if self.response.file._data is not None:
                     size = len(self.response.file.data)
-                    data = self.response.file.data[self.request.ranges[0][0] or 0:self.request.ranges[0][1] or len(self.response.file.data) + 1]
                 else:
-                    size = os.path.getsize(self.response.file.path)
-                    handler.seek(self.request.ranges[0][0] or 0)
-                    data = handler.read((self.request.ranges[0][1] or size) - (self.request.ranges[0][0]))
+                    size = self.get_file_stat().st_size
+                start = self.request.ranges[0][0]
+                end = min(self.request.ranges[0][1] if self.request.ranges[0][1] is not None else size - 1, size - 1)
+                if self.response.file._data is not None:
+                    data = self.response.file.data[start:end + 1]
+                else:
+                    handler.seek(start)
+                    data = handler.read(end - start + 1)
                     handler.close()
                 headers['Content-Length'] = str(len(data))
-                headers['Content-Range'] = f'bytes {self.request.ranges[0][0]}-{(self.request.ranges[0][1] or size) - 1}/{size}'
+                headers['Content-Range'] = f'bytes {start}-{end}/{size}'
                 yield status, headers, data
             else:
                 boundary = uuid.uuid4().hex
@@ -323,32 +671,49 @@ class ResponseProxy:
                 if self.response.file._data is not None:
                     size = len(self.response.file.data)
                 else:
-                    size = os.path.getsize(self.response.file.path)
+                    size = self.get_file_stat().st_size
 
-                content_length = 0
-                for range in self.request.ranges:
-                    content_length += 2 + 32 + 2 + 14 + len(content_type) + 2 + 21 + (1 if range[0] == 0 else int(math.log10(range[0]))) + 1 + 1 + int(math.log10(range[1] or size)) + 1 + 1 + int(math.log10(size)) + 1 + 4 + (range[1] or size) - range[0] + 1
-                headers['Content-Length'] = str(content_length)
+                # 每个部分为 `--boundary`、部分头部、空行、数据与 CRLF，最后以 `--boundary--` 与 CRLF 结束；Content-Range 与读取范围均使用包含结尾的区间
+                parts = []
+                for start, end in self.request.ranges:
+                    end = min(end if end is not None else size - 1, size - 1)
+                    parts.append((f'--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n'.encode(), start, end))
+                last_part = f'--{boundary}--\r\n'.encode()
+                headers['Content-Length'] = str(sum(len(head) + end - start + 1 + len(CRLF) for head, start, end in parts) + len(last_part))
 
-                for range in self.request.ranges:
-                    data = [b'--', boundary.encode(), b'\r\n', b'Content-Type: ', content_type.encode(), b'\r\n', b'Content-Range: bytes ', str(range[0]).encode(), b'-', str(range[1] or size).encode(), b'/', str(size).encode() + b'\r\n\r\n']
+                for head, start, end in parts:
                     if self.response.file._data is not None:
-                        data.append(self.response.file.data[range[0]:range[1] or size + 1])
+                        data = self.response.file.data[start:end + 1]
                     else:
-                        handler.seek(range[0])
-                        data.append(handler.read((range[1] or size) - (range[0])))
-                    yield status, headers, b''.join(data)
+                        handler.seek(start)
+                        data = handler.read(end - start + 1)
+                    yield status, headers, head + data + CRLF
                 if self.response.file._data is None:
                     handler.close()
-                yield status, headers, b'--' + boundary.encode() + b'--'
+                yield status, headers, last_part
         else:
+            if body is None and isinstance(self.response, FileResponse) and self.response.transmission_type == 'SENDFILE' and status != 416:
+                if self.response.file._data is None and self.get_file_stat().st_size >= self.app.compress_stream_min_length:
+                    # 大文件逐块读取并流式压缩，不读入内存，也不进入压缩缓存
+                    headers.pop('Content-Length', None)
+                    headers['Transfer-Encoding'] = 'chunked'
+                    body = self.file_response_chunked_body()
+                else:
+                    key = self.get_compress_cache_key(headers)
+                    data = self.app._proxy.compress_cache.get(key) if key is not None else None
+                    if data is not None:
+                        headers['Content-Length'] = str(len(data))
+                        yield status, headers, data
+                        return
+                    body = self.response.file.data
+
             if isinstance(body, AsyncIterable):
-                data = await anext(body)
+                data = await anext(body, b'')
             else:
                 data = body
 
             if isinstance(data, (dict, list)):
-                data = json.dumps(data).encode()
+                data = self.app._proxy.json_dumps(data)
                 headers.setdefault('Content-Type', 'application/json; charset=utf-8')
             elif isinstance(data, str):
                 data = data.encode()
@@ -359,39 +724,167 @@ class ResponseProxy:
             elif isinstance(data, bytes):
                 headers.setdefault('Content-Type', 'application/octet-stream; charset=utf-8')
 
-            if isinstance(body, AsyncIterable) is False:
-                headers['Content-Length'] = str(len(data))
-
-            status, headers, data = await self.get_encode_body(status, headers, data)
-            if isinstance(body, AsyncIterable) is False:
-                headers['Content-Length'] = str(len(data))
-            yield status, headers, data
-
             if isinstance(body, AsyncIterable):
+                encoder = self.get_stream_encoder(headers)
+                if encoder is not None:
+                    data = encoder.compress(data)
+                yield status, headers, data
+
                 async for data in body:
                     if isinstance(data, (dict, list)):
-                        data = json.dumps(data).encode()
+                        data = self.app._proxy.json_dumps(data)
                     elif isinstance(data, str):
                         data = data.encode()
-                    status, headers, data = await self.get_encode_body(status, headers, data)
+                    if encoder is not None:
+                        data = encoder.compress(data)
                     yield status, headers, data
 
-    async def get_encode_body(self, status: int, headers: dict[str, str], body: bytes) -> tuple[int, dict[str, str], bytes]:
-        content_length = headers.get('Content-Length')
-        if content_length and int(content_length) < self.app.compress_min_length:
-            if 'Content-Encoding' in headers:
+                if encoder is not None:
+                    yield status, headers, encoder.finish()
+            else:
+                headers['Content-Length'] = str(len(data))
+                if self.response.etag and status == 200:
+                    headers.setdefault('ETag', self.get_etag(data))
+                    if self.is_not_modified(headers):
+                        # 304 携带与 200 相同的 ETag：响应体会被压缩时使用弱 ETag，但不携带 Content-Encoding
+                        if self.is_encoded(headers) and not headers['ETag'].startswith('W/'):
+                            headers['ETag'] = 'W/' + headers['ETag']
+                        headers.pop('Content-Encoding', None)
+                        del headers['Content-Length']
+                        yield 304, headers, b''
+                        return
+
+                status, headers, data = await self.get_encode_body(status, headers, data)
+                headers['Content-Length'] = str(len(data))
+                yield status, headers, data
+
+    def get_stream_encoder(self, headers: dict[str, str]) -> 'StreamEncoder | None':
+        '''
+        分块传输时无法预知响应体长度，只要协商出压缩算法就对整个响应使用同一个压缩流
+        '''
+
+        if headers.get('Content-Encoding') not in ('gzip', 'deflate', 'br', 'zstd'):
+            if 'Content-Encoding' in headers and self.response.compress is None:
                 del headers['Content-Encoding']
+            return None
+
+        return StreamEncoder(headers['Content-Encoding'], self.response.compress_level if self.response.compress_level is not None else self.app.compress_level)
+
+    @staticmethod
+    def get_file_validators(stat: os.stat_result) -> tuple[str, str]:
+        '''
+        根据文件状态生成 `(ETag, Last-Modified)`
+        '''
+
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', email.utils.formatdate(stat.st_mtime, usegmt = True)
+
+    @staticmethod
+    def get_etag(data: bytes) -> str:
+        '''
+        根据内容哈希生成 `ETag`
+        '''
+
+        return f'"{hashlib.blake2b(data, digest_size = 16).hexdigest()}"'
+
+    def is_not_modified(self, headers: dict[str, str]) -> bool:
+        '''
+        仅处理 GET 与 HEAD 请求；`If-None-Match` 优先于 `If-Modified-Since`，`ETag` 使用弱比较
+        '''
+
+        if not self.request or self.request.method not in ('GET', 'HEAD'):
+            return False
+
+        if_none_match = self.request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            etag = headers.get('ETag')
+            if etag is None:
+                return False
+            if if_none_match.strip() == '*':
+                return True
+            etag = etag.removeprefix('W/')
+            return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+        if_modified_since = self.request.headers.get('If-Modified-Since')
+        last_modified = headers.get('Last-Modified')
+        if if_modified_since and last_modified:
+            try:
+                return email.utils.parsedate_to_datetime(last_modified) <= email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def get_file_stat(self) -> os.stat_result:
+        '''
+        优先使用静态文件缓存中的文件状态，避免重复访问文件系统
+        '''
+
+        return self.response.file._stat or os.stat(self.response.file.path)
+
+    def get_compress_cache_key(self, headers: dict[str, str]) -> tuple | None:
+        '''
+        `FileResponse` 以 `(文件路径, 修改时间, 文件大小, 压缩算法, 压缩等级)` 作为缓存键；其他响应仅在设置了 `compress_cache_key` 时缓存
+        '''
+
+        if self.app._proxy.compress_cache is None or 'Content-Encoding' not in headers or self.is_precompressed:
+            return None
+
+        compress_level = self.response.compress_level if self.response.compress_level is not None else self.app.compress_level
+        if self.response.compress_cache_key is not None:
+            return (self.response.compress_cache_key, headers['Content-Encoding'], compress_level)
+        if isinstance(self.response, FileResponse) and self.response.file._data is None:
+            stat = self.get_file_stat()
+            return (self.response.file.path, stat.st_mtime_ns, stat.st_size, headers['Content-Encoding'], compress_level)
+        return None
+
+    @staticmethod
+    def get_compress_fn(encoding: str, compress_level: int) -> Callable[[bytes], bytes] | None:
+        '''
+        返回对应压缩算法的一次性压缩函数；不支持的算法返回 None
+        '''
+
+        if encoding == 'gzip':
+            return functools.partial(gzip.compress, compresslevel = compress_level)
+        elif encoding == 'deflate':
+            return functools.partial(zlib.compress, level = compress_level)
+        elif encoding == 'br':
+            return functools.partial(brotli.compress, quality = compress_level)
+        elif encoding == 'zstd':
+            return zstandard.ZstdCompressor(level = compress_level).compress
+        return None
+
+    def is_encoded(self, headers: dict[str, str]) -> bool:
+        '''
+        `get_encode_body` 是否会按 `Content-Encoding` 压缩长度为 `Content-Length` 的响应体；不压缩时 `Content-Encoding` 会被移除
+        '''
+
+        content_length = headers.get('Content-Length')
+        if 'Content-Encoding' not in headers or not content_length:
+            return False
+
+        content_length = int(content_length)
+        return content_length >= self.app.compress_min_length and (content_length > self.app.compress_min_length or self.response.compress is not None)
+
+    async def get_encode_body(self, status: int, headers: dict[str, str], body: bytes) -> tuple[int, dict[str, str], bytes]:
+        if self.is_precompressed:
+            return status, headers, body
+
+        if self.is_encoded(headers):
+            fn = self.get_compress_fn(headers['Content-Encoding'], self.response.compress_level if self.response.compress_level is not None else self.app.compress_level)
+
+            key = self.get_compress_cache_key(headers)
+            data = self.app._proxy.compress_cache.get(key) if key is not None else None
+            if data is not None:
+                body = data
+            elif fn is None:
+                ...
+            else:
+                if self.app._proxy.compress_executor is not None and len(body) >= self.app.compress_executor_min_length:
+                    body = await self.app._proxy.run_compress(fn, body)
+                else:
+                    body = fn(body)
 
-        if 'Content-Encoding' in headers and 'Content-Length' in headers and (int(headers['Content-Length']) > self.app.compress_min_length or self.response.compress is not None):
-            compress_level = self.response.compress_level if self.response.compress_level is not None else self.app.compress_level
-            if headers['Content-Encoding'] == 'gzip':
-                body = gzip.compress(body, compress_level)
-            elif headers['Content-Encoding'] == 'deflate':
-                body = zlib.compress(body, level = compress_level)
-            elif headers['Content-Encoding'] == 'br':
-                body = brotli.compress(body, quality = compress_level)
-            elif headers['Content-Encoding'] == 'zstd':
-                body = zstandard.ZstdCompressor(level = compress_level).compress(body)
+                if key is not None:
+                    self.app._proxy.compress_cache.set(key, body)
 
             headers['Content-Length'] = str(len(body))
         else:
@@ -2,6 +2,8 @@ import re, uuid
 from typing import Literal, TypedDict, Callable, TYPE_CHECKING, AsyncIterable, Union
 
 from CheeseAPI.cors import CORS
+from CheeseAPI.response import FrozenResponse
+from CheeseAPI.cache import ResponseCache, SingleFlight
 
 if TYPE_CHECKING:
     from CheeseAPI.websocket import Websocket
@@ -18,10 +20,13 @@ class Pattern(TypedDict):
     key: str
 
 class RouteDict(TypedDict):
-    fn: Callable | 'Websocket'
+    fn: Callable | 'Websocket' | 'FrozenResponse'
     cors: CORS | None
     params: dict[str, type] | None
     auto_recv_body: bool
+    max_body_size: int | None
+    cache: ResponseCache | None
+    single_flight: SingleFlight | None
 
 class Route:
     __slots__ = ('_path', '_proxy')
@@ -36,102 +41,125 @@ class Route:
 
         self._proxy: RouteProxy = app.RouteProxy_Class(app, self)
 
-    def add(self, method_or_methods: list[HTTP_METHOD_TYPE] | HTTP_METHOD_TYPE, path: str, fn: Callable | 'Websocket' | AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def add(self, method_or_methods: list[HTTP_METHOD_TYPE] | HTTP_METHOD_TYPE, path: str, fn: Callable | 'Websocket' | AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None, cache: ResponseCache | None = None, single_flight: SingleFlight | None = None):
         '''
         - Args
+            - fn: 为 `FrozenResponse` 时，注册时即完成序列化，每次请求直接返回该响应
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
+            - cache: 响应缓存配置；命中缓存时不执行路由函数，仅支持 GET 与 HEAD
+            - single_flight: 请求合并配置；相同的并发请求只执行一次路由函数，仅支持 GET 与 HEAD
+
+        - Raises
+            - ValueError: 为 GET 与 HEAD 以外的请求方法设置了 `cache` 或 `single_flight`
         '''
 
+        methods = method_or_methods if isinstance(method_or_methods, list) else [method_or_methods]
+        if (cache is not None or single_flight is not None) and any(method not in ('GET', 'HEAD') for method in methods):
+            raise ValueError('cache and single_flight only support GET and HEAD')
+
         if allow_origins is not None or allow_methods is not None or allow_headers is not None or allow_credentials is not None or expose_headers or max_age is not None:
             cors = CORS(allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age)
         else:
             cors = None
 
-        methods = method_or_methods if isinstance(method_or_methods, list) else [method_or_methods]
         if fn is not None:
             for method in methods:
-                self._proxy.add_route(method, f'{self.path}{path}', fn, cors, auto_recv_body)
+                self._proxy.add_route(method, f'{self.path}{path}', fn, cors, auto_recv_body, max_body_size, cache, single_flight)
         else:
             def wrapper(_fn: Callable | AsyncIterable | 'Websocket'):
                 for method in methods:
-                    self._proxy.add_route(method, f'{self.path}{path}', _fn, cors, auto_recv_body)
+                    self._proxy.add_route(method, f'{self.path}{path}', _fn, cors, auto_recv_body, max_body_size, cache, single_flight)
                 return _fn
             return wrapper
 
-    def get(self, path: str, fn: Callable | AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def get(self, path: str, fn: Callable | AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None, cache: ResponseCache | None = None, single_flight: SingleFlight | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
+            - cache: 响应缓存配置；命中缓存时不执行路由函数
+            - single_flight: 请求合并配置；相同的并发请求只执行一次路由函数
         '''
 
-        return self.add('GET', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('GET', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size, cache = cache, single_flight = single_flight)
 
-    def post(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def post(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('POST', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('POST', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
     def websocket(self, path: str, fn: Union['Websocket', None] = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None):
         return self.add('WEBSOCKET', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = True)
 
-    def delete(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def delete(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('DELETE', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('DELETE', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
-    def put(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def put(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('PUT', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('PUT', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
-    def patch(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def patch(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('PATCH', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('PATCH', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
-    def head(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def head(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None, cache: ResponseCache | None = None, single_flight: SingleFlight | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
+            - cache: 响应缓存配置；命中缓存时不执行路由函数
+            - single_flight: 请求合并配置；相同的并发请求只执行一次路由函数
         '''
 
-        return self.add('HEAD', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('HEAD', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size, cache = cache, single_flight = single_flight)
 
-    def options(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def options(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('OPTIONS', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('OPTIONS', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
-    def trace(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def trace(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('TRACE', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('TRACE', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
-    def connect(self, path: str, fn: Callable |AsyncIterable | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True):
+    def connect(self, path: str, fn: Callable |AsyncIterable | 'FrozenResponse' | None = None, *, allow_origins: list[str] | None = None, allow_methods: list[HTTP_METHOD_TYPE] | None = None, allow_headers: list[str] | None = None, allow_credentials: bool | None = None, expose_headers: list[str] | None = None, max_age: int | None = None, auto_recv_body: bool = True, max_body_size: int | None = None):
         '''
         - Args
             - auto_recv_body: 是否自动接收响应的 body，若否则自行调用 `request.recv_body()` 接收，并自行调用 `request.parse_body()` 解析
+            - max_body_size: 该路由允许的最大请求体字节数，超出时返回 413；为 None 时使用 `app.max_body_size`
         '''
 
-        return self.add('CONNECT', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body)
+        return self.add('CONNECT', path, fn, allow_origins = allow_origins, allow_methods = allow_methods, allow_headers = allow_headers, allow_credentials = allow_credentials, expose_headers = expose_headers, max_age = max_age, auto_recv_body = auto_recv_body, max_body_size = max_body_size)
 
     @property
     def path(self) -> str:
@@ -191,51 +219,99 @@ class AppRoute(Route):
 
         return self._routes
 
+class RouteNode:
+    __slots__ = ('static_children', 'dynamic_children', 'routes', 'weight', 'order')
+
+    def __init__(self):
+        self.static_children: dict[str, RouteNode] = {}
+        self.dynamic_children: list[tuple[str, re.Pattern, dict[str, type], int, RouteNode]] = []
+        ''' `(segment, regex, params, weight, node)`，按权重从高到低排列 '''
+        self.routes: dict[HTTP_METHOD_TYPE, RouteDict] | None = None
+        self.weight: int = 0
+        ''' 从根节点到该节点的动态段权重之和 '''
+        self.order: int = 0
+        ''' 注册顺序；权重相同时先注册的优先 '''
+
 class RouteProxy:
-    __slots__ = ('app', 'is_root', 'dynamic_routes', 'route', 'dynamic_route_orders')
+    __slots__ = ('app', 'is_root', 'dynamic_routes', 'route', 'dynamic_route_tree')
 
     def __init__(self, app: 'CheeseAPI', route: Route):
         self.app: 'CheeseAPI' = app
         self.route: Route = route
 
         self.dynamic_routes: dict[str, dict[HTTP_METHOD_TYPE, RouteDict]] = {}
-        self.dynamic_route_orders: list[tuple[str, int]] = []
+        self.dynamic_route_tree: RouteNode = RouteNode()
+
+    def add_route(self, method: HTTP_METHOD_TYPE, path: str, fn: Callable | 'Websocket' | 'FrozenResponse', cors: CORS | None, auto_recv_body: bool, max_body_size: int | None = None, cache: ResponseCache | None = None, single_flight: SingleFlight | None = None):
+        if isinstance(fn, FrozenResponse):
+            fn.freeze(self.app)
 
-    def add_route(self, method: HTTP_METHOD_TYPE, path: str, fn: Callable | 'Websocket', cors: CORS | None, auto_recv_body: bool):
         if path not in self.app.route.routes:
             self.app.route.routes[path] = {}
         self.app.route.routes[path][method] = {
             'fn': fn,
             'cors': cors,
             'params': None,
-            'auto_recv_body': auto_recv_body
+            'auto_recv_body': auto_recv_body,
+            'max_body_size': max_body_size,
+            'cache': cache,
+            'single_flight': single_flight
         }
 
         if '<' in path and '>' in path and ':' in path:
-            regex_path = f'^{path}$'
+            node = self.app.route._proxy.dynamic_route_tree
             params = {}
             weight = 0
-            for match in re.finditer(r'<(\w+):(\w+)>', path):
-                key = match.group(1)
-                type = match.group(2)
-                for pattern in self.app.route.patterns:
-                    if pattern['key'] == type:
-                        regex_path = regex_path.replace(f'<{key}:{type}>', f'({pattern["pattern"].pattern})')
-                        params[key] = pattern['type']
-                        weight += pattern['weight']
+            for segment in path.split('/'):
+                regex_segment = ''
+                segment_params = {}
+                segment_weight = 0
+                last_index = 0
+                for match in re.finditer(r'<(\w+):(\w+)>', segment):
+                    key = match.group(1)
+                    type = match.group(2)
+                    for pattern in self.app.route.patterns:
+                        if pattern['key'] == type:
+                            regex_segment += re.escape(segment[last_index:match.start()]) + f'(?P<{key}>{pattern["pattern"].pattern})'
+                            segment_params[key] = pattern['type']
+                            segment_weight += pattern['weight']
+                            last_index = match.end()
+                            break
+
+                if not segment_params:
+                    node = node.static_children.setdefault(segment, RouteNode())
+                    continue
+
+                regex_segment += re.escape(segment[last_index:])
+                weight += segment_weight
+                params.update(segment_params)
+                for _segment, _, _, _, child in node.dynamic_children:
+                    if _segment == segment:
+                        node = child
                         break
-
-            if regex_path not in self.app.route._proxy.dynamic_routes:
-                self.app.route._proxy.dynamic_routes[regex_path] = {}
-            self.app.route._proxy.dynamic_routes[regex_path][method] = {
+                else:
+                    child = RouteNode()
+                    node.dynamic_children.append((segment, re.compile(regex_segment), segment_params, segment_weight, child))
+                    node.dynamic_children.sort(key = lambda x: x[3], reverse = True)
+                    node = child
+
+            if node.routes is None:
+                node.routes = {}
+                node.weight = weight
+                node.order = len(self.app.route._proxy.dynamic_routes)
+            node.routes[method] = {
                 'fn': fn,
                 'cors': cors,
                 'params': params,
-                'auto_recv_body': auto_recv_body
+                'auto_recv_body': auto_recv_body,
+                'max_body_size': max_body_size,
+                'cache': cache,
+                'single_flight': single_flight
             }
-            self.app.route._proxy.dynamic_route_orders.append((regex_path, weight))
 
-            self.app.route._proxy.dynamic_route_orders.sort(key = lambda x: x[1], reverse = True)
+            if path not in self.app.route._proxy.dynamic_routes:
+                self.app.route._proxy.dynamic_routes[path] = {}
+            self.app.route._proxy.dynamic_routes[path][method] = node.routes[method]
 
     def get_route(self, method: HTTP_METHOD_TYPE, path: str) -> tuple[RouteDict, dict] | Literal[404, 405]:
         if path in self.app.route.routes:
@@ -244,18 +320,47 @@ class RouteProxy:
             else:
                 return 405
 
-        for _path, _ in self.app.route._proxy.dynamic_route_orders:
-            match = re.match(_path, path)
-            if match:
-                if method in self.app.route._proxy.dynamic_routes[_path]:
-                    _params = {}
-                    i = 1
-                    for key, type in self.app.route._proxy.dynamic_routes[_path][method]['params'].items():
-                        value = match.group(i)
-                        _params[key] = type(value)
-                        i += 1
-                    return self.app.route._proxy.dynamic_routes[_path][method], _params
-                else:
-                    return 405
+        result = self.search_route(self.app.route._proxy.dynamic_route_tree, path.split('/'), 0, [])
+        if result is None:
+            return 404
+
+        node, matches = result
+        if method not in node.routes:
+            return 405
+
+        _params = {}
+        for match, params in matches:
+            for key, type in params.items():
+                _params[key] = type(match.group(key))
+        return node.routes[method], _params
+
+    def search_route(self, node: RouteNode, segments: list[str], index: int, matches: list[tuple[re.Match, dict[str, type]]]) -> tuple[RouteNode, list[tuple[re.Match, dict[str, type]]]] | None:
+        '''
+        在路由树中查找匹配的节点，耗时与路径深度成正比；存在多个匹配时，返回权重最高的节点，权重相同时返回先注册的节点
 
-        return 404
+        路由最后一段的动态参数允许匹配剩余的完整路径，例如 `/static/<path:str>` 可以匹配 `/static/a/b.txt`
+        '''
+
+        if index == len(segments):
+            return (node, matches) if node.routes is not None else None
+
+        results = []
+        child = node.static_children.get(segments[index])
+        if child is not None:
+            results.append(self.search_route(child, segments, index + 1, matches))
+
+        for _, regex, params, _, child in node.dynamic_children:
+            match = regex.fullmatch(segments[index])
+            if match:
+                results.append(self.search_route(child, segments, index + 1, matches + [(match, params)]))
+
+            if child.routes is not None and index + 1 < len(segments):
+                match = regex.fullmatch('/'.join(segments[index:]))
+                if match:
+                    results.append((child, matches + [(match, params)]))
+
+        best = None
+        for result in results:
+            if result is not None and (best is None or (result[0].weight, -result[0].order) > (best[0].weight, -best[0].order)):
+                best = result
+        return best
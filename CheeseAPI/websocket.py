@@ -1,4 +1,4 @@
-import base64, hashlib, asyncio, ssl, struct, json
+import base64, hashlib, asyncio, struct, json
 from functools import partial
 from typing import TYPE_CHECKING, AsyncIterable, Self, Callable
 
@@ -9,6 +9,7 @@ from CheeseAPI.response import Response
 if TYPE_CHECKING:
     from CheeseAPI.request import Request
     from CheeseAPI.app import CheeseAPI
+    from CheeseAPI.protocol import HttpProtocol
 
 class DualMethod:
     def __init__(self, static_func, instance_func):
@@ -206,7 +207,7 @@ class WebsocketProxy:
         self.websocket: Websocket = websocket
 
         self.reader: asyncio.StreamReader | None = None
-        self.writer: asyncio.StreamWriter | None = None
+        self.writer: 'HttpProtocol' | None = None
 
     async def running(self) -> AsyncIterable[Response]:
         try:
@@ -240,13 +241,9 @@ class WebsocketProxy:
                 WebsocketProxy.sync_server[self.websocket.request.path] = redis.asyncio.Redis.from_url(self.app.sync_server_url)
             asyncio.create_task(self.sync_server_running())
 
-        loop = asyncio.get_running_loop()
         self.reader = asyncio.StreamReader()
-        protocol = asyncio.StreamReaderProtocol(self.reader)
-        if isinstance(self.websocket.request._proxy.client_socket, ssl.SSLSocket):
-            await loop.sock_sendall(self.websocket.request._proxy.client_socket, b'')
-        transport, _ = await loop.connect_accepted_socket(lambda: protocol, self.websocket.request._proxy.client_socket)
-        self.writer = asyncio.StreamWriter(transport, protocol, self.reader, loop)
+        self.writer = self.websocket.request._proxy.connection
+        self.writer.set_stream_reader(self.reader)
         self.websocket._is_running = True
 
         self.app.printer.websocket_connect(self.websocket)
@@ -375,7 +372,7 @@ class WebsocketProxy:
         elif isinstance(data, bytes):
             self.writer.write(self.encode(0x2, data))
         else:
-            self.writer.write(self.encode(0x1, json.dumps(data).encode()))
+            self.writer.write(self.encode(0x1, self.app._proxy.json_dumps(data)))
         await self.writer.drain()
 
     async def _instance_close(self, code: int = 1000, message: str = ''):
@@ -0,0 +1,12 @@
+import pytest
+
+from tests.utils import serve
+
+@pytest.fixture(scope = 'module')
+def port(request):
+    '''
+    在测试模块的 `app` 上启动服务器，整个模块共用
+    '''
+
+    with serve(request.module.app) as port:
+        yield port
@@ -0,0 +1,106 @@
+import asyncio, functools, types
+
+import pytest
+
+from CheeseAPI import Response, FrozenResponse, ResponseCache, SingleFlight
+from CheeseAPI.cache import LRUCache
+
+from tests.utils import create_app, get
+
+app = create_app()
+calls = {}
+
+@app.route.get('/counter', cache = ResponseCache(60))
+async def counter(**_):
+    calls['counter'] = calls.get('counter', 0) + 1
+    return Response(str(calls['counter']))
+
+@app.route.get('/user', cache = ResponseCache(60))
+async def user(*, request, **_):
+    calls['user'] = calls.get('user', 0) + 1
+    return Response(f'{request.headers.get("Authorization")}:{calls["user"]}')
+
+@app.route.get('/large', cache = ResponseCache(60))
+async def large(**_):
+    return Response('large' * 10000)
+
+def test_response_cache(port):
+    assert [get(port, '/counter')[2] for _ in range(3)] == [b'1', b'1', b'1']
+    assert get(port, '/counter?page=2')[2] == b'2'
+    assert get(port, '/counter?page=2')[2] == b'2'
+    assert get(port, '/counter')[2] == b'1'
+
+def test_cache_key_includes_credentials(port):
+    assert get(port, '/user', 'Authorization: alice\r\n')[::2] == (200, b'alice:1')
+    assert get(port, '/user', 'Authorization: bob\r\n')[::2] == (200, b'bob:2')
+    assert get(port, '/user', 'Authorization: alice\r\n')[::2] == (200, b'alice:1')
+    assert get(port, '/user', 'Cookie: session=1\r\n')[::2] == (200, b'None:3')
+    assert get(port, '/user')[::2] == (200, b'None:4')
+
+def test_lru_cache_evicts_by_size():
+    cache = LRUCache(10)
+    cache.set('a', b'12345')
+    cache.set('b', b'12345')
+    assert cache.get('a') == b'12345'
+    cache.set('c', b'123')
+    assert 'b' not in cache and cache.size == 8
+    cache.set('d', b'12345678901')
+    assert 'd' not in cache and cache.size == 8
+
+def test_cache_size_counts_variants(port):
+    get(port, '/large')
+    response_cache = app._proxy.response_cache
+    [(item, size)] = [value for value in response_cache.items.values() if value[0].response._body.startswith(b'large')]
+    assert size == len(item) and size >= 50000
+
+    get(port, '/large', 'Accept-Encoding: gzip\r\n')
+    get(port, '/large', 'Accept-Encoding: br\r\n')
+    assert set(item.response._variants) == {None, 'gzip', 'br'}
+    assert response_cache.items[next(key for key, value in response_cache.items.items() if value[0] is item)][1] == len(item) > size
+    assert response_cache.size == sum(size for _, size in response_cache.items.values())
+
+def test_cache_only_for_get_and_head():
+    route_app = create_app()
+    route_app.route.add(['GET', 'HEAD'], '/', lambda **_: None, cache = ResponseCache(1))
+    with pytest.raises(ValueError):
+        route_app.route.add(['GET', 'POST'], '/', lambda **_: None, cache = ResponseCache(1))
+    with pytest.raises(TypeError):
+        route_app.route.post('/', lambda **_: None, cache = ResponseCache(1))
+
+def run_single_flight(flight_app, response: Response, count: int, state: dict[str, int]) -> list[Response]:
+    single_flight = SingleFlight(lambda request: 'key')
+    request = types.SimpleNamespace(path = '/')
+
+    async def fn(response: Response) -> Response:
+        state['calls'] += 1
+        state['running'] += 1
+        state['max_running'] = max(state['max_running'], state['running'])
+        await asyncio.sleep(0.01)
+        state['running'] -= 1
+        return response
+
+    async def run() -> list[Response]:
+        return await asyncio.gather(*(flight_app._proxy.get_single_flight_response(request, single_flight, functools.partial(fn, response)) for _ in range(count)))
+
+    return asyncio.run(run())
+
+def test_single_flight():
+    flight_app = create_app()
+    state = {'calls': 0, 'running': 0, 'max_running': 0}
+    responses = run_single_flight(flight_app, Response('shared'), 5, state)
+    assert state['calls'] == 1 and all(isinstance(response, FrozenResponse) for response in responses)
+    assert flight_app._proxy.single_flights == {}
+
+def test_single_flight_reelects_leader():
+    flight_app = create_app()
+    state = {'calls': 0, 'running': 0, 'max_running': 0}
+    [response] = run_single_flight(flight_app, Response('alone'), 1, state)
+    assert type(response) is Response
+
+    # 无法共用的响应：等待的请求依次成为新的 leader，而不是同时执行
+    cookie_response = Response('private')
+    cookie_response.set_cookie('session', '1')
+    responses = run_single_flight(flight_app, cookie_response, 5, state)
+    assert state['calls'] == 6 and state['max_running'] == 1
+    assert all(response is cookie_response for response in responses)
+    assert flight_app._proxy.single_flights == {}
@@ -0,0 +1,112 @@
+import gzip, os, zlib
+
+import brotli, pytest, zstandard
+
+from CheeseAPI import Response, FileResponse
+from CheeseAPI.app import AppProxy
+
+from tests.utils import create_app, get
+
+COMPRESSED_SIZES: list[int] = []
+
+class CountingAppProxy(AppProxy):
+    async def run_compress(self, fn, data):
+        COMPRESSED_SIZES.append(len(data))
+        return await super().run_compress(fn, data)
+
+app = create_app(AppProxy_Class = CountingAppProxy, compress_stream_min_length = 131072)
+FILE_DATA = b''.join(f'line {i}: {os.urandom(8).hex()}\n'.encode() for i in range(6000))
+
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'deflate': zlib.decompress,
+    'br': brotli.decompress,
+    'zstd': lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)
+}
+
+async def parts():
+    for i in range(5):
+        yield f'part {i} ' * 100
+
+@app.route.get('/stream')
+async def stream(**_):
+    return Response(parts())
+
+@app.route.get('/large')
+async def large(**_):
+    return Response('l' * 300000)
+
+@app.route.get('/small')
+async def small(**_):
+    return Response('s' * 10000)
+
+@app.route.get('/cached')
+async def cached(**_):
+    return Response('c' * 300000, compress_cache_key = 'cached')
+
+@app.route.get('/file')
+async def file(**_):
+    return FileResponse(FILE_PATH, transmission_type = 'CHUNKED')
+
+@app.route.get('/sendfile')
+async def sendfile(**_):
+    return FileResponse(FILE_PATH, transmission_type = 'SENDFILE')
+
+@app.route.get('/small_sendfile')
+async def small_sendfile(**_):
+    return FileResponse(SMALL_FILE_PATH, transmission_type = 'SENDFILE')
+
+@pytest.fixture(scope = 'module', autouse = True)
+def files(tmp_path_factory):
+    global FILE_PATH, SMALL_FILE_PATH
+    path = tmp_path_factory.mktemp('compress')
+    FILE_PATH, SMALL_FILE_PATH = str(path / 'file.txt'), str(path / 'small_file.txt')
+    with open(FILE_PATH, 'wb') as f:
+        f.write(FILE_DATA)
+    with open(SMALL_FILE_PATH, 'wb') as f:
+        f.write(FILE_DATA[:65536])
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate', 'br', 'zstd'])
+def test_streaming_compression(port, encoding):
+    status, headers, body = get(port, '/stream', f'Accept-Encoding: {encoding}\r\n')
+    assert status == 200 and headers['Content-Encoding'] == encoding and headers['Transfer-Encoding'] == 'chunked'
+    assert DECOMPRESS[encoding](body) == ''.join(f'part {i} ' * 100 for i in range(5)).encode()
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip', 'br'])
+def test_chunked_file_response(port, encoding):
+    status, headers, body = get(port, '/file', f'Accept-Encoding: {encoding}\r\n')
+    assert status == 200 and headers['Transfer-Encoding'] == 'chunked' and 'Content-Length' not in headers
+    if encoding == 'identity':
+        assert 'Content-Encoding' not in headers and body == FILE_DATA
+    else:
+        assert headers['Content-Encoding'] == encoding and DECOMPRESS[encoding](body) == FILE_DATA
+
+def test_sendfile_compression(port):
+    COMPRESSED_SIZES.clear()
+    status, headers, body = get(port, '/sendfile', 'Accept-Encoding: gzip\r\n')
+    assert status == 200 and headers['Transfer-Encoding'] == 'chunked' and 'Content-Length' not in headers
+    assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == FILE_DATA
+    assert COMPRESSED_SIZES == []
+
+    status, headers, body = get(port, '/small_sendfile', 'Accept-Encoding: gzip\r\n')
+    assert status == 200 and 'Transfer-Encoding' not in headers and headers['Content-Length'] == str(len(body))
+    assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == FILE_DATA[:65536]
+
+    status, headers, body = get(port, '/sendfile', 'Accept-Encoding: identity\r\n')
+    assert 'Content-Encoding' not in headers and headers['Content-Length'] == str(len(FILE_DATA)) and body == FILE_DATA
+
+def test_large_bodies_are_compressed_in_executor(port):
+    COMPRESSED_SIZES.clear()
+    status, headers, body = get(port, '/small', 'Accept-Encoding: gzip\r\n')
+    assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == b's' * 10000
+    status, headers, body = get(port, '/large', 'Accept-Encoding: gzip\r\n')
+    assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == b'l' * 300000
+    assert COMPRESSED_SIZES == [300000]
+
+def test_compressed_body_is_cached(port):
+    COMPRESSED_SIZES.clear()
+    bodies = [get(port, '/cached', 'Accept-Encoding: br\r\n')[2] for _ in range(3)]
+    assert bodies[0] == bodies[1] == bodies[2] and brotli.decompress(bodies[0]) == b'c' * 300000
+    assert COMPRESSED_SIZES == [300000]
+    assert get(port, '/cached', 'Accept-Encoding: gzip\r\n')[1]['Content-Encoding'] == 'gzip'
+    assert COMPRESSED_SIZES == [300000, 300000]
@@ -0,0 +1,25 @@
+import pytest
+
+from CheeseAPI.headers import Headers
+
+def test_headers():
+    headers = Headers(b'Host: example.com\r\nAccept:  text/html \r\ncookie: a=1\r\nX-Tag: a\r\nCookie: b=2\r\nx-tag: b')
+    assert len(headers) == 4 and headers.values == {}
+    assert headers['HOST'] == 'example.com' and headers['accept'] == 'text/html'
+    assert headers['Cookie'] == 'a=1; b=2' and headers['X-Tag'] == 'a, b'
+    assert headers.get_all('x-TAG') == ['a', 'b'] and headers.get_all('Missing') == []
+    assert headers.get('Missing') is None and 'host' in headers and 1 not in headers
+    assert list(headers) == ['Host', 'Accept', 'cookie', 'X-Tag']
+
+    headers['x-tag'] = 'c'
+    headers.add('Accept', 'application/json')
+    headers.add('X-New', '1')
+    del headers['cookie']
+    assert dict(headers) == { 'Host': 'example.com', 'Accept': 'text/html, application/json', 'x-tag': 'c', 'X-New': '1' }
+    with pytest.raises(KeyError):
+        del headers['Cookie']
+
+@pytest.mark.parametrize('raw', [b'Host example.com', b': value', b'Host: x\r\n\r\nAccept: y'])
+def test_invalid_headers(raw):
+    with pytest.raises(ValueError):
+        Headers(raw)
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from CheeseAPI import Response
+
+from tests.utils import create_app, send, parse_responses
+
+CALLS: list[str] = []
+
+def dumps(data) -> str:
+    CALLS.append('dumps')
+    return json.dumps(data, separators = (',', ':'))
+
+def loads(data: bytes):
+    CALLS.append('loads')
+    return json.loads(data)
+
+app = create_app(json_backend = (dumps, loads))
+
+@app.route.post('/echo')
+async def echo(*, request, **_):
+    return Response({ 'echo': request.json })
+
+def test_custom_backend(port):
+    CALLS.clear()
+    body = b'{"a": [1, 2, "\xe4\xb8\xad"]}'
+    [(status, headers, data)] = parse_responses(send(port, b'POST /echo HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Type: application/json\r\nContent-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body))
+    assert status == 200 and headers['Content-Type'] == 'application/json; charset=utf-8'
+    assert data == b'{"echo":{"a":[1,2,"\\u4e2d"]}}' and CALLS == ['loads', 'dumps']
+
+def test_named_backends():
+    orjson = pytest.importorskip('orjson')
+    assert app._proxy.get_json_backend('orjson') == (orjson.dumps, orjson.loads)
+    assert app._proxy.get_json_backend('json') == (json.dumps, json.loads)
+    assert app._proxy.get_json_backend('auto')[0] is orjson.dumps
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from CheeseAPI import Response
+from CheeseAPI.multipart import MultipartParser, MultipartError
+
+from tests.utils import create_app, send, parse_responses
+
+BOUNDARY = 'cheeseboundary'
+FILE_DATA = os.urandom(200000) + b'\r\n--cheeseboundar' + os.urandom(1000)
+
+def encode(fields: dict[str, str], files: dict[str, tuple[str, bytes]]) -> bytes:
+    data = b''
+    for name, value in fields.items():
+        data += f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    for name, (filename, value) in files.items():
+        data += f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode() + value + b'\r\n'
+    return data + f'--{BOUNDARY}--\r\n'.encode()
+
+BODY = encode({ 'a': '1', 'b': 'two' }, { 'file': ('data.bin', FILE_DATA) })
+
+def parse(body: bytes, size: int) -> list[tuple[str | None, str | None, bytes]]:
+    parser = MultipartParser(BOUNDARY, 1024)
+    parts = []
+    for index in range(0, len(body), size):
+        for event, part, data in parser.feed(body[index:index + size]):
+            if event == 'BEGIN':
+                parts.append([part.name, part.filename, b''])
+            elif event == 'DATA':
+                parts[-1][2] += data
+    parser.finish()
+    return [tuple(part) for part in parts]
+
+@pytest.mark.parametrize('size', [1, 7, 4096, len(BODY)])
+def test_parser_is_incremental(size):
+    assert parse(BODY, size) == [('a', None, b'1'), ('b', None, b'two'), ('file', 'data.bin', FILE_DATA)]
+
+def test_parser_rejects_incomplete_body():
+    with pytest.raises(MultipartError):
+        parse(BODY[:-10], 4096)
+
+app = create_app()
+
+@app.route.post('/form')
+async def form(*, request, **_):
+    file = request.files['file']
+    return Response({ 'form': request.form, 'file': [file.name, file.data == FILE_DATA] })
+
+@app.route.post('/parts', auto_recv_body = False)
+async def parts(*, request, **_):
+    sizes = {}
+
+    def on_file_data(part, data):
+        sizes[part.name] = sizes.get(part.name, 0) + len(data)
+
+    names = [(part.name, part.value) async for part in request.iter_parts(on_file_data)]
+    return Response({ 'parts': names, 'sizes': sizes })
+
+def post(port: int, path: str) -> bytes:
+    [(status, _, body)] = parse_responses(send(port, f'POST {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Type: multipart/form-data; boundary={BOUNDARY}\r\nContent-Length: {len(BODY)}\r\n\r\n'.encode() + BODY))
+    assert status == 200
+    return body
+
+def test_form(port):
+    assert post(port, '/form') == b'{"form": {"a": "1", "b": "two"}, "file": ["data.bin", true]}'
+
+def test_iter_parts(port):
+    assert post(port, '/parts') == f'{{"parts": [["a", "1"], ["b", "two"], ["file", null]], "sizes": {{"file": {len(FILE_DATA)}}}}}'.encode()
@@ -0,0 +1,102 @@
+import socket, time
+
+import pytest
+
+from CheeseAPI import Response
+from CheeseAPI import protocol
+from CheeseAPI.protocol import HttpProtocol
+from CheeseAPI.response import ResponseProxy
+
+from tests.utils import create_app, send, parse_responses, get
+
+app = create_app()
+
+@app.route.get('/query')
+async def query(*, request, **_):
+    return Response(request.full_path)
+
+@app.route.post('/ignore', auto_recv_body = False)
+async def ignore(**_):
+    return Response('ignored')
+
+async def parts():
+    yield 'first'
+    yield b''
+    yield b'x' * 65536
+
+@app.route.get('/stream')
+async def stream(**_):
+    return Response(parts())
+
+def test_request(port):
+    status, headers, body = get(port, '/query?a=1')
+    assert (status, body) == (200, b'/query?a=1') and headers['Content-Length'] == '10'
+    assert get(port, '/missing')[0] == 404
+
+def test_pipelined(port):
+    data = send(port, b'GET /query?a=1 HTTP/1.1\r\nHost: x\r\n\r\nGET /query?a=2 HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+    assert [(status, body) for status, _, body in parse_responses(data)] == [(200, b'/query?a=1'), (200, b'/query?a=2')]
+
+def test_unread_body_is_not_parsed_as_request(port):
+    smuggled = b'GET /query?smuggled=1 HTTP/1.1\r\nHost: x\r\n\r\n'
+    for path in (b'/missing', b'/query', b'/ignore'):
+        data = send(port, b'POST ' + path + b' HTTP/1.1\r\nHost: x\r\nContent-Length: ' + str(len(smuggled)).encode() + b'\r\n\r\n' + smuggled + b'GET /query?a=1 HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+        responses = parse_responses(data)
+        assert b'/query?smuggled=1' not in [body for _, _, body in responses]
+        assert responses[-1][2] == b'/query?a=1'
+
+def test_unread_chunked_body_is_not_parsed_as_request(port):
+    smuggled = b'GET /query?smuggled=1 HTTP/1.1\r\nHost: x\r\n\r\n'
+    data = send(port, b'POST /ignore HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n' + f'{len(smuggled):x}\r\n'.encode() + smuggled + b'\r\n0\r\n\r\nGET /query?a=1 HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+    assert [(status, body) for status, _, body in parse_responses(data)] == [(200, b'ignored'), (200, b'/query?a=1')]
+
+def test_large_unread_body_closes_connection(port):
+    data = send(port, b'POST /ignore HTTP/1.1\r\nHost: x\r\nContent-Length: 104857600\r\n\r\n' + b'GET /query?smuggled=1 HTTP/1.1\r\nHost: x\r\n\r\n')
+    responses = parse_responses(data)
+    assert [(status, body) for status, _, body in responses] == [(200, b'ignored')]
+
+def test_headers_received_in_pieces(port):
+    data = b'GET /query?a=1 HTTP/1.1\r\nHost: x\r\nX-Long: ' + b'x' * 1000 + b'\r\nConnection: close\r\n\r\n'
+    with socket.create_connection(('127.0.0.1', port), 5) as sock:
+        for index in range(0, len(data), 100):
+            sock.sendall(data[index:index + 100])
+            time.sleep(0.005)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    assert [(status, body) for status, _, body in parse_responses(b''.join(chunks))] == [(200, b'/query?a=1')]
+
+def test_header_limits(port):
+    too_many = b''.join(f'X-{i}: {i}\r\n'.encode() for i in range(app.max_header_count + 1))
+    too_large = b'X-Long: ' + b'x' * app.max_header_size + b'\r\n'
+    for headers in (too_many, too_large):
+        [(status, _, _)] = parse_responses(send(port, b'GET /query HTTP/1.1\r\nHost: x\r\n' + headers + b'Connection: close\r\n\r\n'))
+        assert status == 431
+
+def test_chunk_framing(port):
+    assert ResponseProxy.chunk(b'x' * 65536) == (b'10000\r\n', b'x' * 65536, b'\r\n')
+    assert ResponseProxy.chunk(b'abc') == (b'3\r\n', b'abc', b'\r\n')
+
+    data = send(port, b'GET /stream HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+    assert data.split(b'\r\n\r\n', 1)[1] == b'5\r\nfirst\r\n10000\r\n' + b'x' * 65536 + b'\r\n0\r\n\r\n'
+
+class RecordingTransport:
+    def __init__(self):
+        self.calls = []
+
+    def write(self, data):
+        self.calls.append(('write', data))
+
+    def writelines(self, list_of_data):
+        self.calls.append(('writelines', list(list_of_data)))
+
+def test_writelines_does_not_join_large_bodies(monkeypatch):
+    monkeypatch.setattr(protocol, 'VECTORED_WRITELINES', False)
+    connection = HttpProtocol(app)
+    connection.transport = RecordingTransport()
+    head, body = b'HTTP/1.1 200 OK\r\n\r\n', b'x' * (connection.buffer_size + 1)
+
+    connection.writelines([head, b'small'])
+    connection.writelines([head, body])
+    assert connection.transport.calls[0] == ('writelines', [head, b'small'])
+    assert connection.transport.calls[1:] == [('write', head), ('write', body)] and connection.transport.calls[2][1] is body
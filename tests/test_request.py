@@ -0,0 +1,205 @@
+import gzip, hashlib, os, socket, time, zlib
+
+import brotli, pytest
+
+from CheeseAPI import Response
+from CheeseAPI.request import Request
+from CheeseAPI.headers import Headers
+
+from tests.utils import create_app, send, parse_responses
+
+app = create_app(spool_body_size = 2097152)
+MAX_BODY_SIZE = 4194304
+SPOOL_FILES = []
+
+@app.route.post('/echo', max_body_size = MAX_BODY_SIZE)
+async def echo(request):
+    return Response(str(len(request.body)))
+
+@app.route.post('/type')
+async def body_type(request):
+    return Response(f'{type(request.body).__name__}:{len(request.body)}')
+
+@app.route.post('/spool')
+async def spool(request):
+    SPOOL_FILES.append(request.body_file)
+    with open(request.body_file.path, 'rb') as f:
+        return Response(f'{request.body}:{hashlib.md5(f.read()).hexdigest()}')
+
+@app.route.put('/stream', auto_recv_body = False)
+async def stream(request):
+    md5 = hashlib.md5()
+    async for data in request.stream():
+        md5.update(data)
+    return Response(f'{request.body}:{md5.hexdigest()}')
+
+@app.route.post('/partial', auto_recv_body = False)
+async def partial(request):
+    calls = 0
+    bodies = set()
+    while await request.recv_body() is False:
+        calls += 1
+        bodies.add(id(request.body))
+    return Response(f'{calls > 1}:{len(bodies)}:{type(request.body).__name__}:{hashlib.md5(request.body).hexdigest()}')
+
+@app.route.post('/preallocated', auto_recv_body = False)
+async def preallocated(request):
+    await request.recv_body(get_all = True)
+    buffer = request._body
+    return Response(f'{type(buffer).__name__}:{type(request.body).__name__}:{request.body == buffer}')
+
+@app.route.post('/manual', auto_recv_body = False)
+async def manual(request):
+    response = await request.recv_body(get_all = True)
+    if isinstance(response, Response):
+        return response
+    return Response(str(len(request.body)))
+
+def post(port: int, body: bytes, headers: dict[str, str] = {}, path: str = '/echo') -> tuple[int, bytes]:
+    head = ''.join(f'{key}: {value}\r\n' for key, value in headers.items())
+    status, _, body = parse_responses(send(port, f'POST {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Length: {len(body)}\r\n{head}\r\n'.encode() + body))[0]
+    return status, body
+
+def test_body(port):
+    assert post(port, b'hello') == (200, b'5')
+    assert post(port, b'a' * 1048576) == (200, b'1048576')
+
+def test_max_body_size(port):
+    [(status, headers, _)] = parse_responses(send(port, f'POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: {MAX_BODY_SIZE + 1}\r\n\r\n'.encode()))
+    assert status == 413 and headers['Connection'] == 'close'
+
+def test_max_body_size_defaults_to_unlimited():
+    assert create_app().max_body_size is None
+
+def test_body_is_bytes(port):
+    # 大于首次接收的数据，请求体会被接收到预先分配的缓冲区中
+    assert post(port, b'a' * 1048576, { 'Content-Type': 'application/octet-stream' }, '/type') == (200, b'bytes:1048576')
+    assert parse_responses(send(port, b'POST /type HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Type: application/octet-stream\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n'))[0][2] == b'bytes:5'
+
+def test_preallocated_body_is_not_copied(port):
+    # 接收完毕时保留预先分配的 bytearray，首次访问 `request.body` 时才转为 bytes
+    assert post(port, b'a' * 1048576, { 'Content-Type': 'application/octet-stream' }, '/preallocated') == (200, b'bytearray:bytes:True')
+
+@pytest.mark.parametrize('path', ['POST /echo', 'POST /manual', 'PUT /stream'])
+def test_invalid_content_length(port, path):
+    assert parse_responses(send(port, f'{path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Length: 5\r\n\r\nhello'.encode()))[0][0] == 200
+    for content_length in ('-1', 'abc', '+5', '5, 5'):
+        [(status, headers, _)] = parse_responses(send(port, f'{path} HTTP/1.1\r\nHost: x\r\nContent-Length: {content_length}\r\n\r\nhello'.encode()))
+        assert status == 400 and headers['Connection'] == 'close'
+
+def test_chunked_body(port):
+    [(status, _, body)] = parse_responses(send(port, b'POST /echo HTTP/1.1\r\nHost: x\r\nConnection: close\r\nTransfer-Encoding: chunked\r\n\r\n5;name=value\r\nhello\r\n6\r\n world\r\n0\r\n\r\n'))
+    assert (status, body) == (200, b'11')
+    [(status, headers, _)] = parse_responses(send(port, b'POST /echo HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\nhello\r\n0\r\n\r\n'))
+    assert status == 400 and headers['Connection'] == 'close'
+
+def post_chunked(port: int, trailer: bytes) -> int:
+    return parse_responses(send(port, b'POST /echo HTTP/1.1\r\nHost: x\r\nConnection: close\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n' + trailer + b'\r\n'))[0][0]
+
+def test_chunked_trailers(port):
+    assert post_chunked(port, b'X-Checksum: 1\r\ncontent-md5: XUFAKrxLKna5cZ2REBfFkg==\r\n') == 200
+    assert post_chunked(port, b'content-md5: AAAAAAAAAAAAAAAAAAAAAA==\r\n') == 400
+    assert post_chunked(port, b'no colon\r\n') == 400
+
+def test_partial_chunked_body_is_not_copied(port):
+    data = os.urandom(64 * 2000)
+    with socket.create_connection(('127.0.0.1', port), 5) as sock:
+        sock.sendall(b'POST /partial HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Type: application/octet-stream\r\nTransfer-Encoding: chunked\r\n\r\n')
+        for index in range(0, len(data), 6400):
+            sock.sendall(b''.join(b'40\r\n' + data[i:i + 64] + b'\r\n' for i in range(index, index + 6400, 64)))
+            time.sleep(0.005)
+        sock.sendall(b'0\r\n\r\n')
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    [(status, _, body)] = parse_responses(b''.join(chunks))
+    # 分块接收的过程中 `request.body` 始终是同一个 bytearray，完成后转为 bytes
+    assert (status, body) == (200, f'True:1:bytes:{hashlib.md5(data).hexdigest()}'.encode())
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_large_body_is_spooled(port, chunked):
+    SPOOL_FILES.clear()
+    data = os.urandom(3145728)
+    if chunked:
+        request = b'POST /spool HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Type: application/octet-stream\r\nTransfer-Encoding: chunked\r\n\r\n' + b''.join(f'{65536:x}\r\n'.encode() + data[i:i + 65536] + b'\r\n' for i in range(0, len(data), 65536)) + b'0\r\n\r\n'
+    else:
+        request = f'POST /spool HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Type: application/octet-stream\r\nContent-Length: {len(data)}\r\n\r\n'.encode() + data
+    [(status, _, body)] = parse_responses(send(port, request))
+    assert (status, body) == (200, f'None:{hashlib.md5(data).hexdigest()}'.encode())
+
+    [file] = SPOOL_FILES
+    for _ in range(100):
+        if not os.path.exists(file.path):
+            break
+        time.sleep(0.01)
+    assert not os.path.exists(file.path)
+
+def test_stream(port):
+    data = os.urandom(3145728)
+    md5 = hashlib.md5(data).hexdigest()
+    chunked = b''.join(f'{65536:x}\r\n'.encode() + data[i:i + 65536] + b'\r\n' for i in range(0, len(data), 65536)) + b'0\r\n\r\n'
+    compressed = gzip.compress(data, 1)
+    for head, body in (
+        (f'Content-Length: {len(data)}\r\n', data),
+        ('Transfer-Encoding: chunked\r\n', chunked),
+        (f'Content-Length: {len(compressed)}\r\nContent-Encoding: gzip\r\n', compressed)
+    ):
+        [(status, _, response_body)] = parse_responses(send(port, f'PUT /stream HTTP/1.1\r\nHost: x\r\nConnection: close\r\n{head}\r\n'.encode() + body))
+        assert (status, response_body) == (200, f'None:{md5}'.encode())
+
+def test_expect_continue(port):
+    with socket.create_connection(('127.0.0.1', port), 5) as sock:
+        sock.sendall(b'POST /echo HTTP/1.1\r\nHost: x\r\nConnection: close\r\nExpect: 100-continue\r\nContent-Length: 5\r\n\r\n')
+        assert sock.recv(65536) == b'HTTP/1.1 100 Continue\r\n\r\n'
+        sock.sendall(b'hello')
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    assert [(status, body) for status, _, body in parse_responses(b''.join(chunks))] == [(200, b'5')]
+
+    # 未发送 100 Continue 便返回最终响应时，不等待请求体并关闭连接
+    for path, length, expected in ((b'/echo', MAX_BODY_SIZE + 1, 413), (b'/missing', 5, 404)):
+        data = send(port, b'POST ' + path + b' HTTP/1.1\r\nHost: x\r\nExpect: 100-continue\r\nContent-Length: ' + str(length).encode() + b'\r\n\r\n')
+        [(status, headers, _)] = parse_responses(data)
+        assert not data.startswith(b'HTTP/1.1 100') and status == expected and headers['Connection'] == 'close'
+
+def create_request(full_path: str, headers: bytes) -> Request:
+    request = Request(create_app(), None, ('10.0.0.1', 5214))
+    request._full_path = full_path
+    request._headers = Headers(headers)
+    return request
+
+def test_request_attributes_are_parsed_lazily():
+    request = create_request('/search?tag=a&tag=b&q=cheese#top', b'Cookie: a=1; broken; b=2\r\nRange: bytes=0-9, 20-\r\nX-Forwarded-For: 1.2.3.4, 5.6.7.8')
+    assert (request._query, request._query_lists, request._cookies, request._ranges, request._ip) == (None, None, None, None, None)
+
+    assert request.query == { 'tag': 'b', 'q': 'cheese' }
+    assert request.query_lists == { 'tag': ['a', 'b'], 'q': ['cheese'] }
+    assert request.cookies == { 'a': '1', 'b': '2' }
+    assert request.ranges == [(0, 9), (20, None)]
+    assert request.ip == '1.2.3.4'
+
+    request = create_request('/', b'X-Real-IP: 9.9.9.9\r\nX-Forwarded-For: 1.2.3.4\r\nRange: bytes=a-b')
+    assert request.ip == '9.9.9.9' and request.ranges == [] and request.cookies is None and request.query == {}
+    assert create_request('/', b'').ip == '10.0.0.1'
+
+@pytest.mark.parametrize('encoding, compress', [('gzip', gzip.compress), ('deflate', zlib.compress), ('br', brotli.compress)])
+def test_compressed_body_is_decoded(port, encoding, compress):
+    assert post(port, compress(b'a' * 100000), { 'Content-Encoding': encoding }) == (200, b'100000')
+    assert post(port, b'not compressed', { 'Content-Encoding': encoding })[0] == 400
+
+def test_brotli_bomb_is_rejected(port):
+    assert post(port, brotli.compress(b'\0' * 67108864), { 'Content-Encoding': 'br' })[0] == 413
+
+def test_gzip_bomb_is_rejected_by_default(port):
+    # 压缩比超过 `max_decompression_ratio`
+    assert post(port, gzip.compress(b'\0' * 67108864, 1), { 'Content-Encoding': 'gzip' }, '/type')[0] == 413
+
+    # 压缩比正常，但解压后超过 `max_decompressed_size`
+    data = (os.urandom(1024) + b'\0' * 60000) * 1800
+    body = gzip.compress(data, 1)
+    assert len(data) > app.max_decompressed_size and len(data) < len(body) * app.max_decompression_ratio
+    headers = { 'Content-Encoding': 'gzip', 'Content-Type': 'application/octet-stream' }
+    assert post(port, body, headers, '/type')[0] == 413
+    [(status, _, _)] = parse_responses(send(port, f'PUT /stream HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Encoding: gzip\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body))
+    assert status == 413
@@ -0,0 +1,128 @@
+import asyncio, gzip, os, time, email.utils, concurrent.futures
+
+import pytest
+
+from CheeseAPI import Response, FrozenResponse, FileResponse
+from CheeseAPI.app import AppProxy
+
+from tests.utils import create_app, send, parse_responses, get
+
+class SlowAppProxy(AppProxy):
+    async def before_response(self, response: Response) -> Response:
+        await asyncio.sleep(0.05)
+        return response
+
+app = create_app(AppProxy_Class = SlowAppProxy)
+app.route.get('/frozen', FrozenResponse('frozen' * 1000, etag = True))
+FILE_DATA = os.urandom(300000)
+
+@app.route.get('/etag/<size:int>')
+async def etag(*, request, **_):
+    return Response('e' * request.params['size'], etag = True)
+
+@app.route.get('/file/<transmission_type:str>')
+async def file(*, request, **_):
+    return FileResponse(FILE_PATH, transmission_type = request.params['transmission_type'].upper())
+
+@pytest.fixture(scope = 'module', autouse = True)
+def files(tmp_path_factory):
+    global FILE_PATH
+    FILE_PATH = str(tmp_path_factory.mktemp('response') / 'file.bin')
+    with open(FILE_PATH, 'wb') as f:
+        f.write(FILE_DATA)
+
+def test_frozen_response_is_not_shared_between_requests(port):
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        future = executor.submit(send, port, b'GET /frozen HTTP/1.1\r\nAccept-Encoding: gzip\r\nConnection: close\r\n\r\n')
+        head_data = send(port, b'HEAD /frozen HTTP/1.1\r\n\r\nHEAD /frozen HTTP/1.1\r\nConnection: close\r\n\r\n')
+        data = future.result()
+
+    [(status, headers, body)] = parse_responses(data)
+    assert status == 200 and headers['Content-Encoding'] == 'gzip' and headers['Connection'] == 'close'
+    assert gzip.decompress(body) == b'frozen' * 1000
+
+    head_responses = parse_responses(head_data, head = True)
+    assert [headers['Connection'] for _, headers, _ in head_responses] == ['keep-alive', 'close']
+    assert all('Content-Encoding' not in headers for _, headers, _ in head_responses)
+    assert app.route._proxy.get_route('GET', '/frozen')[0]['fn']._proxy is None
+
+@pytest.mark.parametrize('transmission_type', ['sendfile', 'content_length'])
+def test_range(port, transmission_type):
+    request = f'GET /file/{transmission_type} HTTP/1.1\r\nRange: bytes=%s\r\n\r\n'
+    data = send(port, ((request % '400000-') + (request % '1000-1999') + (request % '299000-') + (request % '2000-1000') + f'GET /file/{transmission_type} HTTP/1.1\r\nConnection: close\r\n\r\n').encode())
+    responses = parse_responses(data)
+    assert [status for status, _, _ in responses] == [416, 206, 206, 416, 200]
+    assert responses[0][1]['Content-Range'] == 'bytes */300000' and responses[0][2] != FILE_DATA
+    assert responses[1][1]['Content-Range'] == 'bytes 1000-1999/300000' and responses[1][2] == FILE_DATA[1000:2000]
+    assert responses[2][1]['Content-Range'] == 'bytes 299000-299999/300000' and responses[2][2] == FILE_DATA[299000:]
+    assert responses[4][2] == FILE_DATA
+
+@pytest.mark.parametrize('transmission_type', ['sendfile', 'content_length'])
+def test_multipart_range(port, transmission_type):
+    [(status, headers, body)] = parse_responses(send(port, f'GET /file/{transmission_type} HTTP/1.1\r\nRange: bytes=0-99, 1000-1999, 299900-, 299950-400000\r\nConnection: close\r\n\r\n'.encode()))
+    assert status == 206 and headers['Content-Length'] == str(len(body))
+    boundary = headers['Content-Type'].split('boundary=')[1].encode()
+    parts = body.split(b'--' + boundary)
+    assert parts[0] == b'' and parts[-1] == b'--\r\n'
+
+    ranges = []
+    for part in parts[1:-1]:
+        head, data = part.split(b'\r\n\r\n', 1)
+        assert data.endswith(b'\r\n')
+        content_range = dict(line.split(': ', 1) for line in head.decode().strip().split('\r\n'))['Content-Range']
+        start, end = map(int, content_range.removeprefix('bytes ').removesuffix('/300000').split('-'))
+        assert data[:-2] == FILE_DATA[start:end + 1]
+        ranges.append((start, end))
+    assert ranges == [(0, 99), (1000, 1999), (299900, 299999), (299950, 299999)]
+
+def test_not_modified(port):
+    status, headers, body = get(port, '/etag/10')
+    assert (status, body) == (200, b'e' * 10) and 'ETag' in headers
+    status, headers, body = get(port, '/etag/10', f'If-None-Match: "other", {headers["ETag"]}\r\n')
+    assert (status, body) == (304, b'')
+
+    status, headers, _ = get(port, '/file/content_length')
+    assert status == 200 and 'ETag' in headers and 'Last-Modified' in headers
+    assert get(port, '/file/content_length', f'If-Modified-Since: {headers["Last-Modified"]}\r\n')[0] == 304
+    assert get(port, '/file/sendfile', f'If-None-Match: {headers["ETag"]}\r\n')[0] == 304
+    assert get(port, '/file/sendfile', 'If-None-Match: "other"\r\n')[0] == 200
+
+@pytest.mark.parametrize('size', [10, 10000])
+def test_not_modified_matches_ok_response(port, size):
+    [(status, headers, body)] = parse_responses(send(port, f'GET /etag/{size} HTTP/1.1\r\nAccept-Encoding: gzip\r\nConnection: close\r\n\r\n'.encode()))
+    assert status == 200 and ('Content-Encoding' in headers) is (size > 1024)
+
+    [(not_modified_status, not_modified_headers, _)] = parse_responses(send(port, f'GET /etag/{size} HTTP/1.1\r\nAccept-Encoding: gzip\r\nIf-None-Match: {headers["ETag"]}\r\nConnection: close\r\n\r\n'.encode()))
+    assert not_modified_status == 304
+    assert not_modified_headers['ETag'] == headers['ETag']
+    assert not_modified_headers.get('Vary') == headers.get('Vary')
+    assert 'Content-Encoding' not in not_modified_headers
+
+@pytest.mark.parametrize('accept_encoding', ['identity', 'gzip'])
+def test_frozen_response(port, accept_encoding):
+    status, headers, body = get(port, '/frozen', f'Accept-Encoding: {accept_encoding}\r\n')
+    assert status == 200 and headers['Content-Length'] == str(len(body))
+    assert abs(email.utils.parsedate_to_datetime(headers['Date']).timestamp() - time.time()) < 2
+    if accept_encoding == 'gzip':
+        assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == b'frozen' * 1000
+    else:
+        assert 'Content-Encoding' not in headers and body == b'frozen' * 1000
+
+@pytest.mark.parametrize('accept_encoding', ['gzip', 'identity'])
+def test_frozen_not_modified_matches_ok_response(port, accept_encoding):
+    [(status, headers, _)] = parse_responses(send(port, f'GET /frozen HTTP/1.1\r\nAccept-Encoding: {accept_encoding}\r\nConnection: close\r\n\r\n'.encode()))
+    assert status == 200 and headers['ETag'].startswith('W/') is (accept_encoding == 'gzip')
+
+    [(not_modified_status, not_modified_headers, _)] = parse_responses(send(port, f'GET /frozen HTTP/1.1\r\nAccept-Encoding: {accept_encoding}\r\nIf-None-Match: {headers["ETag"]}\r\nConnection: close\r\n\r\n'.encode()))
+    assert not_modified_status == 304
+    assert (not_modified_headers['ETag'], not_modified_headers['Vary']) == (headers['ETag'], headers['Vary'])
+    assert 'Content-Encoding' not in not_modified_headers
+
+def test_date_header(port):
+    dates = []
+    for path in ('/etag/10', '/file/content_length', '/etag/10'):
+        [(status, headers, _)] = parse_responses(send(port, f'GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n'.encode()))
+        assert status == 200 and abs(email.utils.parsedate_to_datetime(headers['Date']).timestamp() - time.time()) < 2
+        dates.append(headers['Date'])
+        time.sleep(0.6)
+    assert dates[0] != dates[2]
@@ -0,0 +1,32 @@
+import uuid
+
+from tests.utils import create_app
+
+def test_dynamic_routes():
+    app = create_app()
+
+    @app.route.get('/user/<name:str>')
+    async def user_name(request): ...
+
+    @app.route.get('/user/<id:int>')
+    async def user_id(request): ...
+
+    @app.route.get('/user/me')
+    async def user_me(request): ...
+
+    @app.route.get('/item/<id:uuid>/v<version:int>')
+    async def item(request): ...
+
+    @app.route.post('/files/<path:str>')
+    async def files(request): ...
+
+    get_route = app.route._proxy.get_route
+    assert get_route('GET', '/user/me')[0]['fn'] is user_me
+    assert get_route('GET', '/user/42') == (app.route._proxy.dynamic_routes['/user/<id:int>']['GET'], { 'id': 42 })
+    assert get_route('GET', '/user/alice')[1] == { 'name': 'alice' }
+    id = uuid.uuid4()
+    assert get_route('GET', f'/item/{id}/v2')[1] == { 'id': id, 'version': 2 }
+    assert get_route('GET', f'/item/{id}/x2') == 404
+    assert get_route('POST', '/files/a/b.txt')[1] == { 'path': 'a/b.txt' }
+    assert get_route('GET', '/files/a') == 405
+    assert get_route('GET', '/missing') == 404
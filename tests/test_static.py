@@ -0,0 +1,83 @@
+import gzip, os, time
+
+import brotli, pytest
+
+from tests.utils import create_app, serve, get
+
+@pytest.fixture(scope = 'module')
+def static(tmp_path_factory):
+    path = tmp_path_factory.mktemp('static')
+    app = create_app(static_path = {'/static': str(path)}, static_cache_fd = True, static_cache_interval = 0.05, static_cache_max_files = 2)
+    with serve(app) as port:
+        yield app, port, path
+
+def test_file_metadata_is_cached(static):
+    app, port, path = static
+    (path / 'cached.txt').write_bytes(b'1')
+
+    assert get(port, '/static/cached.txt')[2] == b'1'
+    static_file = app._proxy.static_files['/static/cached.txt']
+    assert static_file.file._handler is not None
+    assert get(port, '/static/cached.txt')[2] == b'1'
+    assert app._proxy.static_files['/static/cached.txt'] is static_file
+
+    (path / 'cached.txt').write_bytes(b'22')
+    time.sleep(0.1)
+    assert get(port, '/static/cached.txt')[2] == b'22'
+
+def test_evicted_file_handler_is_closed(static):
+    app, port, path = static
+    for name in ('a', 'b', 'c'):
+        (path / f'{name}.txt').write_bytes(name.encode())
+
+    assert get(port, '/static/a.txt')[2] == b'a'
+    static_file = app._proxy.static_files['/static/a.txt']
+    handler = static_file.file._handler
+    assert handler is not None and not handler.closed
+
+    assert get(port, '/static/b.txt')[2] == b'b'
+    assert get(port, '/static/c.txt')[2] == b'c'
+    assert '/static/a.txt' not in app._proxy.static_files
+    assert handler.closed and static_file.file._handler is None
+
+    (path / 'b.txt').write_bytes(b'bb')
+    time.sleep(0.1)
+    static_file = app._proxy.static_files['/static/b.txt']
+    handler = static_file.file._handler
+    assert get(port, '/static/b.txt')[2] == b'bb'
+    assert handler.closed
+
+def test_precompressed_file_is_served(static):
+    _, port, path = static
+    data = b'body { color: red; }\n' * 100
+    (path / 'site.css').write_bytes(data)
+    (path / 'site.css.br').write_bytes(brotli.compress(data, quality = 11))
+    (path / 'site.css.gz').write_bytes(gzip.compress(data, 9))
+
+    _, headers, body = get(port, '/static/site.css', 'Accept-Encoding: gzip;q=0.8, br\r\n')
+    assert headers['Content-Encoding'] == 'br' and headers['Vary'] == 'Accept-Encoding'
+    assert body == (path / 'site.css.br').read_bytes()
+
+    _, headers, body = get(port, '/static/site.css', 'Accept-Encoding: br;q=0.5, gzip\r\n')
+    assert headers['Content-Encoding'] == 'gzip' and body == (path / 'site.css.gz').read_bytes()
+
+    _, headers, body = get(port, '/static/site.css')
+    assert 'Content-Encoding' not in headers and body == data
+
+def test_precompressed_file_is_revalidated(static):
+    _, port, path = static
+    (path / 'app.js').write_bytes(b'let a = 1;')
+    (path / 'app.js.gz').write_bytes(gzip.compress(b'let a = 1;'))
+
+    _, headers, body = get(port, '/static/app.js', 'Accept-Encoding: gzip\r\n')
+    assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == b'let a = 1;'
+
+    (path / 'app.js.gz').write_bytes(gzip.compress(b'let a = 22;'))
+    time.sleep(0.1)
+    _, headers, body = get(port, '/static/app.js', 'Accept-Encoding: gzip\r\n')
+    assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(body) == b'let a = 22;'
+
+    os.remove(path / 'app.js.gz')
+    time.sleep(0.1)
+    _, headers, body = get(port, '/static/app.js', 'Accept-Encoding: gzip\r\n')
+    assert 'Content-Encoding' not in headers and body == b'let a = 1;'
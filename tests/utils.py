@@ -0,0 +1,86 @@
+import contextlib, socket, threading, time
+from typing import Iterator
+
+from CheeseAPI import CheeseAPI
+
+def create_app(**kwargs) -> CheeseAPI:
+    '''
+    创建监听随机端口的单进程 app；不加载任何模块
+    '''
+
+    return CheeseAPI('127.0.0.1', 0, exclude_modules = ['CheeseAPI', 'examples', 'tests'], **kwargs)
+
+@contextlib.contextmanager
+def serve(app: CheeseAPI) -> Iterator[int]:
+    '''
+    在后台线程中启动 app，产出实际监听的端口；退出时停止 app
+    '''
+
+    thread = threading.Thread(target = app.start, daemon = True)
+    thread.start()
+    for _ in range(500):
+        if app._proxy.server_socket is not None and app._proxy.server_socket.getsockname()[1] != 0:
+            break
+        time.sleep(0.01)
+    time.sleep(0.05)
+    try:
+        yield app._proxy.server_socket.getsockname()[1]
+    finally:
+        app._proxy.stop_signal.set()
+        thread.join(5)
+
+def send(port: int, data: bytes, timeout: float = 5) -> bytes:
+    '''
+    发送原始请求数据并接收直至连接关闭
+    '''
+
+    with socket.create_connection(('127.0.0.1', port), timeout) as sock:
+        sock.sendall(data)
+        chunks = []
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+def parse_responses(data: bytes, head: bool = False) -> list[tuple[int, dict[str, str], bytes]]:
+    '''
+    将连续的响应拆分为 `(状态码, 头部, 响应体)`；`head` 为 True 时响应没有响应体
+    '''
+
+    responses = []
+    while data:
+        head_data, _, data = data.partition(b'\r\n\r\n')
+        status_line, _, header_data = head_data.partition(b'\r\n')
+        status = int(status_line.split(b' ')[1])
+        headers = dict(line.split(': ', 1) for line in header_data.decode().split('\r\n')) if header_data else {}
+        body = b''
+        if head or status in (100, 204, 304):
+            ...
+        elif headers.get('Transfer-Encoding') == 'chunked':
+            while True:
+                size_line, _, data = data.partition(b'\r\n')
+                size = int(size_line, 16)
+                if size == 0:
+                    data = data[2:]
+                    break
+                body += data[:size]
+                data = data[size + 2:]
+        else:
+            size = int(headers.get('Content-Length', '0'))
+            body, data = data[:size], data[size:]
+        if status != 100:
+            responses.append((status, headers, body))
+    return responses
+
+def get(port: int, path: str, headers: str = '') -> tuple[int, dict[str, str], bytes]:
+    '''
+    发送单个 GET 请求，返回 `(状态码, 头部, 响应体)`
+    '''
+
+    [response] = parse_responses(send(port, f'GET {path} HTTP/1.1\r\nHost: x\r\n{headers}Connection: close\r\n\r\n'.encode()))
+    return response